@@ -1,26 +1,42 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile, Request, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, File, Form, UploadFile, Request, WebSocket, WebSocketDisconnect
 import uuid
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 import os
 import logging
 import asyncio
+import time
+import json
+import re
+import shutil
+import tempfile
 from dotenv import load_dotenv
 import assemblyai as aai
 from starlette.websockets import WebSocketState
-from datetime import datetime
 from pathlib import Path
 
 load_dotenv()
 
 from services.stt_service import resilient_transcribe, transcribe_audio_bytes  
+from services.batch_transcriber import BATCH_CONCURRENCY, expand_paths, transcribe_batch
 from services.streaming_transcriber import AssemblyAIStreamingTranscriber
-from services.tts_service import MurfTTSClient 
-from services.murf_ws_service import MurfWebSocketStreamer  
-from services.llm_service import GeminiClient 
-from services.web_search_service import TavilySearch
-from services.weather_service import OpenWeather
+from services.tts_service import MurfTTSClient
+from services.audio_cache import AUDIO_CACHE, CachedAudio
+from services.http_client import HTTP_POOL
+from services.audio_recorder import AudioRecorder
+from services.audio_rechunker import PcmRechunker, CAPTURE_TOTALS, record_capture
+from services.vad import create_vad, record_vad, VAD_TOTALS, SPEECH_START, SPEECH_END
+from services.session_store import create_session_backend
+from services.murf_ws_service import MurfWebSocketStreamer, MURF_POOL, STREAM_FORMAT
+from services.audio_frames import TurnAudioFramer
+from services.metrics import REGISTRY, ACTIVE_SESSIONS, UPSTREAM_ERRORS, TurnTrace, current_trace, monitor_event_loop
+from services.text_segmenter import IncrementalSegmenter, sanitize_for_tts
+from services.speculation import SpeculativeReply, Speculator
+from services.llm_service import GeminiClient, CONTEXT_WINDOW, MODEL_REGISTRY, RESPONSE_CACHE, TOOL_REGISTRY, WholeReply
+from services.context_window import RollingSummaries
+from services.web_search_service import TavilySearch, SEARCH_CACHE
+from services.weather_service import OpenWeather, WEATHER_CACHE
 from schemas.tts import ( 
     TextToSpeechRequest,
     TextToSpeechResponse,
@@ -52,19 +68,51 @@ app = FastAPI(title="AI Voice Agent", version="0.2.0")
 # Default TTS client only if env key exists; per-session override supported at call-time
 tts_client = MurfTTSClient(MURF_API_KEY) if MURF_API_KEY else None
 llm_client = GeminiClient()
+RECORDER = AudioRecorder(Path(__file__).parent / "uploads")
 # Local knobs (not from env): tweak UI and TTS chunk lengths here
 MAX_UI_ANSWER_CHARS: int =0  # 0 to disable UI trimming
 MAX_TTS_CHARS: int = 240         # per-chunk size for Murf streaming
+MURF_VOICE: str = "en-US-ken"    # /ws reply voice (also part of the TTS audio cache key)
+RECORD_AUDIO: bool = True        # save /ws mic audio under app/uploads (WAV, pruned by retention)
+VAD_ENABLED: bool = True         # thin silence before AssemblyAI (needs numpy)
+VAD_FORCE_ENDPOINT: bool = True  # end the STT turn as soon as the VAD hears speech stop
+BARGE_IN: bool = True            # user speech (VAD or partial transcript) cancels the reply being spoken
+SPECULATIVE_LLM: bool = False    # start Gemini on a stable partial transcript (extra requests; ?speculate=1 per connection)
+SPECULATE_AFTER_S: float = 0.3   # how long a partial must stay unchanged before speculating
 
 app.mount("/static", StaticFiles(directory=os.path.join(os.path.dirname(__file__), "static")), name="static")
 templates = Jinja2Templates(directory=os.path.join(os.path.dirname(__file__), "templates"))
 
-CHAT_HISTORY: dict[str, list] = {}
-SESSION_SETTINGS: dict[str, dict] = {}
+# Chat history + per-session API keys. In-process by default; SESSION_BACKEND=sqlite shares
+# them across uvicorn workers via a WAL database (SESSION_DB_PATH, default app/sessions.db)
+SESSIONS = create_session_backend(Path(__file__).parent / "sessions.db")
+# Summaries of turns that left the prompt window, stored with the session (shared across workers)
+SUMMARIES = RollingSummaries(CONTEXT_WINDOW, SESSIONS)
 
 active_connections: set[WebSocket] = set()
 
 
+@app.on_event("startup")
+async def start_loop_monitor():
+    # Event-loop lag shows up on /metrics; blocking calls on the loop are the usual cause
+    app.state.loop_monitor = asyncio.create_task(monitor_event_loop())
+
+
+@app.on_event("startup")
+async def load_audio_cache_index():
+    # One directory scan now, so no /ws turn pays for it
+    await asyncio.to_thread(AUDIO_CACHE.load_index)
+
+
+@app.on_event("shutdown")
+async def close_upstream_pools():
+    app.state.loop_monitor.cancel()
+    await MURF_POOL.aclose_all()
+    await HTTP_POOL.aclose()
+    RECORDER.stop()
+    await SESSIONS.close()
+
+
 # Real-time streaming transcription using AssemblyAI
 @app.websocket("/ws")
 async def websocket_endpoint(ws: WebSocket):
@@ -73,6 +121,7 @@ async def websocket_endpoint(ws: WebSocket):
     if not session_id:
         session_id = str(uuid.uuid4())
     await ws.accept()
+    ACTIVE_SESSIONS.inc()
     logger.info("✅ Ready for audio stream (AssemblyAI)")
     # Capture loop now so thread callbacks can schedule coroutines
     import asyncio
@@ -81,14 +130,29 @@ async def websocket_endpoint(ws: WebSocket):
     last_partial_sent: str | None = None
     last_final_sent: str | None = None
     turn_finalized: bool = False
+    heard_since_final = False  # partials arrived for a turn AssemblyAI hasn't ended yet
+    turn_counter = 0  # numbers TTS replies in binary audio frames
+    flushed_turn = 0  # last turn the client was told to stop playing
+    active_turn: asyncio.Task | None = None
+    # Reply audio outlives its turn task: Murf keeps streaming after the LLM is done
+    speech_streamer: MurfWebSocketStreamer | None = None
+    speech_task: asyncio.Task | None = None
 
     # Look up any session-specific API keys
-    settings = SESSION_SETTINGS.get(session_id) or {}
+    settings = await SESSIONS.get_settings(session_id)
     aai_key = settings.get("ASSEMBLYAI_API_KEY") or aai.settings.api_key
     gemini_override = settings.get("GEMINI_API_KEY")
     tavily_override = settings.get("TAVILY_API_KEY")
     ow_override = settings.get("OPENWEATHER_API_KEY")
     murf_override = settings.get("MURF_API_KEY")
+    overrides = {k: v for k, v in {
+        "GEMINI_API_KEY": gemini_override,
+        "TAVILY_API_KEY": tavily_override,
+        "OPENWEATHER_API_KEY": ow_override,
+    }.items() if v}
+
+    async def summarize(summary: str | None, messages: list[dict]) -> str:
+        return await llm_client.asummarize(summary, messages, overrides=overrides)
 
     # Send incremental (partial) transcript to client (as plain text frame) for live display
     async def send_transcript(transcript: str):
@@ -99,31 +163,159 @@ async def websocket_endpoint(ws: WebSocket):
         except Exception as e:
             logger.debug(f"(ignored) send partial after close: {e}")
 
-    async def send_turn_end(transcript: str | None):
+    async def send_event(kind: str, **fields):
+        if ws_closed or ws.client_state != WebSocketState.CONNECTED:
+            return
+        try:
+            await ws.send_json({"type": kind, **fields})
+        except Exception as e:
+            logger.debug(f"(ignored) send {kind} after close: {e}")
+
+    async def cancel_speech(streamer: MurfWebSocketStreamer | None, task: asyncio.Task | None):
+        if task is None or task.done():
+            return
+        if streamer:
+            await streamer.cancel()
+        task.cancel()
+
+    async def stop_speech():
+        """Stop the reply audio still playing, if any: clear its Murf context and end the pump."""
+        nonlocal speech_streamer, speech_task
+        streamer, task = speech_streamer, speech_task
+        speech_streamer = speech_task = None
+        await cancel_speech(streamer, task)
+
+    async def send_turn_end(transcript: str | None, trace: TurnTrace, speculation: SpeculativeReply | None = None):
+        nonlocal turn_counter
         if ws_closed or ws.client_state != WebSocketState.CONNECTED:
+            trace.finish("dropped")
             return
+        current_trace.set(trace)  # visible to tool calls and the Murf client inside this turn
         # Always include transcript so frontend renders exactly one bubble per utterance
         # Also include Gemini LLM response for UI
         user_text = transcript or last_partial_sent or last_final_sent or ""
+        murf_streamer: MurfWebSocketStreamer | None = None
+        murf_task: asyncio.Task | None = None
+        parts: list[str] = []
         try:
+            trace.begin()
             # Append to history and let Gemini decide tool use (web search)
-            history = append_history(session_id, "user", user_text)
-            overrides = {k: v for k, v in {
-                "GEMINI_API_KEY": gemini_override,
-                "TAVILY_API_KEY": tavily_override,
-                "OPENWEATHER_API_KEY": ow_override,
-            }.items() if v}
-            raw_reply = llm_client.chat(user_text, history, overrides=overrides)
-            # Sanitize
-            import re, uuid
-            full_tts_text = re.sub(r'[^\x00-\x7F]+', '', raw_reply or '')
-            full_tts_text = full_tts_text.strip()
-            # Ensure proper punctuation for TTS
-            if full_tts_text and not full_tts_text.endswith(('.', '!', '?')):
-                full_tts_text += '.'
+            history = await append_history(session_id, "user", user_text)
+            # Generate a unique context_id for this turn
+            murf_context_id = f"turn_{uuid.uuid4().hex[:8]}"
+            turn_counter += 1
+            framer = TurnAudioFramer(turn_counter)
+
+            async def pump_audio(streamer: MurfWebSocketStreamer, cache_key: str | None):
+                # Murf audio goes out as binary frames as soon as it arrives, all on the event loop
+                recorded: list[bytes] = []
+                try:
+                    async for audio in streamer:
+                        if ws_closed or ws.client_state != WebSocketState.CONNECTED:
+                            break
+                        trace.mark("first_audio")
+                        await ws.send_bytes(framer.frame(audio))
+                        if cache_key:
+                            recorded.append(audio)
+                    if streamer.completed:
+                        trace.mark("tts_done")
+                        await send_event("tts_done", turn=framer.turn_id, frames=framer.frames)
+                        if recorded:
+                            await asyncio.to_thread(AUDIO_CACHE.put, cache_key, recorded)
+                finally:
+                    trace.finish("completed" if streamer.completed else "cancelled" if streamer.cancelled else "tts_failed")
+
+            async def play_cached(audio: CachedAudio):
+                try:
+                    with audio:
+                        for chunk in audio:
+                            if ws_closed or ws.client_state != WebSocketState.CONNECTED:
+                                return
+                            trace.mark("first_audio")
+                            await ws.send_bytes(framer.frame(chunk))
+                    trace.mark("tts_done")
+                    await send_event("tts_done", turn=framer.turn_id, frames=framer.frames)
+                finally:
+                    trace.finish("completed")
+
+            murf_key = murf_override or MURF_API_KEY
+
+            async def start_speech(first: str):
+                # A whole reply (response cache hit, canned message) may already be synthesized;
+                # otherwise open the Murf context, recording whole replies for next time
+                nonlocal murf_streamer, murf_task, speech_streamer, speech_task
+                await stop_speech()  # a newer reply supersedes one still playing
+                cache_key = None
+                if isinstance(first, WholeReply) and AUDIO_CACHE.cacheable(first):
+                    cache_key = AUDIO_CACHE.key(sanitize_for_tts(first), MURF_VOICE, STREAM_FORMAT)
+                    cached = await AUDIO_CACHE.aget(cache_key)
+                    if cached is not None:
+                        trace.mark("tts_cache_hit")
+                        murf_task = speech_task = asyncio.create_task(play_cached(cached))
+                        # A task cancelled before it first runs skips its finally
+                        murf_task.add_done_callback(lambda _t: trace.finish("cancelled"))
+                        return
+                if murf_key:
+                    murf_streamer = MurfWebSocketStreamer(murf_key, voice_id=MURF_VOICE, context_id=murf_context_id)
+                    murf_streamer.start()
+                    murf_task = asyncio.create_task(pump_audio(murf_streamer, cache_key))
+                    murf_task.add_done_callback(lambda _t: trace.finish("cancelled"))
+                    speech_streamer, speech_task = murf_streamer, murf_task
+                else:
+                    logger.error('No Murf API key set for TTS streaming')
+
+            async def speak_async(chunks: list[str], end: bool = False):
+                nonlocal murf_streamer
+                if not murf_streamer or not chunks:
+                    return
+                try:
+                    for i, ch in enumerate(chunks):
+                        await murf_streamer.send_text_chunk(ch, end=end and i == len(chunks) - 1)
+                except Exception as e:
+                    logger.error('Murf synth error: %s', e)
+                    UPSTREAM_ERRORS.inc(upstream="murf")
+                    murf_streamer.close()
+                    murf_streamer = None
+
+            # Stream Gemini tokens straight into Murf: each completed sentence goes to the
+            # open Murf context right away, end=True only on the last one.
+            segmenter = IncrementalSegmenter(MAX_TTS_CHARS)
+            trace.mark("llm_request")
+            if speculation is not None:
+                trace.mark("speculation_hit")  # reply already under way since a stable partial
+                reply_stream = speculation.fragments()
+            else:
+                reply_stream = llm_client.achat_stream(user_text, history, overrides=overrides, summary=await SUMMARIES.get(session_id))
+            try:
+                async for fragment in reply_stream:
+                    trace.mark("llm_first_token")
+                    if not parts:
+                        await start_speech(fragment)
+                    parts.append(fragment)
+                    await speak_async(segmenter.feed(fragment))
+            except Exception as e:
+                logger.error(f"LLM error: {e}")
+                UPSTREAM_ERRORS.inc(upstream="gemini")
+                if not parts:
+                    fallback = WholeReply("Sorry, I couldn't process that right now. Please try rephrasing.")
+                    await start_speech(fallback)
+                    parts.append(fallback)
+                    await speak_async(segmenter.feed(fallback))
+            tail = segmenter.flush()
+            if tail:
+                await speak_async(tail, end=True)
+            elif murf_streamer:
+                murf_streamer.close()
+            trace.mark("llm_done")
+            raw_reply = ''.join(parts)
+            logger.info('[Murf TTS] context_id=%s text_len=%d', murf_context_id, len(raw_reply))
+
             # UI text may be trimmed, but TTS uses the full text
-            ui_text = full_tts_text
+            ui_text = sanitize_for_tts(raw_reply).strip()
+            if ui_text and not ui_text.endswith(('.', '!', '?')):
+                ui_text += '.'
             if MAX_UI_ANSWER_CHARS and MAX_UI_ANSWER_CHARS > 0 and len(ui_text) > MAX_UI_ANSWER_CHARS:
+                import re
                 sentences = re.split(r'(?<=[.!?])\s+', ui_text)
                 short_resp = ''
                 for s in sentences:
@@ -132,131 +324,142 @@ async def websocket_endpoint(ws: WebSocket):
                     else:
                         break
                 ui_text = short_resp.strip()
-            # Generate a unique context_id for this turn
-            murf_context_id = f"turn_{uuid.uuid4().hex[:8]}"
-            append_history(session_id, "assistant", ui_text)
+            history = await append_history(session_id, "assistant", ui_text)
+            if ws_closed or ws.client_state != WebSocketState.CONNECTED:
+                return
             payload = {
                 "type": "turn_end",
                 "transcript": user_text,
                 "llm_response": ui_text or "",
-                "history": CHAT_HISTORY.get(session_id, [])[-20:]
+                "history": history[-20:]
             }
             await ws.send_json(payload)
-            # Murf TTS streaming: send response in safe chunks (sentences) and end=True on last chunk
-            async def run_llm_stream():
-                print("[LLM STREAM START]")
-                def do_stream():
-                    # Use per-session Murf key if provided
-                    murf_key = murf_override or MURF_API_KEY
-                    if not murf_key:
-                        logger.error('No Murf API key set for TTS streaming')
-                        return
-                    murf_streamer = MurfWebSocketStreamer(murf_key, voice_id="en-US-ken", context_id=murf_context_id)
-                    logger.info('[Murf TTS] context_id=%s text_len=%d', murf_context_id, len(full_tts_text or ''))
-                    try:
-                        murf_streamer.connect()
-                        # --- Split LLM text into Murf-safe chunks ---
-                        def split_for_tts(text: str, max_chars: int) -> list[str]:
-                            import re
-                            chunks: list[str] = []
-                            if not text:
-                                return chunks
-                            paras = [p.strip() for p in text.split('\n\n') if p and p.strip()]
-                            for para in paras if paras else [text]:
-                                # Split by sentence boundaries
-                                parts = [s.strip() for s in re.split(r'(?<=[.!?])\s+', para) if s.strip()]
-                                buf = ''
-                                for s in parts:
-                                    # If a single sentence is too long, hard-wrap it
-                                    if len(s) > max_chars:
-                                        # wrap on spaces up to max_chars
-                                        start = 0
-                                        while start < len(s):
-                                            end = min(start + max_chars, len(s))
-                                            # try to break at last space in window
-                                            window = s[start:end]
-                                            brk = window.rfind(' ')
-                                            if brk == -1 or start + brk < start + int(max_chars*0.6):
-                                                brk = end - start
-                                            piece = s[start:start+brk].strip()
-                                            if piece:
-                                                chunks.append(piece)
-                                            start += brk
-                                        continue
-                                    # normal glue into buffer
-                                    if not buf:
-                                        buf = s
-                                    elif len(buf) + 1 + len(s) <= max_chars:
-                                        buf += ' ' + s
-                                    else:
-                                        chunks.append(buf)
-                                        buf = s
-                                if buf:
-                                    chunks.append(buf)
-                            return chunks
-
-                        tts_chunks = split_for_tts(full_tts_text, MAX_TTS_CHARS)
-                        if not tts_chunks:
-                            tts_chunks = [full_tts_text]
-                        def push_audio_b64(b64: str):
-                            if ws_closed or ws.client_state != WebSocketState.CONNECTED:
-                                return
-                            try:
-                                asyncio.run_coroutine_threadsafe(ws.send_json({"type": "tts_chunk", "audio_b64": b64}), loop)
-                            except Exception:
-                                pass
-                        def push_done():
-                            if ws_closed or ws.client_state != WebSocketState.CONNECTED:
-                                return
-                            try:
-                                asyncio.run_coroutine_threadsafe(ws.send_json({"type": "tts_done"}), loop)
-                            except Exception:
-                                pass
-                        # Send each chunk, end only on the last
-                        for i, ch in enumerate(tts_chunks):
-                            murf_streamer.send_text_chunk(ch, end=(i == len(tts_chunks)-1))
-                        murf_streamer.finalize(on_audio_chunk=push_audio_b64, on_done=push_done)
-                    except Exception as e:
-                        logger.error('Murf synth error: %s', e)
-                await asyncio.get_running_loop().run_in_executor(None, do_stream)
-                print("[LLM STREAM END]\n")
-            asyncio.run_coroutine_threadsafe(run_llm_stream(), loop)
+            # Reply is out: fold turns leaving the context window into the summary meanwhile
+            SUMMARIES.schedule(session_id, history, summarize)
+            if murf_task is None:
+                trace.finish("completed")  # no audio leg; otherwise pump_audio finishes the trace
+        except asyncio.CancelledError:
+            # Barge-in or disconnect: stop Murf now and keep what was already said in history
+            trace.finish("cancelled")
+            if murf_streamer:
+                await murf_streamer.cancel()
+            elif murf_task:
+                murf_task.cancel()  # replaying cached audio
+            said = sanitize_for_tts(''.join(parts)).strip()
+            logger.info('[turn] cancelled after %d reply chars', len(said))
+            if said:
+                await append_history(session_id, "assistant", said)
+            await send_event("turn_end", transcript=user_text, llm_response=said, cancelled=True)
+            raise
         except Exception as e:
             logger.error(f"LLM error: {e}")
+            trace.finish("error")
+
+    def start_turn(transcript: str | None):
+        # A newer turn supersedes one still running
+        nonlocal active_turn
+        if active_turn and not active_turn.done():
+            active_turn.cancel()
+        speculation = speculator.take(transcript or "") if speculator else None
+        # Trace clock starts at the final transcript
+        trace = TurnTrace(f"{session_id[:8]}-{turn_counter + 1}")
+        active_turn = asyncio.ensure_future(send_turn_end(transcript, trace, speculation))
+
+    async def speculative_reply(text: str):
+        # Same request the turn would make, minus the history write (done only if it's committed)
+        history = await SESSIONS.get_history(session_id)
+        async for fragment in llm_client.achat_stream(text, history, overrides=overrides, summary=await SUMMARIES.get(session_id)):
+            yield fragment
+
+    # Opt-in per connection with ?speculate=1 (or for all with SPECULATIVE_LLM)
+    speculate = ws.query_params.get('speculate', '1' if SPECULATIVE_LLM else '0').lower() not in ('0', 'false', 'off')
+    speculator = Speculator(
+        speculative_reply, SPECULATE_AFTER_S,
+        can_start=lambda: active_turn is None or active_turn.done(),  # history must include the last reply
+    ) if speculate else None
+
+    pending_barge_in: asyncio.Future | None = None
+
+    def barge_in(reason: str) -> asyncio.Future | None:
+        """User spoke over the agent: abort the running turn and its audio, flush client playback.
+
+        What to stop is decided right here, on the loop callback, so partials and finals
+        take effect in the order they arrived: a turn started by a later final is never
+        the one cancelled. Returns the cleanup task, or None if nothing was playing.
+        """
+        nonlocal flushed_turn, speech_streamer, speech_task, pending_barge_in
+        task = active_turn if active_turn and not active_turn.done() else None
+        # The LLM may be done while Murf is still speaking the reply
+        streamer, audio = speech_streamer, speech_task
+        speech_streamer = speech_task = None
+        flush = turn_counter if turn_counter > flushed_turn else None
+        if flush is not None:
+            flushed_turn = flush
+        if task is None and flush is None and (audio is None or audio.done()):
+            return None
+        if task:
+            logger.info('[turn] barge-in (%s): cancelling turn %d', reason, turn_counter)
+            task.cancel()
+
+        async def finish():
+            if task:
+                # Let its cleanup (Murf clear, history, turn_end) finish before newer messages go out
+                await asyncio.wait([task])
+            await cancel_speech(streamer, audio)
+            if flush is not None:
+                await send_event("tts_flush", turn=flush)
+
+        pending_barge_in = asyncio.ensure_future(finish())
+        return pending_barge_in
+
+    async def send_partial(transcript: str):
+        if pending_barge_in and not pending_barge_in.done():
+            await asyncio.wait([pending_barge_in])  # partials stay behind the barge-in's turn_end/tts_flush
+        await send_transcript(transcript)
+
+    def on_partial(transcript: str):
+        # Same loop-callback queue as finals (start_turn), so the two are handled in order
+        if BARGE_IN:
+            barge_in("speech")
+        asyncio.ensure_future(send_partial(transcript))
+        if speculator:
+            speculator.on_partial(transcript)
 
     # Buffers + thread-safe wrappers used by AssemblyAI SDK thread
     transcript_buffer: list[str] = []
     def transcript_callback(transcript: str):  # partial
-        nonlocal last_partial_sent, last_final_sent, turn_finalized
+        nonlocal last_partial_sent, last_final_sent, turn_finalized, heard_since_final
         if ws_closed or not transcript:
             return
         # Deduplicate identical partials
         if transcript == last_partial_sent:
             return
         last_partial_sent = transcript
+        heard_since_final = True
         transcript_buffer.append(transcript)
         # Log partial transcript line (end_of_turn=False)
         logger.info('[Transcript] %s (end_of_turn=False)', transcript)
         # Stream partial to client
         if loop.is_running():
             try:
-                asyncio.run_coroutine_threadsafe(send_transcript(transcript), loop)
+                loop.call_soon_threadsafe(on_partial, transcript)
             except RuntimeError:
                 pass
 
     def turn_callback(transcript: str):  # final (end_of_turn)
-        nonlocal last_final_sent, turn_finalized
+        nonlocal last_final_sent, turn_finalized, heard_since_final
         if ws_closed or not transcript:
             return
         if transcript == last_final_sent:
             return  # duplicate formatted final
         turn_finalized = True
+        heard_since_final = False
         last_final_sent = transcript
         # Log final transcript line (end_of_turn=True)
         logger.info('[Transcript] %s (end_of_turn=True)', transcript)
         if loop.is_running():
             try:
-                asyncio.run_coroutine_threadsafe(send_turn_end(transcript), loop)
+                loop.call_soon_threadsafe(start_turn, transcript)
             except RuntimeError:
                 pass
     # Streaming now handled in send_turn_end for consistent LLM response
@@ -268,11 +471,14 @@ async def websocket_endpoint(ws: WebSocket):
             logger.info("Final statement: %s", transcript_buffer[-1])
     atexit.register(print_final_transcript)
 
-    # Prepare audio file for saving
-    uploads_dir = Path(__file__).parent / "uploads"
-    uploads_dir.mkdir(exist_ok=True)
-    file_path = uploads_dir / f"rec_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pcm"
+    # Session audio is recorded off the event loop (opt out per connection with ?record=0)
+    record = RECORD_AUDIO and ws.query_params.get('record', '1').lower() not in ('0', 'false', 'off')
+    recording = RECORDER.start(session_id) if record else None
     total_bytes = 0
+    # Browser sends ~20 ms frames; AssemblyAI gets 50 ms packets
+    rechunker = PcmRechunker(sample_rate=16000)
+    # Silence is thinned before it reaches AssemblyAI; speech_start/speech_end go to the client
+    vad = create_vad(sample_rate=16000) if VAD_ENABLED else None
     transcriber = AssemblyAIStreamingTranscriber(
         sample_rate=16000,
         partial_callback=transcript_callback,
@@ -280,41 +486,76 @@ async def websocket_endpoint(ws: WebSocket):
         api_key=aai_key
     )
     try:
-        with open(file_path, "ab") as audio_file:
-            while True:
-                try:
-                    data = await ws.receive_bytes()
-                    if not data:
+        while True:
+            try:
+                data = await ws.receive_bytes()
+                if not data:
+                    continue
+                t0 = time.perf_counter_ns()
+                if recording:
+                    recording.write(data)
+                total_bytes += len(data)
+                for packet in rechunker.push(data):
+                    if vad is None:
+                        transcriber.stream_audio(packet)
                         continue
-                    audio_file.write(data)
-                    total_bytes += len(data)
-                    transcriber.stream_audio(data)
+                    forward, event = vad.process(packet)
+                    for p in forward:
+                        transcriber.stream_audio(p)
+                    if event:
+                        if event == SPEECH_START and BARGE_IN:
+                            pending = barge_in("vad")
+                            if pending:
+                                await pending
+                        await send_event(event)
+                        if event == SPEECH_END and VAD_FORCE_ENDPOINT and heard_since_final:
+                            transcriber.force_endpoint()
+                rechunker.stats.handling_ns += time.perf_counter_ns() - t0
+            except WebSocketDisconnect:
+                ws_closed = True
+                logger.info(f"🔴 Client disconnected, final size={total_bytes} bytes")
+                break
+            except RuntimeError:
+                # Could be a text frame; attempt to handle gracefully
+                try:
+                    txt = await ws.receive_text()
+                    msg = txt.strip().lower() if isinstance(txt, str) else ''
+                    if msg == 'end_of_turn' or msg == '{"type":"end_of_turn"}':
+                        # Force finalize using the latest transcript we have
+                        forced_text = last_final_sent or last_partial_sent or ''
+                        logger.info('[ws] received end_of_turn marker; finalizing with: %s', forced_text)
+                        tail = rechunker.flush()
+                        if tail:
+                            transcriber.stream_audio(tail)
+                        # Run the turn as its own task so audio keeps flowing in meanwhile
+                        start_turn(forced_text)
+                    else:
+                        logger.warning(f"[ws] got unexpected text frame: {txt[:40]}")
                 except WebSocketDisconnect:
                     ws_closed = True
-                    logger.info(f"🔴 Client disconnected, final size={total_bytes} bytes")
                     break
-                except RuntimeError:
-                    # Could be a text frame; attempt to handle gracefully
-                    try:
-                        txt = await ws.receive_text()
-                        msg = txt.strip().lower() if isinstance(txt, str) else ''
-                        if msg == 'end_of_turn' or msg == '{"type":"end_of_turn"}':
-                            # Force finalize using the latest transcript we have
-                            forced_text = last_final_sent or last_partial_sent or ''
-                            logger.info('[ws] received end_of_turn marker; finalizing with: %s', forced_text)
-                            await send_turn_end(forced_text)
-                        else:
-                            logger.warning(f"[ws] got unexpected text frame: {txt[:40]}")
-                    except WebSocketDisconnect:
-                        ws_closed = True
-                        break
     finally:
         ws_closed = True
+        ACTIVE_SESSIONS.dec()
+        if active_turn and not active_turn.done():
+            # Client is gone: stop generating and release the Murf context
+            active_turn.cancel()
+        await stop_speech()
+        if speculator:
+            speculator.close()
+            logger.info("[ws] speculation stats: %s", speculator.stats())
+        record_capture(rechunker.stats)
+        if vad:
+            record_vad(vad.stats)
+            logger.info("[ws] vad stats: %s", vad.stats.as_dict())
+        logger.info("[ws] capture stats: %s", rechunker.stats.as_dict())
         try:
             transcriber.close()
         except Exception:
             pass
-        logger.info(f"✅ Audio saved at {file_path} ({total_bytes} bytes)")
+        if recording:
+            recording.close()
+            logger.info(f"✅ Audio queued for {recording.base.name}.{recording.format} ({total_bytes} bytes)")
         logger.info("✅ Streaming session closed")
 
 
@@ -331,9 +572,19 @@ async def generate_audio(payload: TextToSpeechRequest):
     logger.info("TTS generate request: %s chars", len(payload.text))
     if not tts_client:
         raise HTTPException(status_code=500, detail="TTS not configured. Set MURF_API_KEY in server or provide per-session in chat flow.")
-    audio_url = tts_client.synthesize(payload.text, payload.voiceId)
+    audio_url = await tts_client.synthesize(payload.text, payload.voiceId)
     return TextToSpeechResponse(audio_url=audio_url)
 
+@app.get("/tts/cache/{key}")
+async def cached_tts_audio(key: str):
+    # Local URLs handed out by MurfTTSClient once a text's audio is cached
+    audio = await AUDIO_CACHE.aget(key, count=False) if len(key) == 32 and key.isalnum() else None
+    if audio is None:
+        raise HTTPException(status_code=404, detail="Audio not cached")
+    with audio:
+        content = await asyncio.to_thread(audio.read)
+        return Response(content=content, media_type=audio.media_type, headers={"Cache-Control": "public, max-age=86400"})
+
 @app.post("/upload-audio")
 async def upload_audio(file: UploadFile = File(...)):
     try:
@@ -347,8 +598,52 @@ async def transcribe_file(file: UploadFile = File(...)):
     audio_data = await file.read()
     if not audio_data:
         raise HTTPException(status_code=400, detail="Empty file")
-    text = transcribe_audio_bytes(audio_data)
+    text = await transcribe_audio_bytes(audio_data)
     return SimpleTranscriptionResponse(transcription=text)
+
+@app.post("/transcribe/batch")
+async def transcribe_batch_endpoint(
+    files: list[UploadFile] = File(None),
+    paths: list[str] = Form(None),
+    concurrency: int = Form(BATCH_CONCURRENCY),
+    checkpoint: str | None = Form(None),
+    session_id: str | None = Form(None),
+):
+    """Transcribe uploaded files and/or recordings under app/uploads (paths or globs, e.g. rec_*.pcm).
+
+    Results stream back as NDJSON as each file finishes. Naming a checkpoint resumes a
+    previous batch of the same name: files it already transcribed are not sent again.
+    """
+    if checkpoint is not None and not re.fullmatch(r"[\w.-]{1,64}", checkpoint):
+        raise HTTPException(status_code=400, detail="Invalid checkpoint name")
+    try:
+        sources = [(p.relative_to(RECORDER.directory.resolve()).as_posix(), p) for p in expand_paths(paths or [], RECORDER.directory)]
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Paths must be inside the uploads directory")
+    # Uploads are spooled to disk: the request's file handles close before the stream is consumed
+    spool = Path(tempfile.mkdtemp(prefix="stt-batch-"))
+    for i, f in enumerate(files or []):
+        dest = spool / f"{i}{Path(f.filename or '').suffix.lower()}"
+        with open(dest, "wb") as out:
+            await asyncio.to_thread(shutil.copyfileobj, f.file, out)
+        sources.append((f.filename or dest.name, dest))
+    if not sources:
+        shutil.rmtree(spool, ignore_errors=True)
+        raise HTTPException(status_code=400, detail="No audio files given or matched")
+    api_key = (await SESSIONS.get_settings(session_id)).get("ASSEMBLYAI_API_KEY") if session_id else None
+    logger.info("Batch transcription: %d files, concurrency=%d", len(sources), concurrency)
+
+    async def ndjson():
+        try:
+            async for rec in transcribe_batch(
+                sources, concurrency=concurrency, api_key=api_key,
+                checkpoint=RECORDER.directory / "checkpoints" / f"{checkpoint}.ndjson" if checkpoint else None,
+            ):
+                yield json.dumps(rec) + "\n"
+        finally:
+            shutil.rmtree(spool, ignore_errors=True)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
     
 @app.post("/tts/echo", response_model=EchoResponse)
 async def tts_echo(file: UploadFile = File(...)):
@@ -356,16 +651,14 @@ async def tts_echo(file: UploadFile = File(...)):
     if not audio_data:
         raise HTTPException(status_code=400, detail="Empty file")
     # sessionless here; could accept ?session_id to use overrides
-    text = resilient_transcribe(audio_data)
+    text = await resilient_transcribe(audio_data)
     if not text:
         raise HTTPException(status_code=400, detail="Empty transcription")
-    audio_url = tts_client.synthesize(text, "en-US-charles")
+    audio_url = await tts_client.synthesize(text, "en-US-charles")
     return EchoResponse(audio_url=audio_url, transcription=text)
 
-def append_history(session_id: str, role: str, content: str) -> list:
-    history = CHAT_HISTORY.setdefault(session_id, [])
-    history.append({"role": role, "content": content})
-    return history
+async def append_history(session_id: str, role: str, content: str) -> list:
+    return await SESSIONS.append_history(session_id, role, content)
 
 @app.post("/agent/chat/{session_id}", response_model=ChatResponse)
 async def agent_chat(session_id: str, file: UploadFile = File(...)):
@@ -373,29 +666,30 @@ async def agent_chat(session_id: str, file: UploadFile = File(...)):
     if not audio_bytes or len(audio_bytes) < 100:
         raise HTTPException(status_code=400, detail="Invalid audio file")
     # Use session-specific AssemblyAI key if set
-    s = (SESSION_SETTINGS.get(session_id) or {})
+    s = await SESSIONS.get_settings(session_id)
     aai_key = s.get("ASSEMBLYAI_API_KEY")
-    user_text = transcribe_audio_bytes(audio_bytes, api_key=aai_key)
+    user_text = await transcribe_audio_bytes(audio_bytes, api_key=aai_key)
     if not user_text:
         raise HTTPException(status_code=400, detail="Empty transcription")
-    history = append_history(session_id, "user", user_text)
+    history = await append_history(session_id, "user", user_text)
     logger.info("LLM chat session=%s", session_id)
     overrides = {k: v for k, v in {
         "GEMINI_API_KEY": s.get("GEMINI_API_KEY"),
         "TAVILY_API_KEY": s.get("TAVILY_API_KEY"),
         "OPENWEATHER_API_KEY": s.get("OPENWEATHER_API_KEY"),
     }.items() if v}
-    ai_reply = llm_client.chat(user_text, history, overrides=overrides)
+    ai_reply = await llm_client.achat(user_text, history, overrides=overrides, summary=await SUMMARIES.get(session_id))
     logger.info("LLM reply chars=%d session=%s", len(ai_reply or ''), session_id)
-    append_history(session_id, "assistant", ai_reply)
+    history = await append_history(session_id, "assistant", ai_reply)
+    SUMMARIES.schedule(session_id, history, lambda summary, messages: llm_client.asummarize(summary, messages, overrides=overrides))
     try:
         # Use per-session Murf key override if present
         murf_key = s.get("MURF_API_KEY") or MURF_API_KEY
         if not murf_key:
             raise HTTPException(status_code=500, detail="Murf TTS not configured")
-        # Prefer ephemeral client to avoid mutating global
-        local_client = MurfTTSClient(murf_key)
-        audio_url = local_client.synthesize(ai_reply, "en-US-ken")
+        # Per-key client (cheap: HTTP connections are pooled per host, not per client)
+        local_client = tts_client if tts_client and murf_key == MURF_API_KEY else MurfTTSClient(murf_key)
+        audio_url = await local_client.synthesize(ai_reply, "en-US-ken")
     except HTTPException as e:
         logger.error("TTS failure: %s", e.detail)
         raise
@@ -411,13 +705,13 @@ async def llm_query(file: UploadFile = File(...)):
     audio_bytes = await file.read()
     if not audio_bytes or len(audio_bytes) < 100:
         raise HTTPException(status_code=400, detail="Invalid audio file")
-    text = transcribe_audio_bytes(audio_bytes)
+    text = await transcribe_audio_bytes(audio_bytes)
     if not text:
         raise HTTPException(status_code=400, detail="Empty transcription")
     logger.info("LLM single-shot query chars=%d", len(text))
-    ai_reply = llm_client.chat(text)
+    ai_reply = await llm_client.achat(text)
     logger.info("LLM single-shot reply chars=%d", len(ai_reply or ''))
-    audio_url = tts_client.synthesize(ai_reply, "en-US-ken")
+    audio_url = await tts_client.synthesize(ai_reply, "en-US-ken")
     return ChatResponse(audio_url=audio_url, transcribed_text=text, llm_response=ai_reply)
 
 # --- Debug endpoints (optional): quick testing without audio ---
@@ -427,20 +721,44 @@ async def debug_web_search(query: str, max_results: int = 5):
         client = TavilySearch()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Tavily unavailable: {e}")
-    return client.search(query, max_results)
+    # Tavily's SDK is blocking; keep it off the event loop
+    return await asyncio.to_thread(client.search, query, max_results)
 
 @app.get("/debug/weather")
 async def debug_weather(location: str, units: str = "metric"):
     try:
         client = OpenWeather()
-        return client.current_weather(location, units)
+        return await client.acurrent_weather(location, units)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"OpenWeather unavailable: {e}")
 
+@app.get("/debug/cache_stats")
+async def debug_cache_stats():
+    return {
+        "tools": {c.name: c.stats() for c in (SEARCH_CACHE, WEATHER_CACHE)},
+        "clients": {r.name: r.stats() for r in (MODEL_REGISTRY, TOOL_REGISTRY)},
+        "responses": RESPONSE_CACHE.stats(),
+        "context": SUMMARIES.stats(),
+        "tts_audio": AUDIO_CACHE.stats(),
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    # Prometheus text format: turn stage latencies, tool calls, upstream errors, live sessions
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/debug/audio_stats")
+async def debug_audio_stats():
+    return {"capture": CAPTURE_TOTALS.as_dict(), "vad": VAD_TOTALS.as_dict(), "recorder": RECORDER.stats()}
+
+@app.get("/debug/session_stats")
+async def debug_session_stats():
+    return await SESSIONS.stats()
+
 @app.get("/debug/llm_chat")
 async def debug_llm_chat(q: str):
     try:
-        reply = llm_client.chat(q)
+        reply = await llm_client.achat(q)
         return {"query": q, "reply": reply}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -448,7 +766,7 @@ async def debug_llm_chat(q: str):
 @app.post("/debug/llm_chat_text")
 async def debug_llm_chat_text(payload: ChatTextRequest):
     try:
-        reply = llm_client.chat(payload.text)
+        reply = await llm_client.achat(payload.text)
         return {"query": payload.text, "reply": reply}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -458,17 +776,18 @@ async def debug_llm_chat_text(payload: ChatTextRequest):
 async def set_session_settings(session_id: str, payload: dict):
     # Accept a JSON with any of: GEMINI_API_KEY, TAVILY_API_KEY, OPENWEATHER_API_KEY, ASSEMBLYAI_API_KEY, MURF_API_KEY
     allowed = {"GEMINI_API_KEY","TAVILY_API_KEY","OPENWEATHER_API_KEY","ASSEMBLYAI_API_KEY","MURF_API_KEY"}
-    existing = SESSION_SETTINGS.setdefault(session_id, {})
+    updates = {}
     for k,v in (payload or {}).items():
         if k in allowed and isinstance(v, str) and v.strip():
-            existing[k] = v.strip()
+            updates[k] = v.strip()
         elif k in allowed and (v is None or v == ""):
-            existing.pop(k, None)
+            updates[k] = None
+    existing = await SESSIONS.update_settings(session_id, updates)
     return {"session_id": session_id, "settings": {k: ("set" if k in existing else None) for k in allowed}}
 
 @app.get("/settings/{session_id}")
 async def get_session_settings(session_id: str):
-    s = SESSION_SETTINGS.get(session_id) or {}
+    s = await SESSIONS.get_settings(session_id)
     return {"session_id": session_id, "settings": {k: ("set" if k in s else None) for k in ["GEMINI_API_KEY","TAVILY_API_KEY","OPENWEATHER_API_KEY","ASSEMBLYAI_API_KEY","MURF_API_KEY"]}}
 
 if __name__ == "__main__":
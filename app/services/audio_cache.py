@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Iterable, Iterator, Optional
+
+logger = logging.getLogger("voice-agent.audio-cache")
+
+MAX_TOTAL_BYTES = 256 * 1024 * 1024  # LRU eviction beyond this
+MAX_TEXT_CHARS = 600                 # longer texts are unlikely to repeat; not worth the disk
+SUFFIX = ".audio"
+
+# Entry file: a sequence of records, each a 4-byte little-endian length followed by that many
+# audio bytes (one record per Murf stream chunk, or a single record for a REST audio file)
+_LEN = struct.Struct("<I")
+
+
+def _media_type(head: bytes) -> str:
+    if head.startswith(b"RIFF"):
+        return "audio/wav"
+    if head.startswith(b"ID3") or head[:1] == b"\xff":
+        return "audio/mpeg"
+    if head.startswith(b"OggS"):
+        return "audio/ogg"
+    if head.startswith(b"fLaC"):
+        return "audio/flac"
+    return "application/octet-stream"
+
+
+class CachedAudio:
+    """A cache entry mapped read-only into memory; iterate for its chunks (zero-copy views)."""
+
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.size = len(self._mm)
+        if hasattr(mmap, "MADV_WILLNEED"):
+            self._mm.madvise(mmap.MADV_WILLNEED)  # start readahead now, so iterating rarely faults
+
+    def __iter__(self) -> Iterator[memoryview]:
+        view = memoryview(self._mm)
+        pos = 0
+        try:
+            while pos + _LEN.size <= self.size:
+                (n,) = _LEN.unpack_from(self._mm, pos)
+                pos += _LEN.size
+                chunk = view[pos:pos + n]
+                yield chunk
+                chunk.release()  # consumers copy what they keep (e.g. into a frame)
+                pos += n
+        finally:
+            view.release()
+
+    def read(self) -> bytes:
+        """All chunks joined (REST entries hold exactly one)."""
+        return b"".join(bytes(chunk) for chunk in self)
+
+    @property
+    def media_type(self) -> str:
+        return _media_type(self._mm[_LEN.size:_LEN.size + 4])
+
+    def close(self):
+        try:
+            self._mm.close()
+        except BufferError:
+            pass  # a chunk view is still referenced; the map goes away with it
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class AudioCache:
+    """Synthesized speech on disk, content-addressed by hash(text, voice, format).
+
+    Entries are written atomically (temp file + rename) and read back through mmap, so a
+    hit costs page-cache reads rather than a Murf request. Recency is kept in memory and
+    on disk (mtime), so the LRU order survives restarts; the least recently used entries
+    are deleted once the directory grows past max_total_bytes. get(), touch() and put()
+    do blocking disk I/O; from the event loop use aget()/atouch() and to_thread(put).
+    """
+
+    def __init__(self, directory: Path, max_total_bytes: int = MAX_TOTAL_BYTES, max_text_chars: int = MAX_TEXT_CHARS):
+        self.directory = directory
+        self.max_total_bytes = max_total_bytes
+        self.max_text_chars = max_text_chars
+        self._lock = threading.Lock()
+        self._index: "OrderedDict[str, int] | None" = None  # key -> size, oldest first
+        self._total = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self.bytes_served = 0
+
+    @staticmethod
+    def key(text: str, voice_id: str, fmt: str) -> str:
+        norm = " ".join(text.split())
+        return hashlib.blake2b(f"{fmt}\x1f{voice_id}\x1f{norm}".encode(), digest_size=16).hexdigest()
+
+    def cacheable(self, text: str) -> bool:
+        return bool(text.strip()) and len(text) <= self.max_text_chars
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}{SUFFIX}"
+
+    def _load_index(self):
+        """Scan the directory once, oldest first (caller holds the lock)."""
+        if self._index is not None:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        files = []
+        for p in self.directory.glob(f"*{SUFFIX}"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, p.name[:-len(SUFFIX)], st.st_size))
+        files.sort()
+        self._index = OrderedDict((key, size) for _, key, size in files)
+        self._total = sum(self._index.values())
+
+    def load_index(self):
+        """Scan the directory now instead of on the first lookup (blocking: run at startup)."""
+        with self._lock:
+            self._load_index()
+
+    def touch(self, key: str) -> bool:
+        """Whether key is cached, counted as a lookup; for entries served later by URL."""
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += 1
+                return False
+            self._index.move_to_end(key)
+            self.hits += 1
+        try:
+            os.utime(self._path(key))
+        except OSError:
+            pass
+        return True
+
+    def get(self, key: str, count: bool = True) -> Optional[CachedAudio]:
+        """The entry for key, or None. Close the result (or use it as a context manager)."""
+        with self._lock:
+            self._load_index()
+            if key not in self._index:
+                self.misses += count
+                return None
+            self._index.move_to_end(key)
+        path = self._path(key)
+        try:
+            audio = CachedAudio(path)
+            os.utime(path)
+        except (OSError, ValueError) as e:
+            logger.debug("[tts-cache] dropping unreadable %s: %s", key, e)
+            with self._lock:
+                self._total -= self._index.pop(key, 0)
+                self.misses += count
+            return None
+        with self._lock:
+            self.hits += count
+            self.bytes_served += audio.size
+        return audio
+
+    async def atouch(self, key: str) -> bool:
+        return await asyncio.to_thread(self.touch, key)
+
+    async def aget(self, key: str, count: bool = True) -> Optional[CachedAudio]:
+        """get() in a worker thread: open, mmap and utime stay off the event loop."""
+        return await asyncio.to_thread(self.get, key, count)
+
+    def put(self, key: str, chunks: Iterable[bytes]) -> bool:
+        """Store an entry (blocking disk I/O: call via asyncio.to_thread from the event loop)."""
+        with self._lock:
+            self._load_index()
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                for chunk in chunks:
+                    f.write(_LEN.pack(len(chunk)))
+                    f.write(chunk)
+                size = f.tell()
+            if not size:
+                os.unlink(tmp)
+                return False
+            os.replace(tmp, self._path(key))
+        except OSError as e:
+            logger.warning("[tts-cache] store failed: %s", e)
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            return False
+        with self._lock:
+            self._total += size - self._index.pop(key, 0)
+            self._index[key] = size
+            self.stores += 1
+            victims = []
+            while self._total > self.max_total_bytes and len(self._index) > 1:
+                old, old_size = self._index.popitem(last=False)
+                self._total -= old_size
+                self.evictions += 1
+                victims.append(old)
+        for old in victims:
+            try:
+                self._path(old).unlink()
+            except OSError as e:
+                logger.debug("[tts-cache] could not evict %s: %s", old, e)
+        return True
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            entries = len(self._index) if self._index is not None else None
+            lookups = self.hits + self.misses
+            return {
+                "directory": str(self.directory),
+                "entries": entries,
+                "bytes": self._total,
+                "max_total_bytes": self.max_total_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "stores": self.stores,
+                "evictions": self.evictions,
+                "bytes_served": self.bytes_served,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+AUDIO_CACHE = AudioCache(Path(os.getenv("TTS_CACHE_DIR") or Path(__file__).resolve().parents[1] / "tts_cache"))
@@ -0,0 +1,52 @@
+import struct
+
+# Binary frame protocol for server -> browser TTS audio (control messages stay JSON).
+#
+#   offset  size  field
+#   0       1     version   (FRAME_VERSION)
+#   1       1     format    (FORMAT_*)
+#   2       2     flags     (FLAG_*)
+#   4       4     turn id   (per connection, increments each reply)
+#   8       4     sequence  (per turn, from 0)
+#   12      ...   audio bytes
+#
+# All header fields are big-endian (DataView's default on the client).
+FRAME_VERSION = 1
+FORMAT_WAV = 1    # Murf chunk as received: 24 kHz mono PCM16, first chunk carries a RIFF header
+FLAG_FIRST = 0x1  # first audio frame of the turn
+
+_HEADER = struct.Struct("!BBHII")
+HEADER_SIZE = _HEADER.size
+
+
+def encode_audio_frame(turn_id: int, seq: int, audio: bytes, fmt: int = FORMAT_WAV, flags: int = 0) -> bytes:
+    frame = bytearray(HEADER_SIZE + len(audio))
+    _HEADER.pack_into(frame, 0, FRAME_VERSION, fmt, flags, turn_id & 0xFFFFFFFF, seq & 0xFFFFFFFF)
+    frame[HEADER_SIZE:] = audio
+    return bytes(frame)
+
+
+def decode_audio_frame(frame: bytes) -> tuple[dict, memoryview]:
+    """Parse a frame into (header, payload view); raises ValueError on unknown versions."""
+    version, fmt, flags, turn_id, seq = _HEADER.unpack_from(frame, 0)
+    if version != FRAME_VERSION:
+        raise ValueError(f"unsupported audio frame version {version}")
+    header = {"version": version, "format": fmt, "flags": flags, "turn": turn_id, "seq": seq}
+    return header, memoryview(frame)[HEADER_SIZE:]
+
+
+class TurnAudioFramer:
+    """Frames one turn's Murf audio chunks with consecutive sequence numbers."""
+
+    def __init__(self, turn_id: int, fmt: int = FORMAT_WAV):
+        self.turn_id = turn_id
+        self.format = fmt
+        self.frames = 0
+        self.bytes_out = 0
+
+    def frame(self, audio: bytes) -> bytes:
+        seq = self.frames
+        self.frames += 1
+        frame = encode_audio_frame(self.turn_id, seq, audio, self.format, FLAG_FIRST if seq == 0 else 0)
+        self.bytes_out += len(frame)
+        return frame
@@ -0,0 +1,90 @@
+import threading
+
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2
+# AssemblyAI's v3 streaming API wants 50-1000 ms per message; 50 ms keeps added latency minimal
+PACKET_MS = 50
+
+
+def _ws_header_bytes(payload: int) -> int:
+    """WebSocket framing cost of one client->server frame (base header + length + 4-byte mask)."""
+    if payload < 126:
+        return 2 + 4
+    if payload < 65536:
+        return 4 + 4
+    return 10 + 4
+
+
+class CaptureStats:
+    """Inbound mic frame counters; one per connection, folded into CAPTURE_TOTALS on close."""
+
+    def __init__(self):
+        self.frames_in = 0
+        self.bytes_in = 0
+        self.ws_overhead_bytes = 0
+        self.packets_out = 0
+        self.handling_ns = 0  # server time spent per inbound frame (recording + re-chunk + STT send)
+
+    def merge(self, other: "CaptureStats"):
+        self.frames_in += other.frames_in
+        self.bytes_in += other.bytes_in
+        self.ws_overhead_bytes += other.ws_overhead_bytes
+        self.packets_out += other.packets_out
+        self.handling_ns += other.handling_ns
+
+    def as_dict(self) -> dict:
+        frames = self.frames_in or 1
+        return {
+            "frames_in": self.frames_in,
+            "packets_out": self.packets_out,
+            "avg_frame_bytes": round(self.bytes_in / frames, 1),
+            "avg_frame_ms": round(self.bytes_in / frames / BYTES_PER_SAMPLE / SAMPLE_RATE * 1000, 2),
+            "ws_overhead_pct": round(100 * self.ws_overhead_bytes / (self.bytes_in + self.ws_overhead_bytes), 2) if self.bytes_in else 0.0,
+            "avg_handling_us": round(self.handling_ns / frames / 1000, 2),
+        }
+
+
+class PcmRechunker:
+    """Aggregates small mic frames into fixed-size PCM16 packets for the streaming STT.
+
+    push() returns the complete packets (possibly none); flush() drains the remainder,
+    e.g. when a turn is force-ended so the last words are not held back.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, packet_ms: int = PACKET_MS):
+        self.packet_bytes = sample_rate * BYTES_PER_SAMPLE * packet_ms // 1000
+        self._buf = bytearray()
+        self.stats = CaptureStats()
+
+    def push(self, frame: bytes) -> list[bytes]:
+        st = self.stats
+        st.frames_in += 1
+        st.bytes_in += len(frame)
+        st.ws_overhead_bytes += _ws_header_bytes(len(frame))
+        if not self._buf and len(frame) == self.packet_bytes:
+            packets = [bytes(frame)]  # already the right size: pass through without copying into the buffer
+        else:
+            self._buf += frame
+            n = len(self._buf) // self.packet_bytes * self.packet_bytes
+            packets = [bytes(self._buf[i:i + self.packet_bytes]) for i in range(0, n, self.packet_bytes)]
+            del self._buf[:n]
+        st.packets_out += len(packets)
+        return packets
+
+    def flush(self) -> bytes:
+        # Keep whole samples only; a dangling odd byte would shift every later sample
+        n = len(self._buf) - (len(self._buf) % BYTES_PER_SAMPLE)
+        out = bytes(self._buf[:n])
+        del self._buf[:n]
+        if out:
+            self.stats.packets_out += 1
+        return out
+
+
+_totals_lock = threading.Lock()
+CAPTURE_TOTALS = CaptureStats()
+
+
+def record_capture(stats: CaptureStats):
+    with _totals_lock:
+        CAPTURE_TOTALS.merge(stats)
@@ -0,0 +1,211 @@
+import logging
+import queue
+import threading
+import time
+import wave
+from datetime import datetime
+from pathlib import Path
+from typing import Optional
+
+try:
+    import soundfile  # type: ignore
+except Exception:  # pragma: no cover - optional dependency for FLAC output
+    soundfile = None  # type: ignore
+
+logger = logging.getLogger("voice-agent.recorder")
+
+SAMPLE_RATE = 16000
+FLUSH_BYTES = 64 * 1024          # write once this much audio is buffered for a recording...
+FLUSH_INTERVAL_S = 1.0           # ...or at least this often
+MAX_FILE_BYTES = 50 * 1024 * 1024  # rotate to a new part file beyond this
+MAX_TOTAL_BYTES = 500 * 1024 * 1024  # retention: delete oldest recordings beyond this
+MAX_AGE_S = 7 * 24 * 3600        # retention: delete recordings older than this
+QUEUE_MAX_FRAMES = 4000          # frames beyond this are dropped rather than blocking the receive loop
+
+_CLOSE = object()
+
+
+class Recording:
+    """One session's capture. write() only enqueues; disk I/O happens on the recorder thread."""
+
+    def __init__(self, recorder: "AudioRecorder", base: Path, fmt: str):
+        self.recorder = recorder
+        self.base = base
+        self.format = fmt
+        self.paths: list[Path] = []
+        self.bytes_received = 0
+        self.dropped_frames = 0
+        self.closed = False
+        # Writer-thread state
+        self._pending: list[bytes] = []
+        self._pending_bytes = 0
+        self._last_flush = time.monotonic()
+        self._file = None
+        self._file_bytes = 0
+
+    @property
+    def path(self) -> Optional[Path]:
+        return self.paths[-1] if self.paths else None
+
+    def write(self, data: bytes):
+        self.bytes_received += len(data)
+        try:
+            self.recorder._queue.put_nowait((self, data))
+        except queue.Full:
+            self.dropped_frames += 1
+
+    def close(self):
+        self.closed = True
+        try:
+            self.recorder._queue.put_nowait((self, _CLOSE))
+        except queue.Full:
+            pass  # the writer also finishes closed recordings on its periodic sweep
+
+    # --- writer thread only ---
+    def _open_part(self):
+        part = len(self.paths) + 1
+        suffix = ".flac" if self.format == "flac" else ".wav"
+        path = self.base.with_name(self.base.name + (f"_part{part}" if part > 1 else "") + suffix)
+        if self.format == "flac":
+            self._file = soundfile.SoundFile(str(path), mode="w", samplerate=SAMPLE_RATE, channels=1, format="FLAC", subtype="PCM_16")
+        else:
+            self._file = wave.open(str(path), "wb")
+            self._file.setnchannels(1)
+            self._file.setsampwidth(2)
+            self._file.setframerate(SAMPLE_RATE)
+        self._file_bytes = 0
+        self.paths.append(path)
+
+    def _flush(self):
+        self._last_flush = time.monotonic()
+        if not self._pending:
+            return
+        data = b"".join(self._pending)
+        self._pending.clear()
+        self._pending_bytes = 0
+        if self._file is None or self._file_bytes >= MAX_FILE_BYTES:
+            self._close_file()
+            self._open_part()
+        if self.format == "flac":
+            self._file.buffer_write(data, dtype="int16")
+        else:
+            self._file.writeframesraw(data)
+        self._file_bytes += len(data)
+
+    def _close_file(self):
+        if self._file is not None:
+            self._file.close()  # wave patches the RIFF/data sizes here
+            self._file = None
+
+
+class AudioRecorder:
+    """Background writer for session audio with batched flushes, rotation and retention.
+
+    Recordings are stored as 16 kHz mono PCM16 WAV (or FLAC when `soundfile` is
+    installed and fmt="flac"). Oldest files are pruned beyond MAX_TOTAL_BYTES or MAX_AGE_S.
+    """
+
+    def __init__(self, directory: Path, fmt: str = "wav", max_total_bytes: int = MAX_TOTAL_BYTES, max_age_s: float = MAX_AGE_S):
+        if fmt == "flac" and soundfile is None:
+            logger.warning("soundfile not installed; recording WAV instead of FLAC")
+            fmt = "wav"
+        self.directory = directory
+        self.format = fmt
+        self.max_total_bytes = max_total_bytes
+        self.max_age_s = max_age_s
+        self._queue: queue.Queue = queue.Queue(maxsize=QUEUE_MAX_FRAMES)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._open: set[Recording] = set()
+        self.recordings_started = 0
+        self.files_pruned = 0
+
+    def start(self, session_id: str) -> Recording:
+        """Begin a recording for a session (starts the writer thread on first use)."""
+        self.directory.mkdir(exist_ok=True)
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="audio-recorder", daemon=True)
+                self._thread.start()
+            self.recordings_started += 1
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        return Recording(self, self.directory / f"rec_{stamp}_{session_id[:8]}", self.format)
+
+    def stop(self, timeout: float = 5.0):
+        """Flush and close everything (process shutdown)."""
+        if self._thread and self._thread.is_alive():
+            self._queue.put((None, _CLOSE))
+            self._thread.join(timeout)
+
+    def _run(self):
+        self._enforce_retention()
+        while True:
+            try:
+                rec, data = self._queue.get(timeout=FLUSH_INTERVAL_S)
+            except queue.Empty:
+                rec, data = None, None
+            try:
+                if rec is None and data is _CLOSE:
+                    for open_rec in list(self._open):
+                        self._finish(open_rec)
+                    return
+                if rec is not None and data is _CLOSE:
+                    self._finish(rec)
+                    self._enforce_retention()
+                elif rec is not None:
+                    self._open.add(rec)
+                    rec._pending.append(data)
+                    rec._pending_bytes += len(data)
+                    if rec._pending_bytes >= FLUSH_BYTES:
+                        rec._flush()
+                now = time.monotonic()
+                for open_rec in list(self._open):
+                    if open_rec.closed and self._queue.empty():
+                        # Its close marker was dropped on a full queue; all its frames are written by now
+                        self._finish(open_rec)
+                    elif now - open_rec._last_flush >= FLUSH_INTERVAL_S:
+                        open_rec._flush()
+            except Exception as e:
+                logger.error("Recorder write failed: %s", e)
+
+    def _finish(self, rec: Recording):
+        self._open.discard(rec)
+        try:
+            rec._flush()
+        finally:
+            rec._close_file()
+        if rec.dropped_frames:
+            logger.warning("Recording %s dropped %d frames (writer backlog)", rec.base.name, rec.dropped_frames)
+
+    def _enforce_retention(self):
+        """Delete recordings older than max_age_s, then oldest-first beyond max_total_bytes."""
+        open_paths = {p for r in self._open for p in r.paths}
+        files = []
+        for p in self.directory.glob("rec_*"):
+            try:
+                st = p.stat()
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+        files.sort()
+        now = time.time()
+        total = sum(size for _, size, _ in files)
+        for mtime, size, p in files:
+            if p in open_paths:
+                continue
+            if now - mtime > self.max_age_s or total > self.max_total_bytes:
+                try:
+                    p.unlink()
+                    total -= size
+                    self.files_pruned += 1
+                except OSError as e:
+                    logger.debug("Could not prune %s: %s", p, e)
+
+    def stats(self) -> dict:
+        return {
+            "format": self.format,
+            "open_recordings": len(self._open),
+            "recordings_started": self.recordings_started,
+            "queued_frames": self._queue.qsize(),
+            "files_pruned": self.files_pruned,
+        }
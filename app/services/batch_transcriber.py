@@ -0,0 +1,222 @@
+"""Batch transcription for backfills: many files, bounded concurrency, results as they finish.
+
+CLI (from app/):
+    python -m services.batch_transcriber uploads/rec_*.pcm uploads/rec_*.wav \\
+        --concurrency 8 --checkpoint backfill.ndjson > transcripts.ndjson
+
+Each finished file is one NDJSON line; a final {"event": "done", ...} line has the totals.
+With --checkpoint, completed results are appended to that file and files already in it are
+not sent again (matched by audio content), so an interrupted backfill resumes where it stopped.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import io
+import json
+import logging
+import sys
+import time
+import wave
+from pathlib import Path
+from typing import Any, AsyncIterator, Iterable, Optional, TextIO
+
+import httpx
+from fastapi import HTTPException
+
+from .stt_service import submit_transcription, wait_for_transcript
+
+logger = logging.getLogger("voice-agent.stt-batch")
+
+BATCH_CONCURRENCY = 4          # default jobs in flight per batch
+# Jobs in flight across all batches in this process: the AssemblyAI account limit also
+# has to cover interactive transcription (stt_service.MAX_CONCURRENT_JOBS)
+MAX_BATCH_JOBS = 16
+BATCH_JOB_TIMEOUT_S = 900.0    # recordings are long; the interactive TRANSCRIBE_TIMEOUT is not
+PCM_SAMPLE_RATE = 16000        # raw .pcm recordings: 16-bit mono, as the /ws path captures them
+AUDIO_SUFFIXES = frozenset({".wav", ".pcm", ".flac", ".mp3", ".m4a", ".ogg", ".webm"})
+
+_batch_slots = asyncio.Semaphore(MAX_BATCH_JOBS)
+
+
+def load_audio(path: Path, pcm_rate: int = PCM_SAMPLE_RATE) -> bytes:
+    """File bytes ready for upload; headerless PCM is wrapped in a WAV container."""
+    data = path.read_bytes()
+    if path.suffix.lower() != ".pcm":
+        return data
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(pcm_rate)
+        w.writeframes(data[:len(data) - len(data) % 2])
+    return buf.getvalue()
+
+
+def expand_paths(patterns: Iterable[str], base: Optional[Path] = None) -> list[Path]:
+    """Resolve paths/globs (relative to base if given) to audio files, sorted, deduplicated.
+
+    With base set, anything resolving outside it raises ValueError.
+    """
+    root = base.resolve() if base else None
+    found: dict[Path, None] = {}
+    for pattern in patterns:
+        full = str(root / pattern) if root and not Path(pattern).is_absolute() else pattern
+        for match in sorted(glob.glob(full)) or ([full] if not glob.has_magic(full) else []):
+            p = Path(match).resolve()
+            if root and not p.is_relative_to(root):
+                raise ValueError(f"{pattern}: outside {root}")
+            if p.is_file() and p.suffix.lower() in AUDIO_SUFFIXES:
+                found[p] = None
+    return list(found)
+
+
+def load_checkpoint(path: Path) -> dict[str, dict]:
+    """Completed results from an earlier run, keyed by audio content id."""
+    done: dict[str, dict] = {}
+    if not path.exists():
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line of an interrupted run
+            if rec.get("status") == "completed" and rec.get("id"):
+                done[rec["id"]] = rec
+    return done
+
+
+async def _transcribe(audio: bytes, api_key: Optional[str], timeout: float) -> str:
+    # Same retry policy as resilient_transcribe, but on the batch slots instead of its job
+    # slots: a backfill must not queue interactive /transcribe/file requests behind it
+    async def attempt() -> str:
+        try:
+            transcript_id = await submit_transcription(audio, api_key=api_key)
+            return await wait_for_transcript(transcript_id, api_key=api_key, timeout=timeout)
+        except httpx.HTTPError as e:
+            raise HTTPException(status_code=500, detail=f"AssemblyAI request failed: {e}")
+
+    async with _batch_slots:
+        try:
+            return await attempt()
+        except HTTPException as e:
+            if e.detail == "Transcription timeout":
+                raise
+            logger.warning("Batch job failed (%s); retrying once", e.detail)
+        return await attempt()
+
+
+async def _run_job(name: str, path: Path, done: dict[str, dict], api_key: Optional[str], timeout: float, pcm_rate: int) -> dict[str, Any]:
+    started = time.monotonic()
+    rec: dict[str, Any] = {"event": "result", "source": name}
+    try:
+        audio = await asyncio.to_thread(load_audio, path, pcm_rate)
+        rec["id"] = hashlib.blake2b(audio, digest_size=12).hexdigest()
+        rec["audio_bytes"] = len(audio)
+        if rec["id"] in done:
+            return {**done[rec["id"]], "source": name, "resumed": True}
+        rec["text"] = await _transcribe(audio, api_key, timeout)
+        rec["status"] = "completed"
+    except Exception as e:
+        rec["status"] = "error"
+        rec["error"] = e.detail if isinstance(e, HTTPException) else f"{type(e).__name__}: {e}"
+    rec["seconds"] = round(time.monotonic() - started, 3)
+    return rec
+
+
+def _open_checkpoint(path: Path) -> TextIO:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    return open(path, "a", encoding="utf-8")
+
+
+def _append_checkpoint(f: TextIO, rec: dict[str, Any]):
+    f.write(json.dumps(rec) + "\n")
+    f.flush()
+
+
+async def transcribe_batch(
+    sources: Iterable[tuple[str, Path]],
+    concurrency: int = BATCH_CONCURRENCY,
+    api_key: Optional[str] = None,
+    checkpoint: Optional[Path] = None,
+    timeout: float = BATCH_JOB_TIMEOUT_S,
+    pcm_rate: int = PCM_SAMPLE_RATE,
+) -> AsyncIterator[dict[str, Any]]:
+    """Transcribe (name, path) sources with at most `concurrency` jobs in flight
+    (and at most MAX_BATCH_JOBS across all batches running in this process).
+
+    Yields one result per source in completion order, then a "done" summary. Closing
+    the iterator early (client gone) cancels the jobs still running.
+    """
+    done = await asyncio.to_thread(load_checkpoint, checkpoint) if checkpoint else {}
+    todo: asyncio.Queue = asyncio.Queue()
+    for source in sources:
+        todo.put_nowait(source)
+    total = todo.qsize()
+    results: asyncio.Queue = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                name, path = todo.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            results.put_nowait(await _run_job(name, path, done, api_key, timeout, pcm_rate))
+
+    started = time.monotonic()
+    n_workers = min(max(1, min(concurrency, MAX_BATCH_JOBS)), total)
+    workers = [asyncio.create_task(worker(), name="stt-batch") for _ in range(n_workers)]
+    counts = {"completed": 0, "error": 0, "resumed": 0}
+    ckpt = None
+    try:
+        if checkpoint:
+            ckpt = await asyncio.to_thread(_open_checkpoint, checkpoint)
+        for _ in range(total):
+            rec = await results.get()
+            counts["resumed" if rec.get("resumed") else rec["status"]] += 1
+            if ckpt and rec["status"] == "completed" and not rec.get("resumed"):
+                await asyncio.to_thread(_append_checkpoint, ckpt, rec)
+            yield rec
+        yield {"event": "done", "files": total, **counts, "seconds": round(time.monotonic() - started, 3)}
+    finally:
+        for task in workers:
+            task.cancel()
+        if ckpt:
+            ckpt.close()  # already flushed per record, so this never waits on the disk
+
+
+async def _cli(args) -> int:
+    paths = expand_paths(args.paths)
+    if not paths:
+        print("no audio files matched", file=sys.stderr)
+        return 2
+    failed = 0
+    async for rec in transcribe_batch(
+        ((str(p), p) for p in paths), concurrency=args.concurrency,
+        checkpoint=Path(args.checkpoint) if args.checkpoint else None,
+        timeout=args.timeout, pcm_rate=args.pcm_rate,
+    ):
+        print(json.dumps(rec), flush=True)
+        if rec.get("status") == "error":
+            failed += 1
+    return 1 if failed else 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    ap = argparse.ArgumentParser(prog="python -m services.batch_transcriber", description=__doc__,
+                                 formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("paths", nargs="+", help="audio files or glob patterns (.wav, .pcm, .flac, ...)")
+    ap.add_argument("--concurrency", type=int, default=BATCH_CONCURRENCY)
+    ap.add_argument("--checkpoint", help="NDJSON file to resume from and append completed results to")
+    ap.add_argument("--timeout", type=float, default=BATCH_JOB_TIMEOUT_S, help="per-file transcription timeout (s)")
+    ap.add_argument("--pcm-rate", type=int, default=PCM_SAMPLE_RATE, help="sample rate of raw .pcm files")
+    logging.basicConfig(level=logging.WARNING, format="%(asctime)s | %(levelname)s | %(name)s | %(message)s")
+    return asyncio.run(_cli(ap.parse_args(argv)))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
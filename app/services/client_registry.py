@@ -0,0 +1,69 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger("voice-agent.registry")
+
+
+class ClientRegistry:
+    """Thread-safe LRU of long-lived SDK clients keyed by credentials + configuration.
+
+    Lets per-session API key overrides reuse their own client objects instead of
+    rebuilding them every call or reconfiguring process-global SDK state.
+    """
+
+    def __init__(self, name: str, max_size: int = 32, on_evict: Optional[Callable[[Any], None]] = None):
+        self.name = name
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """Return the cached client for key, building it with factory() on a miss.
+
+        factory() runs outside the lock, so a slow build never stalls lookups for other
+        keys; if two callers race on the same key, the first one stored wins and the
+        other client is discarded. Factory errors propagate and nothing is cached.
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                self.hits += 1
+                return self._items[key]
+            self.misses += 1
+        built = factory()
+        evicted = []
+        with self._lock:
+            client = self._items.get(key)
+            if client is None:
+                client = self._items[key] = built
+            else:
+                evicted.append(built)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                evicted.append(self._items.popitem(last=False)[1])
+                self.evictions += 1
+        for old in evicted:
+            if self.on_evict:
+                try:
+                    self.on_evict(old)
+                except Exception as e:
+                    logger.debug("[%s] evict hook failed: %s", self.name, e)
+        return client
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import logging
+import re
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Optional
+
+if TYPE_CHECKING:
+    from .session_store import SessionBackend
+
+logger = logging.getLogger("voice-agent.context")
+
+CONTEXT_TOKEN_BUDGET = 1200   # history tokens sent per request (persona and tool schemas not included)
+MAX_CONTEXT_MESSAGES = 8      # never more than this many history messages, however short
+MAX_MESSAGE_TOKENS = 400      # older messages (long answers, pasted text) are clipped to this
+MESSAGE_OVERHEAD = 4          # role and framing tokens per message
+SUMMARY_MIN_TOKENS = 120      # fold once at least this much has left the window
+MAX_FOLDED_FINGERPRINTS = 64  # messages remembered as already in a summary
+
+_PIECE = re.compile(r"\w+|[^\w\s]")
+
+
+@lru_cache(maxsize=8192)
+def estimate_tokens(text: str) -> int:
+    """Approximate tokenizer count: a token per punctuation mark, one per ~4 chars of a word."""
+    return sum((len(p) + 3) // 4 for p in _PIECE.findall(text))
+
+
+def message_tokens(msg: dict) -> int:
+    # Messages recur every turn until they leave the window, so the estimate is cached by content
+    return MESSAGE_OVERHEAD + estimate_tokens(msg.get("content") or "")
+
+
+@lru_cache(maxsize=1024)
+def _clip_text(text: str, max_tokens: int) -> str:
+    used = 0
+    for m in _PIECE.finditer(text):
+        used += (m.end() - m.start() + 3) // 4
+        if used > max_tokens:
+            return text[:m.start()].rstrip() + " ..."
+    return text
+
+
+def _clip(msg: dict, max_tokens: int) -> dict:
+    content = msg.get("content") or ""
+    if estimate_tokens(content) <= max_tokens:
+        return msg
+    return {**msg, "content": _clip_text(content, max_tokens)}
+
+
+class ContextWindow:
+    """Picks the history that goes into a prompt: newest first, within a token budget.
+
+    The newest message is always kept whole; older ones are clipped to
+    max_message_tokens and dropped once the budget or max_messages is reached.
+    """
+
+    def __init__(self, budget_tokens: int = CONTEXT_TOKEN_BUDGET, max_messages: int = MAX_CONTEXT_MESSAGES, max_message_tokens: int = MAX_MESSAGE_TOKENS):
+        self.budget_tokens = budget_tokens
+        self.max_messages = max_messages
+        self.max_message_tokens = max_message_tokens
+
+    def split(self, history: list[dict], reserved_tokens: int = 0, budget_tokens: Optional[int] = None, max_messages: Optional[int] = None) -> tuple[list[dict], list[dict]]:
+        """(older, recent): recent is what fits, in order; older is everything before it."""
+        budget = (self.budget_tokens if budget_tokens is None else budget_tokens) - reserved_tokens
+        limit = self.max_messages if max_messages is None else max_messages
+        recent: list[dict] = []
+        used = 0
+        for i in range(len(history) - 1, -1, -1):
+            msg = history[i] if not recent else _clip(history[i], self.max_message_tokens)
+            cost = message_tokens(msg)
+            if recent and (used + cost > budget or len(recent) >= limit):
+                return history[:i + 1], recent[::-1]
+            recent.append(msg)
+            used += cost
+        return [], recent[::-1]
+
+    def fit(self, history: list[dict], reserved_tokens: int = 0) -> list[dict]:
+        return self.split(history, reserved_tokens)[1]
+
+
+def _fingerprint(msg: dict) -> str:
+    return hashlib.blake2b(f"{msg.get('role')}\x1f{msg.get('content')}".encode(), digest_size=8).hexdigest()
+
+
+class RollingSummaries:
+    """Per-session running summary of the turns that fell out of the context window.
+
+    schedule() runs after a reply has gone out: if enough history has left the
+    window since the last fold, the summary is updated in a background task (one at
+    a time per session and process), so summarization never sits on a turn's critical
+    path. The fold window is a little tighter than the prompt window, so a message is
+    in the summary before it stops being sent verbatim. The summary and the
+    fingerprints of what it covers live in the session backend, next to the history,
+    so every worker sharing that backend sends the same summary.
+    """
+
+    def __init__(self, window: ContextWindow, store: "SessionBackend", min_tokens: int = SUMMARY_MIN_TOKENS):
+        self.window = window
+        self.store = store
+        self.min_tokens = min_tokens
+        self._folding: dict[str, asyncio.Task] = {}
+        self.folds = 0
+        self.failures = 0
+        self.tokens_folded = 0
+
+    async def get(self, session_id: str) -> Optional[str]:
+        record = await self.store.get_summary(session_id)
+        return record.get("text") if record else None
+
+    def schedule(self, session_id: str, history: list[dict], summarize: Callable[[Optional[str], list[dict]], Awaitable[str]]):
+        """Fold newly out-of-window messages into the summary in the background, if worth it."""
+        older, _ = self.window.split(
+            history, budget_tokens=self.window.budget_tokens * 3 // 4, max_messages=max(2, self.window.max_messages - 2)
+        )
+        if not older or session_id in self._folding:
+            return
+        task = asyncio.create_task(self._fold(session_id, older, summarize), name="context-summary")
+        self._folding[session_id] = task
+        task.add_done_callback(lambda _t: self._folding.pop(session_id, None))
+
+    async def _fold(self, session_id: str, older: list[dict], summarize):
+        try:
+            record = await self.store.get_summary(session_id) or {}
+            folded = set(record.get("folded") or ())
+            pending = [m for m in older if _fingerprint(m) not in folded]
+            if sum(message_tokens(m) for m in pending) < self.min_tokens:
+                return
+            text = (await summarize(record.get("text"), [_clip(m, self.window.max_message_tokens) for m in pending])).strip()
+            if not text:
+                raise ValueError("empty summary")
+            fingerprints = (list(record.get("folded") or ()) + [_fingerprint(m) for m in pending])[-MAX_FOLDED_FINGERPRINTS:]
+            await self.store.set_summary(session_id, {"text": text, "folded": fingerprints})
+        except Exception as e:
+            self.failures += 1
+            logger.warning("[context] summary for %s failed: %s", session_id[:8], e)
+            return
+        folded_tokens = sum(message_tokens(m) for m in pending)
+        self.folds += 1
+        self.tokens_folded += folded_tokens
+        logger.info("[context] %s: folded %d messages (~%d tokens) into a ~%d-token summary",
+                    session_id[:8], len(pending), folded_tokens, estimate_tokens(text))
+
+    def stats(self) -> dict[str, Any]:
+        cache = estimate_tokens.cache_info()
+        return {
+            "folding": len(self._folding),
+            "folds": self.folds,
+            "failures": self.failures,
+            "tokens_folded": self.tokens_folded,
+            "budget_tokens": self.window.budget_tokens,
+            "token_estimate_cache": {"hits": cache.hits, "misses": cache.misses, "size": cache.currsize},
+        }
@@ -0,0 +1,75 @@
+import logging
+import threading
+from urllib.parse import urlsplit
+
+import httpx
+
+logger = logging.getLogger("voice-agent.http")
+
+# Pool knobs: connections are capped per upstream host (one client per host)
+MAX_CONNECTIONS_PER_HOST = 20
+MAX_KEEPALIVE_PER_HOST = 10
+KEEPALIVE_EXPIRY_S = 30.0
+DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=10.0, pool=5.0)
+
+
+class HttpPool:
+    """Shared keep-alive HTTP clients for every REST upstream (Murf, OpenWeather, AssemblyAI).
+
+    One httpx client per scheme+host, so each host gets its own connection cap and
+    warm TLS connections are reused across requests instead of re-handshaking.
+    """
+
+    def __init__(self, max_connections_per_host: int = MAX_CONNECTIONS_PER_HOST, max_keepalive_per_host: int = MAX_KEEPALIVE_PER_HOST, keepalive_expiry: float = KEEPALIVE_EXPIRY_S, timeout: httpx.Timeout = DEFAULT_TIMEOUT):
+        self.limits = httpx.Limits(
+            max_connections=max_connections_per_host,
+            max_keepalive_connections=max_keepalive_per_host,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.timeout = timeout
+        self._async: dict[str, httpx.AsyncClient] = {}
+        self._sync: dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def async_client(self, url: str) -> httpx.AsyncClient:
+        """Pooled async client for url's host (for coroutines on the server's event loop)."""
+        origin = self._origin(url)
+        with self._lock:
+            client = self._async.get(origin)
+            if client is None or client.is_closed:
+                client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+                self._async[origin] = client
+            return client
+
+    def sync_client(self, url: str) -> httpx.Client:
+        """Pooled blocking client for url's host (for code running in worker threads)."""
+        origin = self._origin(url)
+        with self._lock:
+            client = self._sync.get(origin)
+            if client is None or client.is_closed:
+                client = httpx.Client(limits=self.limits, timeout=self.timeout)
+                self._sync[origin] = client
+            return client
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"async_hosts": sorted(self._async), "sync_hosts": sorted(self._sync)}
+
+    async def aclose(self):
+        with self._lock:
+            async_clients = list(self._async.values())
+            sync_clients = list(self._sync.values())
+            self._async.clear()
+            self._sync.clear()
+        for client in async_clients:
+            await client.aclose()
+        for client in sync_clients:
+            client.close()
+
+
+HTTP_POOL = HttpPool()
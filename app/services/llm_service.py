@@ -1,8 +1,17 @@
 import os
+import json
+import asyncio
 import logging
 import time
+from concurrent.futures import ThreadPoolExecutor
 import google.generativeai as genai
-from typing import Any, Dict, Optional, TYPE_CHECKING
+from google.generativeai import client as genai_client
+from typing import Any, AsyncIterator, Dict, Optional, TYPE_CHECKING
+
+from .client_registry import ClientRegistry
+from .context_window import ContextWindow, estimate_tokens
+from .metrics import TOOL_CALLS, TOOL_LATENCY, UPSTREAM_ERRORS, current_trace, mark
+from .response_cache import ResponseCache
 
 if TYPE_CHECKING:
     from .web_search_service import TavilySearch  # pragma: no cover
@@ -24,10 +33,22 @@ GENERATION_CONFIG = {
     "top_k": 40,
     "max_output_tokens": 512,
 }
+# Per model step (one generate call, streamed or not); tool round-trips get their own step
+LLM_STEP_TIMEOUT_S = 20.0
+# Whole turn (all model steps + tools); tools must leave ANSWER_RESERVE_S for the final answer
+TURN_BUDGET_S = 30.0
+ANSWER_RESERVE_S = 6.0
+# Per-tool deadlines; a tool that overruns answers with a structured timeout result
+TOOL_TIMEOUTS_S = {"web_search": 8.0, "get_weather": 4.0}
+DEFAULT_TOOL_TIMEOUT_S = 6.0
+# Bounded pool for blocking tool HTTP calls (a timed-out call finishes here without holding the turn)
+_TOOL_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-tool")
 
 logger = logging.getLogger("voice-agent.llm")
 
 API_KEY = os.getenv("GEMINI_API_KEY")
+# host:port of a plaintext gRPC stand-in for Gemini (benchmarks/fake_upstreams.py); unset in production
+GEMINI_ENDPOINT = os.getenv("GEMINI_ENDPOINT")
 _configured = False
 if not API_KEY:
     logger.warning("GEMINI_API_KEY not set at import; will retry on first request.")
@@ -55,13 +76,86 @@ def get_chanakya_persona() -> str:
         "For weather questions, call the get_weather tool to fetch accurate current conditions before answering.",
     ])
 
+# Process-wide caches shared by every GeminiClient: tool-aware models and tool clients per API key
+MODEL_REGISTRY = ClientRegistry("gemini-models", max_size=32)
+TOOL_REGISTRY = ClientRegistry("tool-clients", max_size=64)
+# Replies to repeated persona questions (never tool-assisted turns); keyed with the last exchange
+RESPONSE_CACHE = ResponseCache(max_entries=1024, ttl_s=6 * 3600.0, threshold=0.75, history_messages=2)
+# History sent with each request is token-budgeted; what falls out is folded into per-session summaries
+CONTEXT_WINDOW = ContextWindow()
+SUMMARY_TIMEOUT_S = 15.0
+SUMMARY_INSTRUCTION = (
+    "You maintain a running summary of a conversation between a user and Chanakya, a voice assistant. "
+    "Merge the new messages into the existing summary. Keep names, facts, preferences, decisions and open "
+    "questions; drop greetings and filler. Write at most 120 words of plain prose, no lists."
+)
+
+
+def _build_model(api_key: str, model_name: str, tools_json: str, system_instruction: str) -> genai.GenerativeModel:
+    """Tool-aware model bound to its own SDK client manager, so per-key models never
+    touch (or race on) the process-global genai.configure() state.
+
+    The SDK has no public per-model client option, so this relies on its internals;
+    requirements.txt pins the version it was checked against.
+    """
+    manager = genai_client._ClientManager()
+    manager.configure(api_key=api_key)
+    model = genai.GenerativeModel(
+        model_name,
+        generation_config=GENERATION_CONFIG,
+        tools=json.loads(tools_json),
+        system_instruction=system_instruction,
+    )
+    model._client = _endpoint_client(False) if GEMINI_ENDPOINT else manager.get_default_client("generative")
+    # grpc.aio channels bind to the running loop; the async client is created on first async use
+    model._va_client_manager = manager
+    return model
+
+
+def _endpoint_client(use_async: bool):
+    """Generative client on an insecure channel to GEMINI_ENDPOINT; the SDK's own
+    channels always use TLS and credentials, which a local fake can't satisfy."""
+    import grpc
+    from google.ai import generativelanguage_v1beta as glm
+    from google.ai.generativelanguage_v1beta.services.generative_service import transports
+
+    if use_async:
+        channel = grpc.aio.insecure_channel(GEMINI_ENDPOINT)
+        return glm.GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=channel))
+    channel = grpc.insecure_channel(GEMINI_ENDPOINT)
+    return glm.GenerativeServiceClient(transport=transports.GenerativeServiceGrpcTransport(channel=channel))
+
+
+_TOOL_UPSTREAMS = {"web_search": "tavily", "get_weather": "openweather"}
+
+
+class WholeReply(str):
+    """A reply streamed as a single, final fragment (cache hit or canned message).
+
+    Consumers may treat its text as the complete answer before the stream ends, e.g. to
+    look up already synthesized audio for it.
+    """
+
+
+def _record_tool(name: str, started: float, outcome: str):
+    """Tool call metrics, plus a span on the current turn's trace when there is one."""
+    elapsed = time.monotonic() - started
+    TOOL_CALLS.inc(tool=name, outcome=outcome)
+    TOOL_LATENCY.observe(elapsed, tool=name)
+    if outcome != "ok":
+        UPSTREAM_ERRORS.inc(upstream=_TOOL_UPSTREAMS.get(name, name))
+    trace = current_trace.get()
+    if trace is not None:
+        trace.span(f"tool:{name}", started, elapsed)
+
+
 class GeminiClient:
     def __init__(self, model_name: str = MODEL_NAME):
         self.model_name = model_name
         self._model = genai.GenerativeModel(model_name, generation_config=GENERATION_CONFIG)
         self._tools = self._build_tools()
-        self._tavily = None  # TavilySearch instance, created lazily
-        self._weather = None  # OpenWeather instance, created lazily
+        self._tools_json = json.dumps(self._tools, sort_keys=True)
+        self._system_instruction = get_chanakya_persona()
 
     def _build_tools(self) -> list[dict[str, Any]]:
         """Define available tools (function-calling)."""
@@ -108,21 +202,20 @@ class GeminiClient:
             }
         ]
 
-    def _ensure_tavily(self) -> Optional["TavilySearch"]:
-        if self._tavily is None and TavilySearch is not None:
-            try:
-                self._tavily = TavilySearch()
-            except Exception as e:
-                logger.warning("Tavily unavailable: %s", e)
-        return self._tavily
-
-    def _ensure_weather(self) -> Optional["OpenWeather"]:
-        if self._weather is None and OpenWeather is not None:
-            try:
-                self._weather = OpenWeather()
-            except Exception as e:
-                logger.warning("OpenWeather unavailable: %s", e)
-        return self._weather
+    @staticmethod
+    def _tool_client(kind: str, cls: Any, api_key: Optional[str], env_var: str) -> Any:
+        """Shared tool client for api_key (or the server key from env_var); None if unavailable."""
+        if cls is None:
+            return None
+        key = api_key or os.getenv(env_var)
+        if not key:
+            logger.warning("%s unavailable: %s is not set", kind, env_var)
+            return None
+        try:
+            return TOOL_REGISTRY.get_or_create((kind, key), lambda: cls(api_key=key))
+        except Exception as e:
+            logger.warning("%s unavailable: %s", kind, e)
+            return None
 
     def generate(self, prompt: str) -> str:
         global API_KEY, _configured
@@ -158,140 +251,257 @@ class GeminiClient:
                 time.sleep(0.4 * attempt)
         return "Sorry, I couldn't process that right now. Please try rephrasing."
 
-    def chat(self, user_text: str, history: Optional[list[dict[str, str]]] = None, overrides: Optional[Dict[str, str]] = None) -> str:
-        """Chat with optional tool use and per-call API key overrides.
+    @staticmethod
+    def _api_key(overrides: Dict[str, str]) -> Optional[str]:
+        """Gemini key for this call (override key takes precedence)."""
+        override_key = overrides.get("GEMINI_API_KEY") if isinstance(overrides, dict) else None
+        return override_key or API_KEY or os.getenv("GEMINI_API_KEY")
 
-        history: list of {role: 'user'|'assistant', content: str}
-        overrides: optional dict with keys like GEMINI_API_KEY, TAVILY_API_KEY, OPENWEATHER_API_KEY
-        """
-        global API_KEY, _configured
+    def _tool_clients(self, overrides: Dict[str, str]) -> tuple[Optional["TavilySearch"], Optional["OpenWeather"]]:
+        """Tool clients for this call (allow per-call overrides)."""
+        tavily = self._tool_client("Tavily", TavilySearch, overrides.get("TAVILY_API_KEY"), "TAVILY_API_KEY")
+        weather = self._tool_client("OpenWeather", OpenWeather, overrides.get("OPENWEATHER_API_KEY"), "OPENWEATHER_API_KEY")
+        return tavily, weather
 
-        overrides = overrides or {}
-        # Configure Gemini (override key takes precedence)
-        override_key = overrides.get("GEMINI_API_KEY") if isinstance(overrides, dict) else None
-        if override_key:
-            try:
-                genai.configure(api_key=override_key)
-                _configured = True
-                API_KEY = override_key
-            except Exception as e:
-                logger.error("Override Gemini config failed: %s", e)
-        if not _configured:
-            api = API_KEY or os.getenv("GEMINI_API_KEY")
-            if api:
+    def _tool_model(self, api_key: str) -> genai.GenerativeModel:
+        """Cached tool-aware model with persona as system instruction."""
+        key = (api_key, self.model_name, self._tools_json, self._system_instruction)
+        return MODEL_REGISTRY.get_or_create(
+            key, lambda: _build_model(api_key, self.model_name, self._tools_json, self._system_instruction)
+        )
+
+    @staticmethod
+    def _build_contents(user_text: str, history: Optional[list[dict[str, str]]], summary: Optional[str] = None) -> list[dict[str, Any]]:
+        msgs = list(history or [])
+        if not (msgs and msgs[-1].get("role") == "user" and msgs[-1].get("content") == user_text):
+            msgs.append({"role": "user", "content": user_text})
+        contents: list[dict[str, Any]] = []
+        if summary:
+            contents.append({"role": "user", "parts": [{"text": f"(Summary of our earlier conversation, for context: {summary})"}]})
+        for msg in CONTEXT_WINDOW.fit(msgs, reserved_tokens=estimate_tokens(summary) if summary else 0):
+            role = "model" if msg.get("role") == "assistant" else "user"
+            contents.append({"role": role, "parts": [{"text": msg.get("content", "")}]})
+        return contents
+
+    @staticmethod
+    def _async_ready(model: genai.GenerativeModel) -> genai.GenerativeModel:
+        if model._async_client is None:
+            model._async_client = _endpoint_client(True) if GEMINI_ENDPOINT else model._va_client_manager.get_default_client("generative_async")
+        return model
+
+    @staticmethod
+    def _split_parts(response: Any) -> tuple[str, list[Any]]:
+        """Return (text, function_calls) found in a response or stream chunk."""
+        texts: list[str] = []
+        calls: list[Any] = []
+        try:
+            for cand in getattr(response, "candidates", []) or []:
+                parts = getattr(getattr(cand, "content", cand), "parts", [])
+                for p in parts:
+                    fc = getattr(p, "function_call", None) or getattr(p, "functionCall", None)
+                    if fc:
+                        calls.append(fc)
+                    elif getattr(p, "text", None):
+                        texts.append(p.text)
+        except Exception:
+            calls = getattr(response, "function_calls", None) or []
+        return "".join(texts), calls
+
+    @staticmethod
+    def _invoke_tool(call: Any, tavily: Optional["TavilySearch"], weather: Optional["OpenWeather"]) -> Dict[str, Any]:
+        fn_name = getattr(call, "name", "")
+        args = getattr(call, "args", {}) or {}
+        tool_output: Dict[str, Any] = {"error": "tool not found"}
+        if fn_name == "web_search":
+            q = args.get("query", "")
+            mr = args.get("max_results") or 5
+            logger.info("[Tool] web_search query=%r max_results=%s", q, mr)
+            if tavily is None:
+                tool_output = {"error": "Tavily not configured. Set TAVILY_API_KEY and install tavily-python."}
+            else:
+                tool_output = tavily.search(q, mr)
                 try:
-                    genai.configure(api_key=api)
-                    _configured = True
-                except Exception as e:
-                    logger.error("Late Gemini config failed: %s", e)
-            if not _configured:
-                return "LLM API key missing. Configure GEMINI_API_KEY."
+                    logger.info("[Tool] web_search results=%d has_answer=%s", len(tool_output.get('results', [])), bool(tool_output.get('answer')))
+                except Exception:
+                    pass
+        elif fn_name == "get_weather":
+            loc, units = GeminiClient._weather_args(args)
+            if weather is None:
+                tool_output = {"error": "OpenWeather not configured. Set OPENWEATHER_API_KEY."}
+            else:
+                tool_output = weather.current_weather(loc, units)
+        return tool_output
 
-        # Tool clients (allow per-call overrides)
-        tavily: Optional["TavilySearch"]
-        weather: Optional["OpenWeather"]
-        if overrides.get("TAVILY_API_KEY") and TavilySearch is not None:
-            try:
-                tavily = TavilySearch(api_key=overrides.get("TAVILY_API_KEY"))
-            except Exception as e:
-                logger.warning("Tavily override unavailable: %s", e)
-                tavily = None
-        else:
-            tavily = self._ensure_tavily()
-        if overrides.get("OPENWEATHER_API_KEY") and OpenWeather is not None:
+    @staticmethod
+    def _weather_args(args: Dict[str, Any]) -> tuple[str, str]:
+        loc = args.get("location", "")
+        units = (args.get("units") or "metric").lower()
+        logger.info("[Tool] get_weather location=%r units=%s", loc, units)
+        return loc, units
+
+    @staticmethod
+    def _tool_limit(fn_name: str, deadline: float) -> float:
+        """Seconds this tool may run: its own timeout, capped by what's left of the tool budget."""
+        return max(0.0, min(TOOL_TIMEOUTS_S.get(fn_name, DEFAULT_TOOL_TIMEOUT_S), deadline - time.monotonic()))
+
+    @staticmethod
+    def _tool_timeout_result(fn_name: str, limit: float) -> Dict[str, Any]:
+        logger.warning("[Tool] %s timed out after %.1fs", fn_name, limit)
+        return {"error": "timeout", "tool": fn_name, "timeout_s": round(limit, 2),
+                "message": f"{fn_name} did not respond in time; answer without it."}
+
+    @staticmethod
+    def _tool_response(fn_name: str, tool_output: Dict[str, Any]) -> dict[str, Any]:
+        return {
+            "role": "tool",
+            "parts": [
+                {
+                    "function_response": {
+                        "name": fn_name,
+                        "response": {
+                            "name": fn_name,
+                            "content": tool_output,
+                        },
+                    }
+                }
+            ],
+        }
+
+    async def _arun_tools(self, calls: list[Any], tavily: Optional["TavilySearch"], weather: Optional["OpenWeather"], deadline: float) -> list[dict[str, Any]]:
+        """Run one model step's tool calls concurrently, each under its own deadline."""
+        loop = asyncio.get_running_loop()
+
+        async def run_one(call: Any) -> dict[str, Any]:
+            name = getattr(call, "name", "")
+            limit = self._tool_limit(name, deadline)
+            if name == "get_weather" and weather is not None:
+                # Native async HTTP; only blocking SDK tools need the thread pool
+                pending = weather.acurrent_weather(*self._weather_args(getattr(call, "args", {}) or {}))
+            else:
+                pending = loop.run_in_executor(_TOOL_POOL, self._invoke_tool, call, tavily, weather)
+            started = time.monotonic()
+            outcome = "ok"
             try:
-                weather = OpenWeather(api_key=overrides.get("OPENWEATHER_API_KEY"))
+                output = await asyncio.wait_for(pending, limit)
+            except asyncio.TimeoutError:
+                output = self._tool_timeout_result(name, limit)
+                outcome = "timeout"
             except Exception as e:
-                logger.warning("OpenWeather override unavailable: %s", e)
-                weather = None
-        else:
-            weather = self._ensure_weather()
-
-        # Build a tool-aware model instance with persona as system instruction
-        model = genai.GenerativeModel(
-            self.model_name,
-            generation_config=GENERATION_CONFIG,
-            tools=self._tools,
-            system_instruction=get_chanakya_persona(),
-        )
+                logger.error("[Tool] %s failed: %s", name, e)
+                output = {"error": str(e), "tool": name}
+                outcome = "error"
+            _record_tool(name, started, outcome)
+            return self._tool_response(name, output)
 
-        # Build contents array
-        contents: list[dict[str, Any]] = []
-        if history:
-            for msg in history[-8:]:
-                role = msg.get("role")
-                if role == "assistant":
-                    contents.append({"role": "model", "parts": [{"text": msg.get("content", "")} ]})
-                else:
-                    contents.append({"role": "user", "parts": [{"text": msg.get("content", "")} ]})
-        if not (history and history[-1].get("role") == "user" and history[-1].get("content") == user_text):
-            contents.append({"role": "user", "parts": [{"text": user_text}]})
+        return list(await asyncio.gather(*(run_one(c) for c in calls)))
+
+    async def achat(self, user_text: str, history: Optional[list[dict[str, str]]] = None, overrides: Optional[Dict[str, str]] = None, timeout: float = LLM_STEP_TIMEOUT_S, budget: float = TURN_BUDGET_S, summary: Optional[str] = None) -> str:
+        """Chat with optional tool use and per-call API key overrides.
+
+        history: list of {role: 'user'|'assistant', content: str}; only what fits CONTEXT_WINDOW is sent
+        overrides: optional dict with keys like GEMINI_API_KEY, TAVILY_API_KEY, OPENWEATHER_API_KEY
+        summary: rolling summary of older turns (RollingSummaries.get, stored in the session backend), sent ahead of the history
+        Never blocks the event loop. Raises asyncio.TimeoutError if a model step overruns.
+        """
+        parts: list[str] = []
+        async for text in self.achat_stream(user_text, history, overrides, timeout=timeout, budget=budget, summary=summary):
+            parts.append(text)
+        return "".join(parts).strip()
+
+    async def achat_stream(self, user_text: str, history: Optional[list[dict[str, str]]] = None, overrides: Optional[Dict[str, str]] = None, timeout: float = LLM_STEP_TIMEOUT_S, budget: float = TURN_BUDGET_S, summary: Optional[str] = None) -> AsyncIterator[str]:
+        """Same as achat(), but yields reply text fragments as Gemini generates them.
+
+        Tool calls are resolved between streamed model steps; only answer text is yielded.
+
+        Each model step must finish within `timeout` seconds and the whole turn within
+        `budget`; one step's tool calls run concurrently, each under its own deadline.
+        Cancelling the consuming task cancels the in-flight Gemini request.
+        """
+        overrides = overrides or {}
+        api_key = self._api_key(overrides)
+        if not api_key:
+            yield WholeReply("LLM API key missing. Configure GEMINI_API_KEY.")
+            return
+        cache_key = RESPONSE_CACHE.key(user_text, history)
+        cached = RESPONSE_CACHE.get(cache_key)
+        if cached is not None:
+            mark("llm_cache_hit")
+            yield WholeReply(cached)
+            return
+        tavily, weather = self._tool_clients(overrides)
+        model = self._tool_model(api_key)
+        self._async_ready(model)
+        contents = self._build_contents(user_text, history, summary)
+        turn_deadline = time.monotonic() + budget
 
         # Tool-calling loop (max 2 tool calls)
-        last_response: Optional[Any] = None
+        reply: list[str] = []
+        used_tools = False
         for _ in range(2):
-            last_response = model.generate_content(contents)
-            # Parse tool calls
-            calls = []
-            try:
-                for cand in getattr(last_response, "candidates", []) or []:
-                    parts = getattr(getattr(cand, "content", cand), "parts", [])
-                    for p in parts:
-                        fc = getattr(p, "function_call", None) or getattr(p, "functionCall", None)
-                        if fc:
-                            calls.append(fc)
-            except Exception:
-                calls = getattr(last_response, "function_calls", None) or []
+            calls: list[Any] = []
+            async for chunk in self._astream_step(model, contents, self._step_timeout(timeout, turn_deadline)):
+                text, chunk_calls = self._split_parts(chunk)
+                calls.extend(chunk_calls)
+                if text:
+                    reply.append(text)
+                    yield text
             if not calls:
                 break
+            used_tools = True
             try:
                 logger.info("[LLM] function_calls=%s", [getattr(c, 'name', '') for c in calls])
             except Exception:
                 pass
-            for call in calls:
-                fn_name = getattr(call, "name", "")
-                args = getattr(call, "args", {}) or {}
-                tool_output: Dict[str, Any] = {"error": "tool not found"}
-                if fn_name == "web_search":
-                    q = args.get("query", "")
-                    mr = args.get("max_results") or 5
-                    logger.info("[Tool] web_search query=%r max_results=%s", q, mr)
-                    if tavily is None:
-                        tool_output = {"error": "Tavily not configured. Set TAVILY_API_KEY and install tavily-python."}
-                    else:
-                        tool_output = tavily.search(q, mr)
-                        try:
-                            logger.info("[Tool] web_search results=%d has_answer=%s", len(tool_output.get('results', [])), bool(tool_output.get('answer')))
-                        except Exception:
-                            pass
-                elif fn_name == "get_weather":
-                    loc = args.get("location", "")
-                    units = (args.get("units") or "metric").lower()
-                    logger.info("[Tool] get_weather location=%r units=%s", loc, units)
-                    if weather is None:
-                        tool_output = {"error": "OpenWeather not configured. Set OPENWEATHER_API_KEY."}
-                    else:
-                        tool_output = weather.current_weather(loc, units)
-
-                contents.append(
-                    {
-                        "role": "tool",
-                        "parts": [
-                            {
-                                "function_response": {
-                                    "name": fn_name,
-                                    "response": {
-                                        "name": fn_name,
-                                        "content": tool_output,
-                                    },
-                                }
-                            }
-                        ],
-                    }
-                )
+            contents.extend(await self._arun_tools(calls, tavily, weather, turn_deadline - ANSWER_RESERVE_S))
+
+        if not reply:
+            yield WholeReply("I couldn't find the answer.")
+        elif not used_tools:
+            RESPONSE_CACHE.put(cache_key, "".join(reply))
+
+    @staticmethod
+    def _step_timeout(timeout: float, turn_deadline: float) -> float:
+        remaining = turn_deadline - time.monotonic()
+        if remaining <= 0:
+            raise asyncio.TimeoutError("LLM turn budget exhausted")
+        return min(timeout, remaining)
+
+    @staticmethod
+    async def _astream_step(model: genai.GenerativeModel, contents: list[dict[str, Any]], timeout: float) -> AsyncIterator[Any]:
+        """Stream one generate call, enforcing an overall deadline across all chunks."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        response = await asyncio.wait_for(
+            model.generate_content_async(contents, stream=True, request_options={"timeout": timeout}),
+            timeout,
+        )
+        chunks = response.__aiter__()
+        while True:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                raise asyncio.TimeoutError(f"Gemini step exceeded {timeout:.0f}s")
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), remaining)
+            except StopAsyncIteration:
+                break
+            yield chunk
 
-        final_text = (getattr(last_response, "text", "") or "").strip() if last_response else ""
-        return final_text or "I couldn't find the answer."
+    async def asummarize(self, summary: Optional[str], messages: list[dict[str, str]], overrides: Optional[Dict[str, str]] = None) -> str:
+        """Fold messages into a running summary (RollingSummaries calls this in the background)."""
+        api_key = self._api_key(overrides or {})
+        if not api_key:
+            raise RuntimeError("GEMINI_API_KEY missing")
+        model = MODEL_REGISTRY.get_or_create(
+            (api_key, self.model_name, "null", SUMMARY_INSTRUCTION),
+            lambda: _build_model(api_key, self.model_name, "null", SUMMARY_INSTRUCTION),
+        )
+        lines = [f"Existing summary: {summary or '(none)'}", "", "New messages:"]
+        lines.extend(f"{'User' if m.get('role') == 'user' else 'Chanakya'}: {m.get('content', '')}" for m in messages)
+        response = await asyncio.wait_for(
+            self._async_ready(model).generate_content_async("\n".join(lines), request_options={"timeout": SUMMARY_TIMEOUT_S}),
+            SUMMARY_TIMEOUT_S,
+        )
+        return self._split_parts(response)[0]
 
     def stream_generate(self, prompt: str, on_chunk=None) -> str:
         """Stream a Gemini response, printing chunks as they arrive.
@@ -331,9 +541,12 @@ class GeminiClient:
         return ''.join(full_parts).strip()
 
 
-def build_chat_prompt(history: list) -> str:
+def build_chat_prompt(history: list, summary: Optional[str] = None) -> str:
     lines = [get_chanakya_persona()]
-    lines.extend([f"{('User' if msg['role'] == 'user' else 'Assistant')}: {msg['content']}" for msg in history[-10:]])
+    if summary:
+        lines.append(f"Summary of the earlier conversation: {summary}")
+    lines.extend([f"{('User' if msg['role'] == 'user' else 'Assistant')}: {msg['content']}"
+                  for msg in CONTEXT_WINDOW.fit(history, reserved_tokens=estimate_tokens(summary) if summary else 0)])
     lines.append("Assistant:")
     return "\n".join(lines)
 
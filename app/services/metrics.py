@@ -0,0 +1,219 @@
+import asyncio
+import bisect
+import contextvars
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+logger = logging.getLogger("voice-agent.trace")
+
+# Seconds; covers fast local stages through slow tool-assisted turns
+LATENCY_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 8.0, 13.0, 20.0, 30.0)
+# Event-loop stalls worth seeing start around a millisecond
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _label_str(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.help = help_text
+        self.label_names = labels
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple[str, ...]:
+        return tuple(str(labels.get(n, "")) for n in self.label_names)
+
+    def _header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, help_text, labels=()):
+        super().__init__(name, help_text, labels)
+        self._values: dict[tuple[str, ...], float] = {} if labels else {(): 0.0}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> list[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self._header() + [f"{self.name}{_label_str(self.label_names, k)} {v:g}" for k, v in items]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+
+class GaugeFunc(_Metric):
+    """Label-less gauge whose value is read at scrape time; omitted when fn returns None."""
+
+    kind = "gauge"
+
+    def __init__(self, name, help_text, fn):
+        super().__init__(name, help_text)
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        value = self.fn()
+        return [] if value is None else self._header() + [f"{self.name} {value:g}"]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(buckets)
+        # per label set: [bucket counts..., +Inf count], sum
+        self._series: dict[tuple[str, ...], tuple[list[int], list[float]]] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[idx] += 1
+            total[0] += value
+
+    def render(self) -> list[str]:
+        lines = self._header()
+        with self._lock:
+            items = sorted((k, (list(c), t[0])) for k, (c, t) in self._series.items())
+        for key, (counts, total) in items:
+            running = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                running += n
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _label_str(self.label_names, key, 'le="%s"' % le)
+                lines.append(f"{self.name}_bucket{labels} {running}")
+            lines.append(f"{self.name}_sum{_label_str(self.label_names, key)} {total:.6f}")
+            lines.append(f"{self.name}_count{_label_str(self.label_names, key)} {running}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: list[_Metric] = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        lines: list[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+ACTIVE_SESSIONS = REGISTRY.register(Gauge("voice_agent_active_sessions", "Open /ws connections"))
+ACTIVE_TURNS = REGISTRY.register(Gauge("voice_agent_active_turns", "Turns currently generating or speaking"))
+TURNS = REGISTRY.register(Counter("voice_agent_turns_total", "Finished turns by outcome", ("outcome",)))
+STAGE_LATENCY = REGISTRY.register(Histogram("voice_agent_stage_seconds", "Time from final transcript to each pipeline stage", ("stage",)))
+TOOL_CALLS = REGISTRY.register(Counter("voice_agent_tool_calls_total", "LLM tool calls by tool and outcome", ("tool", "outcome")))
+TOOL_LATENCY = REGISTRY.register(Histogram("voice_agent_tool_seconds", "Tool call latency", ("tool",)))
+UPSTREAM_ERRORS = REGISTRY.register(Counter("voice_agent_upstream_errors_total", "Failed calls to upstream APIs", ("upstream",)))
+SPECULATIONS = REGISTRY.register(Counter("voice_agent_speculations_total", "Speculative LLM requests started on stable partials, by outcome", ("outcome",)))
+SPECULATION_LEAD = REGISTRY.register(Histogram("voice_agent_speculation_lead_seconds", "How long before the final transcript a committed speculation started"))
+SPECULATION_WASTED_TOKENS = REGISTRY.register(Counter("voice_agent_speculation_wasted_tokens_total", "Estimated output tokens generated by discarded speculative requests"))
+EVENT_LOOP_LAG = REGISTRY.register(Histogram("voice_agent_event_loop_lag_seconds", "How late a periodic event-loop timer fires", buckets=LAG_BUCKETS))
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None  # not Linux
+
+
+PROCESS_RSS = REGISTRY.register(GaugeFunc("process_resident_memory_bytes", "Resident memory size in bytes", _rss_bytes))
+
+
+async def monitor_event_loop(interval: float = 0.1):
+    """Feed EVENT_LOOP_LAG forever: any delay past `interval` is time the loop spent blocked."""
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        EVENT_LOOP_LAG.observe(max(0.0, loop.time() - started - interval))
+
+
+class TurnTrace:
+    """Span timings for one voice turn, measured from the final transcript.
+
+    begin() counts the turn as active; call it where a matching finish() is guaranteed
+    (first thing inside the turn's try block). mark() records the first time a stage is
+    reached (repeat marks are ignored); finish() feeds every mark into STAGE_LATENCY
+    and logs the timeline once.
+    The running trace is reachable from nested code through current_trace.
+    """
+
+    def __init__(self, turn_id: str):
+        self.turn_id = turn_id
+        self.t0 = time.monotonic()
+        self.marks: dict[str, float] = {}
+        self.spans: list[tuple[str, float, float]] = []  # (name, start, duration) for repeated work like tool calls
+        self.started = False
+        self.finished = False
+
+    def begin(self):
+        if not self.started and not self.finished:
+            self.started = True
+            ACTIVE_TURNS.inc()
+
+    def mark(self, stage: str):
+        if stage not in self.marks and not self.finished:
+            self.marks[stage] = time.monotonic() - self.t0
+
+    def span(self, name: str, started: float, duration: float):
+        self.spans.append((name, started - self.t0, duration))
+
+    def finish(self, outcome: str = "completed"):
+        if self.finished:
+            return
+        self.mark("done")
+        self.finished = True
+        if self.started:
+            ACTIVE_TURNS.dec()
+        TURNS.inc(outcome=outcome)
+        for stage, at in self.marks.items():
+            STAGE_LATENCY.observe(at, stage=stage)
+        timeline = " ".join(f"{k}={v * 1000:.0f}ms" for k, v in self.marks.items())
+        spans = " ".join(f"{n}@{s * 1000:.0f}ms+{d * 1000:.0f}ms" for n, s, d in self.spans)
+        logger.info("[turn %s] %s %s%s", self.turn_id, outcome, timeline, f" | {spans}" if spans else "")
+
+
+current_trace: contextvars.ContextVar[Optional[TurnTrace]] = contextvars.ContextVar("current_trace", default=None)
+
+
+def mark(stage: str):
+    """Mark a stage on the current turn's trace, if any (no-op outside a traced turn)."""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.mark(stage)
@@ -1,4 +1,13 @@
-import json, logging, websocket
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+
+import websockets
+
+from .metrics import UPSTREAM_ERRORS, mark
 
 PRIMARY_WS_URLS = [
     "wss://api.murf.ai/v1/speech/stream-input",
@@ -6,86 +15,300 @@ PRIMARY_WS_URLS = [
     "wss://api.murf.ai/api/v1/speech/stream-input",
     "wss://murf.ai/api/v1/speech/stream-input",
 ]
+if os.getenv("MURF_WS_URL"):
+    PRIMARY_WS_URLS = [os.environ["MURF_WS_URL"]]  # e.g. a local stand-in for load tests
+# Audio cache format tag for what _dial() asks Murf for; change both together
+STREAM_FORMAT = "wav-24000-mono"
 logger = logging.getLogger("voice-agent.murf")
 
-class MurfWebSocketStreamer:
-    def __init__(self, api_key: str, voice_id: str = "en-US-ken", context_id: str = "voice_agent_ctx"):
-        self.api_key = api_key
-        self.voice_id = voice_id
-        self.context_id = context_id
-        self.ws = None
-        self.first_recv = True
-        self.closed = False
+_CLOSED = object()  # queued to every open context when its socket dies (or the turn is cancelled)
+
+
+class _MurfConnection:
+    """One warm Murf socket shared by several turns, demultiplexed by context_id.
+
+    A reader task routes each message to its context's asyncio.Queue; everything runs
+    on the event loop, so no thread is held per reply.
+    """
+
+    def __init__(self, ws, url: str, key: tuple[str, str]):
+        self.ws = ws
+        self.url = url
+        self.key = key
+        self.alive = True
+        # Flipped off if Murf ever answers without a context_id; we can then only run one turn at a time
+        self.tags_contexts = True
+        self.last_used = time.monotonic()
+        self._contexts: dict[str, asyncio.Queue] = {}
+        self._reader = asyncio.create_task(self._read_loop(), name="murf-reader")
+
+    @property
+    def active_contexts(self) -> int:
+        return len(self._contexts)
+
+    def reserve_context(self, context_id: str):
+        """Claim a context slot; the pool calls this before handing the socket out."""
+        self._contexts[context_id] = asyncio.Queue()
+
+    async def open_context(self, context_id: str, voice_id: str) -> asyncio.Queue:
+        q = self._contexts.get(context_id)
+        if q is None:
+            q = self._contexts[context_id] = asyncio.Queue()
+        # Send voice config with context_id first (NO text here)
+        voice_cfg = {
+            "voice_config": {
+                "voiceId": voice_id,
+                "style": "Conversational",
+                "rate": 0,
+                "pitch": 0,
+                "variation": 1
+            },
+            "context_id": context_id
+        }
+        try:
+            await self.send(voice_cfg)
+        except Exception:
+            self.release_context(context_id)
+            raise
+        return q
+
+    def release_context(self, context_id: str):
+        self._contexts.pop(context_id, None)
+        self.last_used = time.monotonic()
+
+    async def send(self, msg: dict):
+        await self.ws.send(json.dumps(msg))
+        self.last_used = time.monotonic()
+
+    def _route(self, data: dict):
+        ctx = data.get("context_id")
+        if ctx is None:
+            self.tags_contexts = False
+            # Untagged answer: only safe to deliver if exactly one turn is in flight
+            q = next(iter(self._contexts.values())) if len(self._contexts) == 1 else None
+        else:
+            q = self._contexts.get(ctx)
+        if q is not None:
+            q.put_nowait(data)
+
+    async def _read_loop(self):
+        try:
+            async for raw in self.ws:
+                try:
+                    self._route(json.loads(raw))
+                except ValueError:
+                    logger.debug("[MurfWS] non-JSON frame ignored")
+        except Exception as e:
+            if self.alive:
+                logger.info("[MurfWS] connection dropped: %s", e)
+        finally:
+            self.alive = False
+            for q in list(self._contexts.values()):
+                q.put_nowait(_CLOSED)
+
+    async def close(self):
+        self.alive = False
+        try:
+            await self.ws.close()
+        except Exception:
+            pass
+
+
+class MurfConnectionPool:
+    """Process-wide pool of warm Murf sockets keyed by (api_key, voice_id).
+
+    Several turns share one socket through distinct context_ids. Liveness is kept by
+    the websockets library's own ping/pong; sockets unused for longer than max_idle_s
+    are closed on the next acquire().
+    """
+
+    def __init__(self, max_contexts_per_conn: int = 4, max_idle_s: float = 120.0, ping_interval_s: float = 20.0, connect_timeout: float = 10.0):
+        self.max_contexts_per_conn = max_contexts_per_conn
+        self.max_idle_s = max_idle_s
+        self.ping_interval_s = ping_interval_s
+        self.connect_timeout = connect_timeout
+        self._conns: dict[tuple[str, str], list[_MurfConnection]] = {}
+        self._preferred_url: dict[str, str] = {}  # api_key -> URL variant that worked last time
+        self._dialing: dict[tuple[str, str], asyncio.Lock] = {}
+
+    async def acquire(self, api_key: str, voice_id: str, context_id: str) -> _MurfConnection:
+        """Return a live connection with a slot reserved for context_id, dialing a new one if needed.
+
+        The slot is claimed before the dial lock is released, so concurrent acquires
+        never put more than max_contexts_per_conn turns on one socket.
+        """
+        key = (api_key, voice_id)
+        await self.prune()
+        # One dial at a time per key, so a burst of turns shares the first new socket
+        async with self._dialing.setdefault(key, asyncio.Lock()):
+            conns = [c for c in self._conns.get(key, []) if c.alive]
+            self._conns[key] = conns
+            for conn in sorted(conns, key=lambda c: c.active_contexts):
+                limit = self.max_contexts_per_conn if conn.tags_contexts else 1
+                if conn.active_contexts < limit:
+                    conn.reserve_context(context_id)
+                    return conn
+            conn = await self._dial(api_key, key)
+            self._conns.setdefault(key, []).append(conn)
+            conn.reserve_context(context_id)
+            return conn
 
-    def connect(self):
-        if self.ws: return
+    async def _dial(self, api_key: str, key: tuple[str, str]) -> _MurfConnection:
+        preferred = self._preferred_url.get(api_key)
+        bases = [preferred] + [u for u in PRIMARY_WS_URLS if u != preferred] if preferred else PRIMARY_WS_URLS
         last_err = None
-        for base in PRIMARY_WS_URLS:
-            url = f"{base}?api-key={self.api_key}&sample_rate=24000&channel_type=MONO&format=WAV"
+        for base in bases:
+            url = f"{base}?api-key={api_key}&sample_rate=24000&channel_type=MONO&format=WAV"
             try:
-                self.ws = websocket.create_connection(url, timeout=30)
-                # Send voice config with context_id first (NO text here)
-                voice_cfg = {
-                    "voice_config": {
-                        "voiceId": self.voice_id,
-                        "style": "Conversational",
-                        "rate": 0,
-                        "pitch": 0,
-                        "variation": 1
-                    },
-                    "context_id": self.context_id
-                }
-                self.ws.send(json.dumps(voice_cfg))
+                ws = await websockets.connect(
+                    url,
+                    open_timeout=self.connect_timeout,
+                    ping_interval=self.ping_interval_s,
+                    max_size=None,
+                )
+                self._preferred_url[api_key] = base
                 logger.info("[MurfWS] Connected %s", base)
-                return
+                return _MurfConnection(ws, base, key)
             except Exception as e:
                 last_err = e
                 logger.warning("[MurfWS] Connect failed %s -> %s", base, e)
         raise RuntimeError(f"Unable to connect to Murf WebSocket (last error: {last_err})")
 
-    def send_text_chunk(self, text: str, end=False):
-        if not text.strip(): return
-        self.connect()
+    async def prune(self):
+        """Close dead sockets and idle ones unused for longer than max_idle_s."""
+        now = time.monotonic()
+        stale = []
+        for key in list(self._conns):
+            keep = []
+            for c in self._conns[key]:
+                if c.alive and (c.active_contexts or now - c.last_used <= self.max_idle_s):
+                    keep.append(c)
+                else:
+                    stale.append(c)
+            if keep:
+                self._conns[key] = keep
+            else:
+                del self._conns[key]
+        for conn in stale:
+            await conn.close()
+
+    def stats(self) -> dict:
+        conns = [c for cs in self._conns.values() for c in cs]
+        return {
+            "connections": len(conns),
+            "alive": sum(1 for c in conns if c.alive),
+            "active_contexts": sum(c.active_contexts for c in conns),
+        }
+
+    async def aclose_all(self):
+        conns = [c for cs in self._conns.values() for c in cs]
+        self._conns.clear()
+        for conn in conns:
+            await conn.close()
+
+
+MURF_POOL = MurfConnectionPool()
+
+
+class MurfWebSocketStreamer:
+    """One turn's Murf context on a pooled socket.
+
+    start() dials in the background and send_text_chunk() waits for it. Iterating the
+    streamer (`async for audio in streamer`) yields decoded audio bytes until Murf
+    marks the context final, the socket drops, or the turn is cancelled.
+    """
+
+    def __init__(self, api_key: str, voice_id: str = "en-US-ken", context_id: str = "voice_agent_ctx", pool: MurfConnectionPool | None = None, chunk_timeout: float = 30.0):
+        self.api_key = api_key
+        self.voice_id = voice_id
+        self.context_id = context_id
+        self.pool = pool or MURF_POOL
+        self.chunk_timeout = chunk_timeout
+        self.conn: _MurfConnection | None = None
+        self._queue: asyncio.Queue | None = None
+        self._connecting: asyncio.Task | None = None
+        self.closed = False
+        self.cancelled = False
+        self.completed = False  # Murf sent final for this context
+
+    def start(self):
+        if self._connecting is None:
+            self._connecting = asyncio.create_task(self.connect(), name=f"murf-{self.context_id}")
+
+    async def connect(self):
+        if self.conn: return
+        conn = await self.pool.acquire(self.api_key, self.voice_id, self.context_id)
+        try:
+            self._queue = await conn.open_context(self.context_id, self.voice_id)
+        except Exception:
+            # Stale pooled socket: drop it and dial a fresh one once
+            await conn.close()
+            conn = await self.pool.acquire(self.api_key, self.voice_id, self.context_id)
+            self._queue = await conn.open_context(self.context_id, self.voice_id)
+        self.conn = conn
+        mark("murf_connected")
+        if self.cancelled:
+            # Cancelled while dialing: close() already ran without a context to release
+            conn.release_context(self.context_id)
+
+    async def _ready(self):
+        self.start()
+        await self._connecting
+        if not self.conn or self.closed:
+            raise RuntimeError("Murf WebSocket not connected")
+
+    async def send_text_chunk(self, text: str, end=False):
+        if not text.strip() or self.cancelled: return
+        await self._ready()
         # Send text payload with context_id and end flag immediately after voice config
-        msg = {
+        await self.conn.send({
             "context_id": self.context_id,
             "text": text,
             "end": end
-        }
-        self.ws.send(json.dumps(msg))
+        })
+
+    def __aiter__(self):
+        return self._audio()
 
-    def finalize(self, on_audio_chunk=None, on_done=None):
-        if not self.ws: return
-        # Only finalize session, do NOT send text here
+    async def _audio(self):
         try:
-            while True:
-                raw = self.ws.recv()
-                if not raw: break
-                data = json.loads(raw)
+            await self._ready()
+        except Exception as e:
+            logger.error("[MurfWS] %s", e)
+            UPSTREAM_ERRORS.inc(upstream="murf")
+            return
+        try:
+            while not self.cancelled:
+                data = await asyncio.wait_for(self._queue.get(), self.chunk_timeout)
+                if data is _CLOSED or self.cancelled:
+                    break
                 if "audio" in data:
-                    a = data["audio"]
-                    if on_audio_chunk:
-                        try:
-                            on_audio_chunk(a)
-                        except Exception:
-                            pass
-                    else:
-                        print(f"[MURF AUDIO B64 CHUNK] {a[:100]}... len={len(a)}")
+                    yield base64.b64decode(data["audio"])
                 if data.get("final"):
-                    if on_done:
-                        try:
-                            on_done()
-                        except Exception:
-                            pass
+                    self.completed = True
                     break
-        except Exception:
-            pass
+        except asyncio.TimeoutError:
+            logger.warning("[MurfWS] context %s timed out waiting for audio", self.context_id)
+        finally:
+            self.close()
+
+    async def cancel(self):
+        """Barge-in: stop synthesis for this context and end the audio iterator right away."""
+        if self.cancelled: return
+        self.cancelled = True
+        conn = self.conn
+        if conn and not self.closed:
+            try:
+                await conn.send({"context_id": self.context_id, "clear": True})
+            except Exception as e:
+                logger.debug("[MurfWS] clear for %s failed: %s", self.context_id, e)
         self.close()
 
     def close(self):
+        """Release this turn's context; the socket stays warm in the pool."""
         if self.closed: return
         self.closed = True
-        try:
-            self.ws and self.ws.close()
-        except Exception:
-            pass
+        if self.conn:
+            self.conn.release_context(self.context_id)
+        if self._queue is not None:
+            self._queue.put_nowait(_CLOSED)  # ends a pending audio iterator
@@ -0,0 +1,221 @@
+import hashlib
+import logging
+import random
+import re
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Any, Optional
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional; signatures are computed in pure Python without it
+    np = None  # type: ignore
+
+from .result_cache import normalize_text
+
+logger = logging.getLogger("voice-agent.response-cache")
+
+# Questions about the live world go to the model (and its tools) every time
+_FRESH = re.compile(
+    r"\b(weather|temperature|forecast|rain\w*|humid\w*|news|latest|today|tonight|tomorrow|yesterday|"
+    r"now|current\w*|recent\w*|price\w*|stock\w*|score\w*|search\w*|look up|this (week|month|year))\b"
+)
+_PUNCT = re.compile(r"[^\w\s]")
+_NUMBER = re.compile(r"\d+")
+_NEGATIONS = frozenset({"not", "no", "never", "nor", "dont", "doesnt", "didnt", "cant", "wont", "shouldnt", "isnt", "arent"})
+# Words that can differ between two phrasings of the same question
+_FILLERS = frozenset({
+    "please", "kindly", "some", "any", "just", "really", "exactly", "actually", "again", "quickly",
+    "briefly", "little", "tell", "give", "share", "about", "with", "your", "from", "that", "this",
+})
+_PRIME = (1 << 31) - 1  # a * crc32 stays below 2**63, so NumPy can hash in uint64
+
+
+class CacheKey:
+    """A turn's lookup key: normalized text, recent-history digest and MinHash signature."""
+
+    __slots__ = ("text", "history", "signature", "tokens")
+
+    def __init__(self, text: str, history: str, signature: tuple[int, ...]):
+        self.text = text
+        self.history = history
+        self.signature = signature
+        self.tokens = frozenset(text.split())
+
+    @property
+    def exact(self) -> tuple[str, str]:
+        return self.text, self.history
+
+
+class ResponseCache:
+    """LLM replies for repeated questions, matched exactly or as near-duplicates.
+
+    Questions are normalized (case, whitespace, punctuation) and keyed together with a
+    digest of the last `history_messages` messages, so a reply is only reused in the same
+    conversational context. Near-duplicates ("give me advice on money" / "please give me
+    advice on money") are found through MinHash signatures over character shingles with
+    LSH banding, then verified against `threshold` (estimated Jaccard similarity) and
+    rejected when numbers, negations or content words differ. Entries expire after ttl_s
+    and the least recently used are evicted past max_entries.
+
+    key() returns None for turns that ask about live data (weather, news, prices...);
+    callers must also only put() replies that were produced without tool calls.
+    """
+
+    def __init__(self, max_entries: int = 512, ttl_s: float = 6 * 3600.0, threshold: float = 0.75,
+                 num_perm: int = 64, bands: int = 16, shingle: int = 4, history_messages: int = 2):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self.threshold = threshold
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle = shingle
+        self.history_messages = history_messages
+        rng = random.Random(0x5EED)  # fixed: signatures must be comparable across instances
+        self._perms = [(rng.randrange(1, _PRIME), rng.randrange(0, _PRIME)) for _ in range(num_perm)]
+        if np is not None:
+            self._a = np.array([a for a, _ in self._perms], dtype=np.uint64)[:, None]
+            self._b = np.array([b for _, b in self._perms], dtype=np.uint64)[:, None]
+        # exact key -> (expires_at, CacheKey, reply)
+        self._entries: "OrderedDict[tuple[str, str], tuple[float, CacheKey, str]]" = OrderedDict()
+        self._buckets: dict[tuple, set] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.skipped = 0
+        self.stores = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    # --- keys -------------------------------------------------------------------------
+
+    def _history_digest(self, user_text: str, history: Optional[list[dict[str, str]]]) -> str:
+        msgs = list(history or [])
+        if msgs and msgs[-1].get("role") == "user" and msgs[-1].get("content") == user_text:
+            msgs.pop()  # callers often append the current question before asking
+        recent = msgs[-self.history_messages:] if self.history_messages else []
+        h = hashlib.blake2b(digest_size=12)
+        for m in recent:
+            h.update(f"{m.get('role')}\x1f{normalize_text(m.get('content'))}\x1e".encode())
+        return h.hexdigest()
+
+    def _signature(self, text: str) -> tuple[int, ...]:
+        k = self.shingle
+        grams = {text[i:i + k] for i in range(max(1, len(text) - k + 1))}
+        hashes = [zlib.crc32(g.encode()) for g in grams]
+        if np is not None:
+            mixed = (self._a * np.array(hashes, dtype=np.uint64)[None, :] + self._b) % np.uint64(_PRIME)
+            return tuple(mixed.min(axis=1).tolist())
+        return tuple(min((a * h + b) % _PRIME for h in hashes) for a, b in self._perms)
+
+    def key(self, user_text: str, history: Optional[list[dict[str, str]]] = None) -> Optional[CacheKey]:
+        """Lookup key for a turn, or None when the turn must not be served from cache."""
+        text = " ".join(_PUNCT.sub(" ", normalize_text(user_text)).split())
+        if not text or _FRESH.search(text):
+            with self._lock:
+                self.skipped += 1
+            return None
+        return CacheKey(text, self._history_digest(user_text, history), self._signature(text))
+
+    # --- index ------------------------------------------------------------------------
+
+    def _band_keys(self, key: CacheKey):
+        sig, r = key.signature, self.rows
+        return [(key.history, b, sig[b * r:(b + 1) * r]) for b in range(self.bands)]
+
+    def _drop(self, exact: tuple[str, str]):
+        """Remove an entry and its LSH postings (caller holds the lock)."""
+        _, key, _ = self._entries.pop(exact)
+        for band in self._band_keys(key):
+            postings = self._buckets.get(band)
+            if postings is not None:
+                postings.discard(exact)
+                if not postings:
+                    del self._buckets[band]
+
+    @staticmethod
+    def _materially_different(a: CacheKey, b: CacheKey) -> bool:
+        # High character overlap, different meaning: "2+2" vs "2+3", "should I" vs "should I not",
+        # "invest in gold" vs "invest in silver"
+        if _NUMBER.findall(a.text) != _NUMBER.findall(b.text):
+            return True
+        diff = a.tokens ^ b.tokens
+        return bool(diff & _NEGATIONS) or any(len(w) > 3 and w not in _FILLERS for w in diff)
+
+    def similarity(self, a: CacheKey, b: CacheKey) -> float:
+        """Estimated Jaccard similarity of the two questions' shingle sets."""
+        return sum(x == y for x, y in zip(a.signature, b.signature)) / len(a.signature)
+
+    def get(self, key: Optional[CacheKey]) -> Optional[str]:
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key.exact)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key.exact)
+                self.hits += 1
+                return entry[2]
+            best, best_sim = None, self.threshold
+            candidates = set()
+            for band in self._band_keys(key):
+                candidates.update(self._buckets.get(band, ()))
+            for exact in candidates:
+                expires_at, other, _ = self._entries[exact]
+                if expires_at <= now:
+                    self._drop(exact)
+                    self.expirations += 1
+                    continue
+                sim = self.similarity(key, other)
+                if sim >= best_sim and not self._materially_different(key, other):
+                    best, best_sim = exact, sim
+            if best is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(best)
+            self.near_hits += 1
+            logger.info("[cache] near-duplicate %r ~ %r (%.2f)", key.text, best[0], best_sim)
+            return self._entries[best][2]
+
+    def put(self, key: Optional[CacheKey], reply: str):
+        if key is None or not reply:
+            return
+        with self._lock:
+            if key.exact in self._entries:
+                self._drop(key.exact)
+            self._entries[key.exact] = (time.monotonic() + self.ttl_s, key, reply)
+            for band in self._band_keys(key):
+                self._buckets.setdefault(band, set()).add(key.exact)
+            self.stores += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.near_hits + self.misses
+        return {
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "near_hits": self.near_hits,
+            "misses": self.misses,
+            "skipped_live_data": self.skipped,
+            "stores": self.stores,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.near_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,189 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+logger = logging.getLogger("voice-agent.cache")
+
+
+def normalize_text(text: Optional[str]) -> str:
+    """Case- and whitespace-folded form of a free-text lookup key."""
+    return " ".join((text or "").casefold().split())
+
+
+class _InFlight:
+    __slots__ = ("done", "value", "error", "abandoned", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Any = None
+        self.error: Optional[BaseException] = None
+        self.abandoned = False  # leader cancelled/interrupted: waiters retry rather than inherit it
+        self.waiters: list[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+
+
+def _wake(fut: asyncio.Future):
+    if not fut.done():
+        fut.set_result(None)
+
+
+class TTLCache:
+    """Thread-safe LRU result cache with a per-cache TTL and request coalescing.
+
+    Concurrent lookups for the same missing key share a single upstream call
+    ("singleflight"), whether they come from threads or coroutines: the first caller
+    computes, the rest wait for its result. Errors raised by compute() are shared; a
+    leader that is cancelled or times out is not, and a waiter takes over instead.
+    Values are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, name: str, max_entries: int = 256, ttl_s: float = 60.0):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[Hashable, tuple[float, Any]]" = OrderedDict()
+        self._inflight: dict[Hashable, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def _lookup(self, key: Hashable) -> tuple[bool, Any]:
+        """Fresh cached value for key (caller holds the lock)."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return False, None
+        self._entries.move_to_end(key)
+        return True, value
+
+    def _store(self, key: Hashable, value: Any):
+        """Insert value and trim to max_entries (caller holds the lock)."""
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: Hashable) -> tuple[bool, Any]:
+        with self._lock:
+            return self._lookup(key)
+
+    def _join(self, key: Hashable) -> tuple[bool, Any, Optional[_InFlight], bool]:
+        """(found, value, call, leader) for a lookup (caller holds the lock)."""
+        found, value = self._lookup(key)
+        if found:
+            self.hits += 1
+            return True, value, None, False
+        call = self._inflight.get(key)
+        if call is None:
+            call = self._inflight[key] = _InFlight()
+            self.misses += 1
+            return False, None, call, True
+        self.coalesced += 1
+        return False, None, call, False
+
+    def _finish(self, key: Hashable, call: _InFlight):
+        with self._lock:
+            self._inflight.pop(key, None)
+            call.done.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, fut in waiters:
+            loop.call_soon_threadsafe(_wake, fut)
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], T], cacheable: Callable[[T], bool] = lambda _v: True) -> T:
+        """Return the cached value for key, or compute() it once for all concurrent callers.
+
+        Results rejected by cacheable() (e.g. upstream errors) are returned but not stored.
+        """
+        while True:
+            with self._lock:
+                found, value, call, leader = self._join(key)
+            if found:
+                return value
+            if leader:
+                break
+            call.done.wait()
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = compute()
+            with self._lock:
+                if cacheable(call.value):
+                    self._store(key, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            self._finish(key, call)
+
+    async def aget_or_compute(self, key: Hashable, compute: Callable[[], Awaitable[T]], cacheable: Callable[[T], bool] = lambda _v: True) -> T:
+        """Async get_or_compute(): waiting callers await the leader's result without blocking the loop."""
+        while True:
+            with self._lock:
+                found, value, call, leader = self._join(key)
+                if not found and not leader:
+                    woken = asyncio.get_running_loop().create_future()
+                    call.waiters.append((asyncio.get_running_loop(), woken))
+            if found:
+                return value
+            if leader:
+                break
+            await woken
+            if call.abandoned:
+                continue
+            if call.error is not None:
+                raise call.error
+            return call.value
+        try:
+            call.value = await compute()
+            with self._lock:
+                if cacheable(call.value):
+                    self._store(key, call.value)
+            return call.value
+        except Exception as e:
+            call.error = e
+            raise
+        except BaseException:
+            call.abandoned = True
+            raise
+        finally:
+            self._finish(key, call)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "name": self.name,
+            "size": size,
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
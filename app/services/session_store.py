@@ -0,0 +1,548 @@
+import asyncio
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger("voice-agent.sessions")
+
+HISTORY_DEPTH = 20             # messages kept per session (LLM reads 8, UI shows 20)
+IDLE_TTL_S = 2 * 3600          # sessions untouched for this long are dropped
+MAX_BYTES = 64 * 1024 * 1024   # global cap on estimated session memory
+SWEEP_INTERVAL_S = 60.0
+
+# Rough per-object overheads used for the memory estimate
+_MSG_OVERHEAD = sys.getsizeof({"role": "", "content": ""}) + 64
+_SESSION_OVERHEAD = 1024
+
+
+class _Session:
+    __slots__ = ("history", "settings", "summary", "bytes", "last_seen")
+
+    def __init__(self, depth: int):
+        self.history: deque = deque(maxlen=depth)
+        self.settings: dict[str, str] = {}
+        self.summary: Optional[dict] = None
+        self.bytes = _SESSION_OVERHEAD
+        self.last_seen = time.monotonic()
+
+
+def _msg_bytes(msg: dict) -> int:
+    return _MSG_OVERHEAD + len(msg.get("content") or "") + len(msg.get("role") or "")
+
+
+def _summary_bytes(summary: Optional[dict]) -> int:
+    if not summary:
+        return 0
+    return _MSG_OVERHEAD + len(summary.get("text") or "") + 24 * len(summary.get("folded") or ())
+
+
+class InMemorySessionStore:
+    """Bounded per-process store for chat history and per-session settings.
+
+    History is a ring buffer of `history_depth` messages per session. Sessions idle
+    for longer than `idle_ttl_s` are dropped, and the least recently used sessions
+    are evicted whenever the estimated total exceeds `max_bytes`.
+    """
+
+    def __init__(self, history_depth: int = HISTORY_DEPTH, idle_ttl_s: float = IDLE_TTL_S, max_bytes: int = MAX_BYTES):
+        self.history_depth = history_depth
+        self.idle_ttl_s = idle_ttl_s
+        self.max_bytes = max_bytes
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._total_bytes = 0
+        self._last_sweep = time.monotonic()
+        self.evicted_idle = 0
+        self.evicted_lru = 0
+
+    # --- internals (caller holds the lock) ---
+    def _touch(self, session_id: str, create: bool = True) -> Optional[_Session]:
+        now = time.monotonic()
+        if now - self._last_sweep > SWEEP_INTERVAL_S:
+            self._sweep(now)
+        sess = self._sessions.get(session_id)
+        if sess is None:
+            if not create:
+                return None
+            sess = _Session(self.history_depth)
+            self._sessions[session_id] = sess
+            self._total_bytes += sess.bytes
+        sess.last_seen = now
+        self._sessions.move_to_end(session_id)
+        return sess
+
+    def _drop(self, session_id: str):
+        sess = self._sessions.pop(session_id, None)
+        if sess is not None:
+            self._total_bytes -= sess.bytes
+
+    def _sweep(self, now: float):
+        self._last_sweep = now
+        # OrderedDict is in LRU order, so idle sessions are at the front
+        while self._sessions:
+            sid, sess = next(iter(self._sessions.items()))
+            if now - sess.last_seen <= self.idle_ttl_s:
+                break
+            self._drop(sid)
+            self.evicted_idle += 1
+
+    def _enforce_cap(self, keep: str):
+        while self._total_bytes > self.max_bytes and len(self._sessions) > 1:
+            sid = next(iter(self._sessions))
+            if sid == keep:
+                break
+            self._drop(sid)
+            self.evicted_lru += 1
+
+    def _resize(self, sess: _Session, delta: int):
+        sess.bytes += delta
+        self._total_bytes += delta
+
+    # --- public API ---
+    def append_history(self, session_id: str, role: str, content: str) -> list[dict]:
+        """Append a message and return a snapshot of the session's (bounded) history."""
+        msg = {"role": role, "content": content}
+        with self._lock:
+            sess = self._touch(session_id)
+            delta = _msg_bytes(msg)
+            if len(sess.history) == sess.history.maxlen:
+                delta -= _msg_bytes(sess.history[0])
+            sess.history.append(msg)
+            self._resize(sess, delta)
+            self._enforce_cap(keep=session_id)
+            return list(sess.history)
+
+    def get_history(self, session_id: str, limit: Optional[int] = None) -> list[dict]:
+        with self._lock:
+            sess = self._touch(session_id, create=False)
+            if sess is None:
+                return []
+            history = list(sess.history)
+        return history[-limit:] if limit else history
+
+    def get_settings(self, session_id: str) -> dict[str, str]:
+        with self._lock:
+            sess = self._touch(session_id, create=False)
+            return dict(sess.settings) if sess else {}
+
+    def update_settings(self, session_id: str, updates: dict[str, Optional[str]]) -> dict[str, str]:
+        """Set keys with a value, remove keys mapped to None; returns the resulting settings."""
+        with self._lock:
+            sess = self._touch(session_id)
+            before = sum(len(k) + len(v) for k, v in sess.settings.items())
+            for k, v in updates.items():
+                if v is None:
+                    sess.settings.pop(k, None)
+                else:
+                    sess.settings[k] = v
+            after = sum(len(k) + len(v) for k, v in sess.settings.items())
+            self._resize(sess, after - before)
+            self._enforce_cap(keep=session_id)
+            return dict(sess.settings)
+
+    def get_summary(self, session_id: str) -> Optional[dict]:
+        with self._lock:
+            sess = self._touch(session_id, create=False)
+            return dict(sess.summary) if sess and sess.summary else None
+
+    def set_summary(self, session_id: str, summary: dict):
+        """Replace the session's rolling summary; a session already dropped stays dropped."""
+        with self._lock:
+            sess = self._touch(session_id, create=False)
+            if sess is None:
+                return
+            self._resize(sess, _summary_bytes(summary) - _summary_bytes(sess.summary))
+            sess.summary = dict(summary)
+            self._enforce_cap(keep=session_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return {
+                "sessions": len(self._sessions),
+                "estimated_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "history_depth": self.history_depth,
+                "idle_ttl_s": self.idle_ttl_s,
+                "evicted_idle": self.evicted_idle,
+                "evicted_lru": self.evicted_lru,
+            }
+
+
+class SessionBackend(ABC):
+    """Async interface the app uses for conversation state.
+
+    Implementations: MemorySessionBackend (per-process, default) and
+    SQLiteSessionBackend (shared across uvicorn workers on one host).
+    """
+
+    name = "base"
+
+    @abstractmethod
+    async def append_history(self, session_id: str, role: str, content: str) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def get_history(self, session_id: str, limit: Optional[int] = None) -> list[dict]:
+        ...
+
+    @abstractmethod
+    async def get_settings(self, session_id: str) -> dict[str, str]:
+        ...
+
+    @abstractmethod
+    async def update_settings(self, session_id: str, updates: dict[str, Optional[str]]) -> dict[str, str]:
+        ...
+
+    @abstractmethod
+    async def get_summary(self, session_id: str) -> Optional[dict]:
+        """Rolling summary of turns that left the prompt window: {"text": str, "folded": [fingerprint, ...]}."""
+        ...
+
+    @abstractmethod
+    async def set_summary(self, session_id: str, summary: dict):
+        ...
+
+    @abstractmethod
+    async def stats(self) -> dict:
+        ...
+
+    async def close(self):
+        pass
+
+
+class MemorySessionBackend(SessionBackend):
+    """SessionBackend over InMemorySessionStore; calls are cheap, so they run inline."""
+
+    name = "memory"
+
+    def __init__(self, store: Optional[InMemorySessionStore] = None):
+        self.store = store or InMemorySessionStore()
+
+    async def append_history(self, session_id, role, content):
+        return self.store.append_history(session_id, role, content)
+
+    async def get_history(self, session_id, limit=None):
+        return self.store.get_history(session_id, limit)
+
+    async def get_settings(self, session_id):
+        return self.store.get_settings(session_id)
+
+    async def update_settings(self, session_id, updates):
+        return self.store.update_settings(session_id, updates)
+
+    async def get_summary(self, session_id):
+        return self.store.get_summary(session_id)
+
+    async def set_summary(self, session_id, summary):
+        self.store.set_summary(session_id, summary)
+
+    async def stats(self):
+        return {"backend": self.name, **self.store.stats()}
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS sessions (
+    session_id TEXT PRIMARY KEY,
+    settings   TEXT NOT NULL DEFAULT '{}',
+    last_seen  REAL NOT NULL,
+    summary    TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    role       TEXT NOT NULL,
+    content    TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages (session_id, id);
+"""
+
+WRITE_BATCH_MAX = 64          # writes committed together in one transaction
+WRITE_BATCH_WINDOW_S = 0.005  # how long the writer lingers to grow a batch
+BUSY_TIMEOUT_S = 5.0          # wait for other workers' write locks this long
+TOUCH_INTERVAL_S = 30.0       # reads refresh a session's last_seen at most this often
+
+
+class SQLiteSessionBackend(SessionBackend):
+    """Session state in a WAL-mode SQLite file shared by every worker process on the host.
+
+    Reads run in worker threads on per-thread connections (WAL lets them proceed
+    while another process writes). Writes go to one writer thread per process that
+    commits them in batches, so a burst of turns costs one fsync instead of many.
+    Each write's future resolves only after its batch commits, so a settings POST
+    handled by one worker is visible to every other worker once it returns. Reads keep
+    a session alive like the memory store's do: they queue a last_seen update (at most
+    one per TOUCH_INTERVAL_S per session) that rides along with the next batch.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path: Path, history_depth: int = HISTORY_DEPTH, idle_ttl_s: float = IDLE_TTL_S):
+        self.path = Path(path)
+        self.history_depth = history_depth
+        self.idle_ttl_s = idle_ttl_s
+        self._local = threading.local()
+        self._writes: queue.Queue = queue.Queue()
+        self._writer: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._touched: dict[str, float] = {}  # session_id -> when this process last refreshed last_seen
+        self._last_sweep = 0.0
+        self.batches = 0
+        self.writes = 0
+        self.evicted_idle = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            if "summary" not in {row[1] for row in conn.execute("PRAGMA table_info(sessions)")}:
+                conn.execute("ALTER TABLE sessions ADD COLUMN summary TEXT")  # databases from before summaries
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_S, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")  # WAL + NORMAL: durable across app crashes, cheap commits
+        return conn
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+        return conn
+
+    # --- reads (worker threads) ---
+    def _read_history(self, conn: sqlite3.Connection, session_id: str, limit: int) -> list[dict]:
+        rows = conn.execute(
+            "SELECT role, content FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+            (session_id, limit),
+        ).fetchall()
+        return [{"role": r, "content": c} for r, c in reversed(rows)]
+
+    def _read_settings(self, conn: sqlite3.Connection, session_id: str) -> dict[str, str]:
+        row = conn.execute("SELECT settings FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else {}
+
+    async def get_history(self, session_id, limit=None):
+        n = min(limit or self.history_depth, self.history_depth)
+        self._touch(session_id)
+        return await asyncio.to_thread(lambda: self._read_history(self._conn(), session_id, n))
+
+    async def get_settings(self, session_id):
+        self._touch(session_id)
+        return await asyncio.to_thread(lambda: self._read_settings(self._conn(), session_id))
+
+    async def get_summary(self, session_id):
+        self._touch(session_id)
+        row = await asyncio.to_thread(
+            lambda: self._conn().execute("SELECT summary FROM sessions WHERE session_id = ?", (session_id,)).fetchone()
+        )
+        return json.loads(row[0]) if row and row[0] else None
+
+    # --- writes (batched on the writer thread) ---
+    def _enqueue(self, item: tuple):
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run_writer, name="session-writer", daemon=True)
+                self._writer.start()
+        self._writes.put(item)
+
+    async def _submit(self, op: str, *args):
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._enqueue((op, args, loop, fut))
+        return await fut
+
+    def _touch(self, session_id: str, written: bool = False):
+        """Note activity; reads queue a fire-and-forget last_seen update when one is due."""
+        now = time.monotonic()
+        due = now - self._touched.get(session_id, float("-inf")) >= TOUCH_INTERVAL_S
+        if written or due:
+            self._touched[session_id] = now
+        if len(self._touched) > 4096:
+            self._touched = {k: t for k, t in self._touched.items() if now - t < TOUCH_INTERVAL_S}
+        if due and not written:
+            self._enqueue(("touch", (session_id,), None, None))
+
+    async def append_history(self, session_id, role, content):
+        self._touch(session_id, written=True)
+        return await self._submit("append", session_id, role, content)
+
+    async def update_settings(self, session_id, updates):
+        self._touch(session_id, written=True)
+        return await self._submit("settings", session_id, updates)
+
+    async def set_summary(self, session_id, summary):
+        self._touch(session_id, written=True)
+        await self._submit("summary", session_id, summary)
+
+    def _apply(self, conn: sqlite3.Connection, op: str, args: tuple):
+        now = time.time()
+        if op == "append":
+            session_id, role, content = args
+            conn.execute(
+                "INSERT INTO sessions (session_id, last_seen) VALUES (?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET last_seen = excluded.last_seen",
+                (session_id, now),
+            )
+            conn.execute("INSERT INTO messages (session_id, role, content) VALUES (?, ?, ?)", (session_id, role, content))
+            # Ring buffer: keep only the newest history_depth rows for the session
+            conn.execute(
+                "DELETE FROM messages WHERE session_id = ? AND id <= "
+                "(SELECT id FROM messages WHERE session_id = ? ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                (session_id, session_id, self.history_depth),
+            )
+            return self._read_history(conn, session_id, self.history_depth)
+        if op == "settings":
+            session_id, updates = args
+            settings = self._read_settings(conn, session_id)
+            for k, v in updates.items():
+                if v is None:
+                    settings.pop(k, None)
+                else:
+                    settings[k] = v
+            conn.execute(
+                "INSERT INTO sessions (session_id, settings, last_seen) VALUES (?, ?, ?) "
+                "ON CONFLICT(session_id) DO UPDATE SET settings = excluded.settings, last_seen = excluded.last_seen",
+                (session_id, json.dumps(settings), now),
+            )
+            return settings
+        if op == "summary":
+            session_id, summary = args
+            # A session already swept stays swept
+            conn.execute(
+                "UPDATE sessions SET summary = ?, last_seen = ? WHERE session_id = ?",
+                (json.dumps(summary), now, session_id),
+            )
+            return None
+        if op == "touch":
+            (session_id,) = args
+            # Like the memory store, a read never creates a session
+            conn.execute("UPDATE sessions SET last_seen = ? WHERE session_id = ?", (now, session_id))
+            return None
+        raise ValueError(f"unknown session op {op!r}")
+
+    def _sweep(self, conn: sqlite3.Connection):
+        cutoff = time.time() - self.idle_ttl_s
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM messages WHERE session_id IN (SELECT session_id FROM sessions WHERE last_seen < ?)", (cutoff,))
+            removed = conn.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,)).rowcount
+            conn.execute("COMMIT")
+            self.evicted_idle += max(removed, 0)
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _run_writer(self):
+        conn = self._connect()
+        while True:
+            item = self._writes.get()
+            if item is None:
+                conn.close()
+                return
+            batch = [item]
+            deadline = time.monotonic() + WRITE_BATCH_WINDOW_S
+            while len(batch) < WRITE_BATCH_MAX:
+                try:
+                    nxt = self._writes.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if nxt is None:
+                    self._writes.put(None)  # exit after this batch
+                    break
+                batch.append(nxt)
+            results = []
+            try:
+                conn.execute("BEGIN IMMEDIATE")
+                for op, args, _loop, _fut in batch:
+                    # A bad write fails alone instead of aborting the whole batch
+                    conn.execute("SAVEPOINT w")
+                    try:
+                        results.append((True, self._apply(conn, op, args)))
+                        conn.execute("RELEASE w")
+                    except Exception as e:
+                        conn.execute("ROLLBACK TO w")
+                        conn.execute("RELEASE w")
+                        results.append((False, e))
+                conn.execute("COMMIT")
+                self.batches += 1
+                self.writes += len(batch)
+            except Exception as e:
+                logger.error("Session batch commit failed: %s", e)
+                try:
+                    conn.execute("ROLLBACK")
+                except sqlite3.Error:
+                    pass
+                results = [(False, e)] * len(batch)
+            for (ok, value), (op, _args, loop, fut) in zip(results, batch):
+                if fut is not None:
+                    loop.call_soon_threadsafe(_resolve, fut, ok, value)
+                elif not ok:
+                    logger.debug("Session %s failed: %s", op, value)
+            if time.monotonic() - self._last_sweep > SWEEP_INTERVAL_S:
+                self._last_sweep = time.monotonic()
+                try:
+                    self._sweep(conn)
+                except sqlite3.Error as e:
+                    logger.warning("Session sweep failed: %s", e)
+
+    async def stats(self):
+        def _count():
+            conn = self._conn()
+            sessions = conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+            messages = conn.execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+            return sessions, messages
+        sessions, messages = await asyncio.to_thread(_count)
+        try:
+            db_bytes = sum(p.stat().st_size for p in self.path.parent.glob(self.path.name + "*"))
+        except OSError:
+            db_bytes = 0
+        return {
+            "backend": self.name,
+            "path": str(self.path),
+            "sessions": sessions,
+            "messages": messages,
+            "db_bytes": db_bytes,
+            "history_depth": self.history_depth,
+            "idle_ttl_s": self.idle_ttl_s,
+            "evicted_idle": self.evicted_idle,
+            "write_batches": self.batches,
+            "writes": self.writes,
+            "avg_batch": round(self.writes / self.batches, 2) if self.batches else 0.0,
+            "queued_writes": self._writes.qsize(),
+        }
+
+    async def close(self):
+        with self._lock:
+            writer = self._writer
+        if writer and writer.is_alive():
+            self._writes.put(None)
+            await asyncio.to_thread(writer.join, 5.0)
+
+
+def _resolve(fut: asyncio.Future, ok: bool, value):
+    if fut.done():
+        return
+    if ok:
+        fut.set_result(value)
+    else:
+        fut.set_exception(value)
+
+
+def create_session_backend(default_path: Path) -> SessionBackend:
+    """Backend chosen by SESSION_BACKEND ("memory" default, or "sqlite" for multi-worker setups)."""
+    kind = (os.getenv("SESSION_BACKEND") or "memory").strip().lower()
+    if kind == "sqlite":
+        path = Path(os.getenv("SESSION_DB_PATH") or default_path)
+        logger.info("Session backend: sqlite (%s)", path)
+        return SQLiteSessionBackend(path)
+    if kind != "memory":
+        logger.warning("Unknown SESSION_BACKEND=%r; using in-process memory store", kind)
+    return MemorySessionBackend()
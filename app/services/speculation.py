@@ -0,0 +1,151 @@
+import asyncio
+import logging
+import re
+import time
+from typing import AsyncIterator, Callable, Optional
+
+from .metrics import SPECULATION_LEAD, SPECULATION_WASTED_TOKENS, SPECULATIONS
+from .result_cache import normalize_text
+
+logger = logging.getLogger("voice-agent.speculation")
+
+CHARS_PER_TOKEN = 4  # rough output-token estimate for wasted-work accounting
+
+_PUNCT = re.compile(r"[^\w\s]")
+
+
+def normalize_utterance(text: str) -> str:
+    """Compare partials with formatted finals: case, punctuation and spacing ignored."""
+    return " ".join(_PUNCT.sub(" ", normalize_text(text)).split())
+
+
+class SpeculativeReply:
+    """An LLM reply started before the final transcript, buffered until adopted or discarded.
+
+    Generation runs in its own task; fragments() replays what is buffered and then
+    follows the live stream, so adopting it mid-generation loses nothing.
+    """
+
+    def __init__(self, text: str, stream: AsyncIterator[str]):
+        self.text = text
+        self.key = normalize_utterance(text)
+        self.started = time.monotonic()
+        self._fragments: list[str] = []
+        self._done = False
+        self._error: Optional[BaseException] = None
+        self._changed = asyncio.Event()
+        self._task = asyncio.create_task(self._run(stream), name="llm-speculation")
+
+    async def _run(self, stream: AsyncIterator[str]):
+        try:
+            async for fragment in stream:
+                self._fragments.append(fragment)
+                self._changed.set()
+        except Exception as e:
+            self._error = e
+        finally:
+            self._done = True
+            self._changed.set()
+
+    @property
+    def generated_tokens(self) -> int:
+        return sum(len(f) for f in self._fragments) // CHARS_PER_TOKEN
+
+    async def fragments(self) -> AsyncIterator[str]:
+        """Buffered fragments, then live ones; re-raises a generation error at the point it hit."""
+        i = 0
+        try:
+            while True:
+                while i < len(self._fragments):
+                    yield self._fragments[i]
+                    i += 1
+                if self._done:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                self._changed.clear()
+                await self._changed.wait()
+        finally:
+            if not self._done:
+                self.cancel()  # consumer gone (barge-in): stop the request too
+
+    def cancel(self):
+        if not self._task.done():
+            self._task.cancel()
+
+
+class Speculator:
+    """Per-connection speculative LLM requests driven by streaming partials.
+
+    Every partial restarts a stability timer; once no new partial has arrived for
+    stable_s, start(text) opens the LLM stream in the background. A partial that no
+    longer matches discards the running request. take(final) hands the reply over when
+    the final transcript matches after normalization and discards it otherwise.
+    All methods run on the event loop.
+    """
+
+    def __init__(self, start: Callable[[str], AsyncIterator[str]], stable_s: float = 0.4, can_start: Optional[Callable[[], bool]] = None):
+        self._start = start
+        self.stable_s = stable_s
+        self._can_start = can_start
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.current: Optional[SpeculativeReply] = None
+        self.hits = 0
+        self.misses = 0
+        self.wasted_tokens = 0
+
+    def on_partial(self, text: str):
+        key = normalize_utterance(text)
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self.current is not None and self.current.key != key:
+            self._discard("superseded")
+        if key and self.current is None:
+            self._timer = asyncio.get_running_loop().call_later(self.stable_s, self._fire, text)
+
+    def _fire(self, text: str):
+        self._timer = None
+        if self.current is not None or (self._can_start and not self._can_start()):
+            return
+        logger.info("[speculate] starting on stable partial: %s", text)
+        self.current = SpeculativeReply(text, self._start(text))
+
+    def take(self, final: str) -> Optional[SpeculativeReply]:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        spec = self.current
+        if spec is None:
+            return None
+        if spec.key != normalize_utterance(final):
+            self._discard("miss")
+            return None
+        self.current = None
+        self.hits += 1
+        SPECULATIONS.inc(outcome="hit")
+        lead = time.monotonic() - spec.started
+        SPECULATION_LEAD.observe(lead)
+        logger.info("[speculate] hit: reply started %.0fms before the final transcript", lead * 1000)
+        return spec
+
+    def _discard(self, outcome: str):
+        spec, self.current = self.current, None
+        spec.cancel()
+        wasted = spec.generated_tokens
+        self.wasted_tokens += wasted
+        if outcome != "superseded":
+            self.misses += 1
+        SPECULATIONS.inc(outcome=outcome)
+        SPECULATION_WASTED_TOKENS.inc(wasted)
+        logger.info("[speculate] %s: discarded %r (~%d tokens)", outcome, spec.text, wasted)
+
+    def close(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+        if self.current is not None:
+            self._discard("abandoned")
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "wasted_tokens": self.wasted_tokens}
@@ -6,7 +6,10 @@ from assemblyai.streaming.v3 import (
     StreamingEvents, BeginEvent, TurnEvent,
     TerminationEvent, StreamingError
 )
+from .metrics import UPSTREAM_ERRORS
 default_api_key = os.getenv("ASSEMBLYAI_API_KEY", "")
+# ws://host:port points the client at a local stand-in (benchmarks/fake_upstreams.py)
+STREAMING_HOST = os.getenv("ASSEMBLYAI_STREAMING_HOST") or "streaming.assemblyai.com"
 def on_begin(self, event: BeginEvent):
     print(f"Session started: {event.id}")
 def make_on_turn(partial_callback=None, final_callback=None):
@@ -34,13 +37,14 @@ def on_termination(self, event: TerminationEvent):
 
 def on_error(self, error: StreamingError):
     print("Error:", error)
+    UPSTREAM_ERRORS.inc(upstream="assemblyai")
 
 class AssemblyAIStreamingTranscriber:
     def __init__(self, sample_rate=16000, partial_callback=None, final_callback=None, api_key: str | None = None):
         key = api_key or default_api_key
         self.client = StreamingClient(
             StreamingClientOptions(
-                api_key=key, api_host="streaming.assemblyai.com")
+                api_key=key, api_host=STREAMING_HOST)
         )
         self.client.on(StreamingEvents.Begin, on_begin)
         self.client.on(StreamingEvents.Turn, make_on_turn(partial_callback, final_callback))
@@ -50,5 +54,8 @@ class AssemblyAIStreamingTranscriber:
             sample_rate=sample_rate, format_turns=True))
     def stream_audio(self, audio_chunk: bytes):
         self.client.stream(audio_chunk)
+    def force_endpoint(self):
+        # Ask AssemblyAI to end the current turn now instead of waiting out its silence timer
+        self.client.force_endpoint()
     def close(self):
         self.client.disconnect(terminate=True)
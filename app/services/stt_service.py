@@ -1,59 +1,90 @@
-import time
-import tempfile
 import os
-import assemblyai as aai
+import asyncio
+import logging
+import time
+
+import httpx
 from fastapi import HTTPException
 
+from .http_client import HTTP_POOL
+
+logger = logging.getLogger("voice-agent.stt")
+
+API_BASE = "https://api.assemblyai.com/v2"
 TRANSCRIBE_TIMEOUT = 30
+# Poll fast at first (short clips finish quickly), then back off to spare the API
+POLL_INITIAL_S = 0.25
+POLL_MAX_S = 3.0
+POLL_BACKOFF = 1.6
+# Cap on transcription jobs this process runs against AssemblyAI at once
+MAX_CONCURRENT_JOBS = 8
+
+_job_slots = asyncio.Semaphore(MAX_CONCURRENT_JOBS)
+
+
+def _headers(api_key: str | None) -> dict[str, str]:
+    # Credentials travel with each request; no process-global SDK settings are touched
+    key = api_key or os.getenv("ASSEMBLYAI_API_KEY")
+    if not key:
+        raise HTTPException(status_code=500, detail="AssemblyAI API key missing")
+    return {"authorization": key}
 
-def transcribe_audio_bytes(audio_bytes: bytes, api_key: str | None = None) -> str:
-    prev = getattr(aai.settings, 'api_key', None)
-    if api_key:
-        aai.settings.api_key = api_key
-    config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
-    transcriber = aai.Transcriber(config=config)
-    transcript = transcriber.transcribe(audio_bytes)
-    start_time = time.time()
-    while transcript.status not in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]:
-        if time.time() - start_time > TRANSCRIBE_TIMEOUT:
+
+async def submit_transcription(audio_bytes: bytes, api_key: str | None = None) -> str:
+    """Upload audio and queue a transcript job; returns the job id without waiting for it."""
+    headers = _headers(api_key)
+    client = HTTP_POOL.async_client(API_BASE)
+    resp = await client.post(f"{API_BASE}/upload", headers=headers, content=audio_bytes, timeout=60)
+    resp.raise_for_status()
+    upload_url = resp.json()["upload_url"]
+    resp = await client.post(
+        f"{API_BASE}/transcript",
+        headers=headers,
+        json={"audio_url": upload_url, "speech_model": "best"},
+    )
+    resp.raise_for_status()
+    return resp.json()["id"]
+
+
+async def wait_for_transcript(transcript_id: str, api_key: str | None = None, timeout: float = TRANSCRIBE_TIMEOUT) -> str:
+    """Poll a job with adaptive backoff until it completes; returns the transcript text."""
+    headers = _headers(api_key)
+    client = HTTP_POOL.async_client(API_BASE)
+    deadline = time.monotonic() + timeout
+    delay = POLL_INITIAL_S
+    while True:
+        resp = await client.get(f"{API_BASE}/transcript/{transcript_id}", headers=headers)
+        resp.raise_for_status()
+        data = resp.json()
+        status = data.get("status")
+        if status == "completed":
+            return (data.get("text") or "").strip()
+        if status == "error":
+            logger.error("Transcription %s failed: %s", transcript_id, data.get("error"))
+            raise HTTPException(status_code=500, detail="Transcription failed")
+        if time.monotonic() + delay > deadline:
             raise HTTPException(status_code=500, detail="Transcription timeout")
-        transcript = transcriber.get_transcript(transcript.id)
-        time.sleep(1)
-    if transcript.status == aai.TranscriptStatus.error:
-        raise HTTPException(status_code=500, detail="Transcription failed")
-    result = transcript.text.strip() if transcript.text else ""
-    if api_key is not None:
-        aai.settings.api_key = prev
-    return result
+        await asyncio.sleep(delay)
+        delay = min(delay * POLL_BACKOFF, POLL_MAX_S)
 
 
-def resilient_transcribe(audio_bytes: bytes, api_key: str | None = None) -> str:
-    try:
-        return transcribe_audio_bytes(audio_bytes, api_key=api_key)
-    except Exception:
-        # fallback to temp file path
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".ogg") as tmp:
-            tmp.write(audio_bytes)
-            tmp_path = tmp.name
+async def transcribe_audio_bytes(audio_bytes: bytes, api_key: str | None = None, timeout: float = TRANSCRIBE_TIMEOUT) -> str:
+    """Transcribe a whole clip without blocking the event loop (bounded by MAX_CONCURRENT_JOBS)."""
+    async with _job_slots:
         try:
-            prev = getattr(aai.settings, 'api_key', None)
-            if api_key:
-                aai.settings.api_key = api_key
-            config = aai.TranscriptionConfig(speech_model=aai.SpeechModel.best)
-            transcriber = aai.Transcriber(config=config)
-            transcript = transcriber.transcribe(tmp_path)
-            start_time = time.time()
-            while transcript.status not in [aai.TranscriptStatus.completed, aai.TranscriptStatus.error]:
-                if time.time() - start_time > TRANSCRIBE_TIMEOUT:
-                    raise HTTPException(status_code=500, detail="Transcription timeout")
-                transcript = transcriber.get_transcript(transcript.id)
-                time.sleep(1)
-            if transcript.status == aai.TranscriptStatus.error:
-                raise HTTPException(status_code=500, detail="Transcription failed")
-            text = transcript.text.strip() if transcript.text else ""
-            return text
-        finally:
-            if api_key is not None:
-                aai.settings.api_key = prev
-            if os.path.exists(tmp_path):
-                os.remove(tmp_path)
+            transcript_id = await submit_transcription(audio_bytes, api_key=api_key)
+            return await wait_for_transcript(transcript_id, api_key=api_key, timeout=timeout)
+        except httpx.HTTPError as e:
+            logger.error("AssemblyAI request failed: %s", e)
+            raise HTTPException(status_code=500, detail="Transcription failed")
+
+
+async def resilient_transcribe(audio_bytes: bytes, api_key: str | None = None) -> str:
+    try:
+        return await transcribe_audio_bytes(audio_bytes, api_key=api_key)
+    except HTTPException as e:
+        if e.detail == "Transcription timeout":
+            raise
+        # One retry covers transient upload/network failures
+        logger.warning("Transcription failed (%s); retrying once", e.detail)
+        return await transcribe_audio_bytes(audio_bytes, api_key=api_key)
@@ -0,0 +1,206 @@
+import re
+import unicodedata
+from typing import List, Optional, Tuple
+
+try:
+    from anyascii import anyascii  # type: ignore
+except Exception:  # pragma: no cover - optional; non-Latin scripts are dropped without it
+    anyascii = None  # type: ignore
+
+# Boundary candidates: terminal punctuation (+ closing quotes/brackets) then whitespace, or a line break
+_CANDIDATE = re.compile(r'(?P<end>[.!?]+["\')\]]*)\s+|\s*\n\s*')
+_NON_ASCII = re.compile(r'[^\x00-\x7F]+')
+_SPACE_RUN = re.compile(r'[ \t]{2,}')
+# Emoji, pictographs, variation selectors, zero-width joiners: nothing to say
+_PICTOGRAPHS = re.compile('[\u200d\u2600-\u27bf\ufe0e\ufe0f\U0001f000-\U0001faff]+')
+_TERMINAL = ('.', '!', '?')
+# What a candidate can start with or end on; a buffer ending in these may still grow into one
+_TRAILING = '.!?"\')] \t\n'
+
+# "Dr. Rao" never ends a sentence here
+_TITLES = frozenset({
+    "mr", "mrs", "ms", "dr", "prof", "sr", "jr", "st", "mt", "rev", "hon", "gen", "col", "lt",
+    "sgt", "capt", "vs", "approx", "dept", "est", "e.g", "i.e", "cf", "viz",
+})
+# "No. 5", "p. 12": abbreviations only when a number follows
+_BEFORE_NUMBER = frozenset({"no", "nos", "vol", "p", "pp", "ch", "sec", "fig", "art"})
+# "etc." / "a.m." / "U.S." may end a sentence: break only if the next word is capitalized
+_MAYBE_FINAL = frozenset({"etc", "inc", "ltd", "co", "corp", "a.m", "p.m", "u.s", "u.k"})
+_OPENERS = '(["\''
+
+# Applied after NFKD: typography and letters that don't decompose to ASCII
+_TRANSLIT = str.maketrans({
+    "‘": "'", "’": "'", "‚": "'", "“": '"', "”": '"', "„": '"',
+    "–": "-", "—": " - ", "−": "-", "•": "-", "⁄": "/", "×": " x ",
+    "°": " degrees ", "ß": "ss", "æ": "ae", "Æ": "AE", "œ": "oe", "Œ": "OE",
+    "ø": "o", "Ø": "O", "ł": "l", "Ł": "L", "đ": "d", "Đ": "D",
+    "þ": "th", "Þ": "Th", "ð": "d", "ı": "i",
+})
+
+
+def sanitize_for_tts(text: str) -> str:
+    """ASCII text Murf can speak: accents folded (café -> cafe), typography mapped,
+    other scripts romanized when anyascii is installed, anything left dropped."""
+    if not text or text.isascii():
+        return text or ''
+    text = unicodedata.normalize('NFKD', _PICTOGRAPHS.sub('', text)).translate(_TRANSLIT)
+    if anyascii is not None:
+        text = anyascii(text)
+    return _SPACE_RUN.sub(' ', _NON_ASCII.sub('', text))
+
+
+def _is_boundary(text: str, m: re.Match) -> bool:
+    """Whether candidate m really ends a sentence; needs the character after it."""
+    punct = m.group('end')
+    if punct is None:
+        return True  # line break
+    if punct != '.':
+        return True  # '!', '?', '...', or closed by a quote/bracket
+    i = m.start()
+    j = i
+    while j > 0 and not text[j - 1].isspace():
+        j -= 1
+    token = text[j:i].lstrip(_OPENERS)
+    nxt = text[m.end()] if m.end() < len(text) else ''
+    if not token:
+        return True
+    low = token.lower()
+    if low in _TITLES:
+        return False
+    if low in _BEFORE_NUMBER:
+        return not nxt.isdigit()
+    if low in _MAYBE_FINAL:
+        return nxt.isupper()
+    if len(token) == 1 and token.isupper():
+        return False  # initial: "J. K. Rowling"
+    if token.isdigit() and len(token) <= 2 and (j == 0 or text[j - 1] == '\n'):
+        return False  # list marker at line start: "1. Gather your army"
+    return True
+
+
+def _next_break(text: str, pos: int = 0) -> Tuple[Optional[Tuple[int, int]], int]:
+    """First real boundary at or after pos as (sentence_end, next_start), plus where to resume
+    scanning if none is found: the trailing punctuation/quote/space run is rescanned once
+    more text arrives, since 'Go."' plus ' Then' only becomes a candidate then."""
+    for m in _CANDIDATE.finditer(text, pos):
+        if m.end() >= len(text):
+            return None, m.start()
+        if _is_boundary(text, m):
+            return (m.end('end') if m.group('end') else m.start(), m.end()), 0
+    return None, len(text.rstrip(_TRAILING))
+
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of a complete text (abbreviation- and number-aware)."""
+    out: List[str] = []
+    while text:
+        brk, _ = _next_break(text)
+        if brk is None:
+            break
+        s = text[:brk[0]].strip()
+        if s:
+            out.append(s)
+        text = text[brk[1]:]
+    if text.strip():
+        out.append(text.strip())
+    return out
+
+
+def _wrap_starts(sentence: str, max_chars: int) -> List[int]:
+    """Offsets where _hard_wrap() starts each piece of sentence (before stripping)."""
+    starts: List[int] = []
+    start = 0
+    while start < len(sentence):
+        starts.append(start)
+        end = min(start + max_chars, len(sentence))
+        # try to break at last space in window
+        window = sentence[start:end]
+        brk = window.rfind(' ')
+        if end == len(sentence) or brk == -1 or brk < int(max_chars * 0.6):
+            brk = end - start
+        start += brk
+    return starts
+
+
+def _hard_wrap(sentence: str, max_chars: int) -> List[str]:
+    """Wrap an over-long sentence on spaces into pieces of at most max_chars."""
+    starts = _wrap_starts(sentence, max_chars)
+    pieces = (sentence[a:b].strip() for a, b in zip(starts, starts[1:] + [len(sentence)]))
+    return [p for p in pieces if p]
+
+
+def split_for_tts(text: str, max_chars: int) -> List[str]:
+    """Split a complete reply into Murf-safe chunks (sentences glued up to max_chars)."""
+    chunks: List[str] = []
+    if not text:
+        return chunks
+    text = sanitize_for_tts(text)
+    paras = [p.strip() for p in text.split('\n\n') if p and p.strip()]
+    for para in paras if paras else [text]:
+        parts = split_sentences(para)
+        buf = ''
+        for s in parts:
+            if len(s) > max_chars:
+                if buf:
+                    chunks.append(buf)
+                    buf = ''
+                chunks.extend(_hard_wrap(s, max_chars))
+                continue
+            if not buf:
+                buf = s
+            elif len(buf) + 1 + len(s) <= max_chars:
+                buf += ' ' + s
+            else:
+                chunks.append(buf)
+                buf = s
+        if buf:
+            chunks.append(buf)
+    return chunks
+
+
+class IncrementalSegmenter:
+    """Turn a stream of LLM text fragments into speakable chunks as soon as they complete.
+
+    A sentence is only emitted once the next one has started, so whatever remains at
+    flush() is always the last chunk of the reply (the one that gets end=True). Text
+    already ruled out as a boundary is not rescanned when the next fragment arrives.
+    """
+
+    def __init__(self, max_chars: int = 240):
+        self.max_chars = max_chars
+        self._buf = ''
+        self._scan = 0
+
+    def feed(self, fragment: str) -> List[str]:
+        """Add a fragment; return the chunks completed by it (possibly none)."""
+        self._buf += sanitize_for_tts(fragment)
+        chunks: List[str] = []
+        while True:
+            brk, self._scan = _next_break(self._buf, self._scan)
+            if brk is not None:
+                sentence = self._buf[:brk[0]].strip()
+                self._buf = self._buf[brk[1]:]
+                if sentence:
+                    chunks.extend(_hard_wrap(sentence, self.max_chars))
+                continue
+            if len(self._buf) > self.max_chars * 2:
+                # No boundary in sight: release full-size pieces, keep the rest buffered as is
+                # (a trailing space still separates it from the next fragment)
+                starts = _wrap_starts(self._buf, self.max_chars)
+                chunks.extend(_hard_wrap(self._buf[:starts[-1]], self.max_chars))
+                self._buf = self._buf[starts[-1]:]
+                self._scan = 0
+                continue
+            break
+        return chunks
+
+    def flush(self) -> List[str]:
+        """Return the remaining text as final chunk(s), terminated for natural TTS prosody."""
+        tail = ' '.join(self._buf.split())
+        self._buf = ''
+        self._scan = 0
+        if not tail:
+            return []
+        if not tail.endswith(_TERMINAL):
+            tail += '.'
+        return _hard_wrap(tail, self.max_chars)
@@ -1,21 +1,53 @@
-import requests
+import asyncio
+import logging
+
+import httpx
 from fastapi import HTTPException
 
+from .audio_cache import AUDIO_CACHE, AudioCache
+from .http_client import HTTP_POOL
+
+logger = logging.getLogger("voice-agent.tts")
+
+CACHE_URL_PREFIX = "/tts/cache/"  # served by main.py from the audio cache
+REST_FORMAT = "murf-rest"
+
+
 class MurfTTSClient:
-    def __init__(self, api_key: str, base_url: str = "https://api.murf.ai/v1/speech/generate"):
+    def __init__(self, api_key: str, base_url: str = "https://api.murf.ai/v1/speech/generate", cache: AudioCache | None = AUDIO_CACHE):
         self.api_key = api_key
         self.base_url = base_url
+        self.cache = cache
+        self._fills: set[asyncio.Task] = set()
 
-    def synthesize(self, text: str, voice_id: str) -> str:
+    async def synthesize(self, text: str, voice_id: str) -> str:
+        cache_key = None
+        if self.cache is not None and self.cache.cacheable(text):
+            cache_key = self.cache.key(text, voice_id, REST_FORMAT)
+            if await self.cache.atouch(cache_key):
+                return CACHE_URL_PREFIX + cache_key
         headers = {"api-key": self.api_key, "Content-Type": "application/json"}
         payload = {"text": text, "voiceId": voice_id}
         try:
-            resp = requests.post(self.base_url, headers=headers, json=payload, timeout=40)
+            # Pooled keep-alive client: no new TCP+TLS handshake per request
+            resp = await HTTP_POOL.async_client(self.base_url).post(self.base_url, headers=headers, json=payload, timeout=40)
             resp.raise_for_status()
             audio_url = resp.json().get("audioFile")
             if not audio_url:
                 raise HTTPException(status_code=500, detail="No audio file")
-            return audio_url
-        except requests.exceptions.RequestException:
+        except httpx.HTTPError:
             raise HTTPException(status_code=500, detail="TTS service failed")
+        if cache_key is not None:
+            # Murf's URL answers this request; the next one for the same text is served locally
+            task = asyncio.create_task(self._fill_cache(cache_key, audio_url))
+            self._fills.add(task)
+            task.add_done_callback(self._fills.discard)
+        return audio_url
 
+    async def _fill_cache(self, cache_key: str, audio_url: str):
+        try:
+            resp = await HTTP_POOL.async_client(audio_url).get(audio_url, timeout=40)
+            resp.raise_for_status()
+            await asyncio.to_thread(self.cache.put, cache_key, [resp.content])
+        except Exception as e:
+            logger.debug("[tts-cache] could not fetch %s: %s", audio_url, e)
@@ -0,0 +1,152 @@
+import logging
+import threading
+from collections import deque
+from typing import Optional
+
+try:
+    import numpy as np  # type: ignore
+except Exception:  # pragma: no cover - optional dependency; /ws streams everything without it
+    np = None  # type: ignore
+
+logger = logging.getLogger("voice-agent.vad")
+
+SAMPLE_RATE = 16000
+SUBFRAME_MS = 10               # analysis resolution inside each packet
+MIN_SPEECH_DBFS = -50.0        # nothing quieter than this counts as speech
+NOISE_MARGIN_DB = 10.0         # speech must sit this far above the tracked noise floor
+LOUD_DBFS = -30.0              # loud enough to be speech whatever its zero-crossing rate
+MAX_SPEECH_ZCR = 0.35          # crossings/sample above this (at modest energy) is hiss, not voice
+SPEECH_SUBFRAME_RATIO = 0.4    # share of voiced subframes that makes a packet speech
+HANGOVER_MS = 500              # trailing silence still forwarded before declaring speech_end
+PREROLL_MS = 300               # audio replayed ahead of speech_start so onsets are not clipped
+KEEPALIVE_MS = 1000            # during silence forward one packet this often (keeps the STT session warm)
+NOISE_ADAPT = 0.05             # EMA rate of the noise floor during silence
+
+SPEECH_START = "speech_start"
+SPEECH_END = "speech_end"
+
+
+class VadStats:
+    def __init__(self):
+        self.packets_in = 0
+        self.packets_out = 0
+        self.speech_ms = 0
+        self.silence_ms = 0
+        self.bytes_suppressed = 0
+        self.utterances = 0
+
+    def merge(self, other: "VadStats"):
+        for k, v in vars(other).items():
+            setattr(self, k, getattr(self, k) + v)
+
+    def as_dict(self) -> dict:
+        return {
+            **vars(self),
+            "forwarded_pct": round(100 * self.packets_out / self.packets_in, 1) if self.packets_in else 0.0,
+        }
+
+
+class VoiceActivityDetector:
+    """Energy + zero-crossing VAD with hangover and pre-roll, for PCM16 mono packets.
+
+    process() takes one packet and returns (packets to forward, event) where event is
+    SPEECH_START, SPEECH_END or None. Silence is thinned to one keep-alive packet per
+    KEEPALIVE_MS; when speech starts, the last PREROLL_MS of held-back audio is sent first.
+    """
+
+    def __init__(self, sample_rate: int = SAMPLE_RATE, hangover_ms: int = HANGOVER_MS, preroll_ms: int = PREROLL_MS, keepalive_ms: int = KEEPALIVE_MS):
+        if np is None:
+            raise RuntimeError("numpy is required for VAD")
+        self.sample_rate = sample_rate
+        self.subframe = sample_rate * SUBFRAME_MS // 1000
+        self.hangover_ms = hangover_ms
+        self.preroll_ms = preroll_ms
+        self.keepalive_ms = keepalive_ms
+        self.in_speech = False
+        self.noise_db = MIN_SPEECH_DBFS - NOISE_MARGIN_DB
+        self._silence_run_ms = 0
+        self._since_keepalive_ms = keepalive_ms  # first silent packet goes out immediately
+        self._preroll: deque = deque()
+        self._preroll_ms = 0
+        self.stats = VadStats()
+
+    def _is_speech(self, packet: bytes) -> tuple[bool, float]:
+        samples = np.frombuffer(packet, dtype="<i2")
+        n = len(samples) // self.subframe * self.subframe
+        if n == 0:
+            return False, self.noise_db
+        frames = samples[:n].astype(np.float32).reshape(-1, self.subframe) / 32768.0
+        rms = np.sqrt(np.mean(frames * frames, axis=1)) + 1e-9
+        db = 20.0 * np.log10(rms)
+        signs = np.signbit(frames)
+        zcr = np.count_nonzero(signs[:, 1:] != signs[:, :-1], axis=1) / self.subframe
+        threshold = max(MIN_SPEECH_DBFS, self.noise_db + NOISE_MARGIN_DB)
+        voiced = (db > threshold) & ((zcr < MAX_SPEECH_ZCR) | (db > LOUD_DBFS))
+        return bool(np.mean(voiced) >= SPEECH_SUBFRAME_RATIO), float(np.median(db))
+
+    def process(self, packet: bytes) -> tuple[list[bytes], Optional[str]]:
+        ms = len(packet) * 1000 // (2 * self.sample_rate)
+        st = self.stats
+        st.packets_in += 1
+        speech, level_db = self._is_speech(packet)
+        out: list[bytes] = []
+        event = None
+        if speech:
+            st.speech_ms += ms
+            self._silence_run_ms = 0
+            if not self.in_speech:
+                self.in_speech = True
+                event = SPEECH_START
+                st.utterances += 1
+                out.extend(self._preroll)
+                self._preroll.clear()
+                self._preroll_ms = 0
+            out.append(packet)
+        else:
+            st.silence_ms += ms
+            if self.in_speech:
+                self._silence_run_ms += ms
+                out.append(packet)  # hangover: the STT still hears natural trailing silence
+                if self._silence_run_ms >= self.hangover_ms:
+                    self.in_speech = False
+                    event = SPEECH_END
+                    self._since_keepalive_ms = 0
+            else:
+                self.noise_db += NOISE_ADAPT * (level_db - self.noise_db)
+                self._since_keepalive_ms += ms
+                if self._since_keepalive_ms >= self.keepalive_ms:
+                    # Audio older than a forwarded packet can't be replayed in order later
+                    self._since_keepalive_ms = 0
+                    self._preroll.clear()
+                    self._preroll_ms = 0
+                    out.append(packet)
+                else:
+                    st.bytes_suppressed += len(packet)
+                    self._preroll.append(packet)
+                    self._preroll_ms += ms
+                    while self._preroll_ms > self.preroll_ms and len(self._preroll) > 1:
+                        old = self._preroll.popleft()
+                        self._preroll_ms -= len(old) * 1000 // (2 * self.sample_rate)
+        st.packets_out += len(out)
+        return out, event
+
+
+_totals_lock = threading.Lock()
+VAD_TOTALS = VadStats()
+_warned = False
+
+
+def create_vad(**kwargs) -> Optional[VoiceActivityDetector]:
+    """A VAD for one connection, or None (stream everything) when numpy is unavailable."""
+    global _warned
+    if np is None:
+        if not _warned:
+            logger.warning("numpy not installed; VAD disabled, all audio is streamed")
+            _warned = True
+        return None
+    return VoiceActivityDetector(**kwargs)
+
+
+def record_vad(stats: VadStats):
+    with _totals_lock:
+        VAD_TOTALS.merge(stats)
@@ -2,10 +2,14 @@ import os
 import logging
 from typing import Any, Dict, Optional
 
-import requests
+from .http_client import HTTP_POOL
+from .result_cache import TTLCache, normalize_text
 
 logger = logging.getLogger("voice-agent.weather")
 
+# Current conditions change quickly; keep entries short-lived
+WEATHER_CACHE = TTLCache("weather", max_entries=512, ttl_s=120.0)
+
 
 class OpenWeather:
     """Thin wrapper around OpenWeather current weather API.
@@ -14,30 +18,66 @@ class OpenWeather:
     Exposes current_weather(location, units) -> Dict suitable as a tool response.
     """
 
-    BASE_URL = "https://api.openweathermap.org/data/2.5/weather"
+    BASE_URL = os.getenv("OPENWEATHER_URL") or "https://api.openweathermap.org/data/2.5/weather"
 
     def __init__(self, api_key: Optional[str] = None):
         self.api_key = api_key or os.getenv("OPENWEATHER_API_KEY")
         if not self.api_key:
             raise ValueError("OPENWEATHER_API_KEY is not set")
 
+    @staticmethod
+    def _units(units: str) -> str:
+        units = (units or "metric").lower()
+        return units if units in ("metric", "imperial") else "metric"
+
     def current_weather(self, location: str, units: str = "metric") -> Dict[str, Any]:
         """Fetch current weather by city name or 'city,countryCode'.
 
         - location: e.g., 'Delhi', 'London,UK', 'San Francisco,US'
         - units: 'metric' | 'imperial' (default 'metric')
+
+        Repeated lookups (case/whitespace-folded location + units) are served from WEATHER_CACHE.
         """
-        units = (units or "metric").lower()
-        if units not in ("metric", "imperial"):
-            units = "metric"
+        units = self._units(units)
+        return WEATHER_CACHE.get_or_compute(
+            (normalize_text(location), units),
+            lambda: self._current_weather(location, units),
+            cacheable=lambda r: "error" not in r,
+        )
 
-        params = {
+    async def acurrent_weather(self, location: str, units: str = "metric") -> Dict[str, Any]:
+        """Async current_weather() on the pooled async HTTP client."""
+        units = self._units(units)
+        return await WEATHER_CACHE.aget_or_compute(
+            (normalize_text(location), units),
+            lambda: self._acurrent_weather(location, units),
+            cacheable=lambda r: "error" not in r,
+        )
+
+    def _params(self, location: str, units: str) -> Dict[str, str]:
+        return {
             "q": location,
             "appid": self.api_key,
             "units": units,
         }
+
+    def _current_weather(self, location: str, units: str) -> Dict[str, Any]:
+        try:
+            resp = HTTP_POOL.sync_client(self.BASE_URL).get(self.BASE_URL, params=self._params(location, units), timeout=10)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            logger.error("OpenWeather error: %s", e)
+            return {
+                "location": location,
+                "units": units,
+                "error": str(e),
+            }
+        return self._summarize(data, location, units)
+
+    async def _acurrent_weather(self, location: str, units: str) -> Dict[str, Any]:
         try:
-            resp = requests.get(self.BASE_URL, params=params, timeout=10)
+            resp = await HTTP_POOL.async_client(self.BASE_URL).get(self.BASE_URL, params=self._params(location, units), timeout=10)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
@@ -47,7 +87,10 @@ class OpenWeather:
                 "units": units,
                 "error": str(e),
             }
+        return self._summarize(data, location, units)
 
+    @staticmethod
+    def _summarize(data: Dict[str, Any], location: str, units: str) -> Dict[str, Any]:
         # Normalize useful fields
         name = data.get("name")
         sys = data.get("sys") or {}
@@ -7,8 +7,13 @@ try:
 except Exception:  # pragma: no cover - optional dependency until installed
     TavilyClient = None  # type: ignore
 
+from .result_cache import TTLCache, normalize_text
+
 logger = logging.getLogger("voice-agent.tavily")
 
+# Search results go stale slowly; shared across sessions and API keys
+SEARCH_CACHE = TTLCache("web_search", max_entries=256, ttl_s=600.0)
+
 
 class TavilySearch:
     """Thin wrapper around Tavily's search API.
@@ -23,7 +28,8 @@ class TavilySearch:
             raise ValueError("TAVILY_API_KEY is not set")
         if TavilyClient is None:
             raise RuntimeError("tavily-python not installed. Add 'tavily-python' to requirements.txt")
-        self.client = TavilyClient(api_key=api_key)
+        # TAVILY_API_BASE_URL redirects to a local stand-in (load tests)
+        self.client = TavilyClient(api_key=api_key, api_base_url=os.getenv("TAVILY_API_BASE_URL") or None)
 
     def search(self, query: str, max_results: int = 5) -> Dict[str, Any]:
         """Perform a web search and return a compact structured result.
@@ -32,8 +38,16 @@ class TavilySearch:
         - max_results: cap number of result items (1-10)
 
         Returns a dict like {"answer": str | None, "results": [{"title","url","content"}], "query": str}
+        Identical searches (case/whitespace-folded) are served from SEARCH_CACHE.
         """
         max_results = max(1, min(int(max_results or 5), 10))
+        return SEARCH_CACHE.get_or_compute(
+            (normalize_text(query), max_results),
+            lambda: self._search(query, max_results),
+            cacheable=lambda r: "error" not in r,
+        )
+
+    def _search(self, query: str, max_results: int) -> Dict[str, Any]:
         try:
             res = self.client.search(
                 query=query,
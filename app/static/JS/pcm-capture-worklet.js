@@ -0,0 +1,46 @@
+// Mic capture on the audio rendering thread: collects 128-sample render quanta into
+// small PCM16 frames (default 20 ms at 16 kHz) and transfers each frame to the main thread.
+class PcmCaptureProcessor extends AudioWorkletProcessor {
+  constructor(options) {
+    super();
+    const opts = (options && options.processorOptions) || {};
+    this.targetRate = opts.targetRate || 16000;
+    this.frameSamples = Math.round(this.targetRate * (opts.frameMs || 20) / 1000);
+    // Resample only if the browser ignored the requested AudioContext sampleRate
+    this.step = sampleRate / this.targetRate;
+    this.pos = 0;
+    this.frame = new Int16Array(this.frameSamples);
+    this.fill = 0;
+  }
+
+  push(sample) {
+    const s = sample < -1 ? -1 : sample > 1 ? 1 : sample;
+    this.frame[this.fill++] = s < 0 ? s * 0x8000 : s * 0x7FFF;
+    if (this.fill === this.frameSamples) {
+      const out = this.frame.buffer;
+      this.port.postMessage(out, [out]);
+      this.frame = new Int16Array(this.frameSamples);
+      this.fill = 0;
+    }
+  }
+
+  process(inputs) {
+    const input = inputs[0] && inputs[0][0];
+    if (!input) return true;
+    if (this.step === 1) {
+      for (let i = 0; i < input.length; i++) this.push(input[i]);
+    } else {
+      // Linear-interpolated decimation to targetRate
+      for (; this.pos < input.length - 1; this.pos += this.step) {
+        const i = Math.floor(this.pos);
+        const f = this.pos - i;
+        this.push(input[i] + (input[i + 1] - input[i]) * f);
+      }
+      this.pos -= input.length;
+      if (this.pos < 0) this.pos = 0;
+    }
+    return true;
+  }
+}
+
+registerProcessor('pcm-capture', PcmCaptureProcessor);
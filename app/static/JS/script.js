@@ -45,89 +45,177 @@ document.addEventListener('DOMContentLoaded', () => {
   const uiSoundStop = new Audio('/static/sounds/mic_stop.mp3');
   const uiSoundMute = new Audio('/static/sounds/mic_mute.mp3');
 
-  // ---- Murf Streaming Audio Playback (WAV buffering) ----
+  // ---- Murf Streaming Audio Playback (progressive) ----
+  // Each chunk's PCM is scheduled as its own AudioBufferSourceNode back-to-back on the
+  // AudioContext clock, so playback starts with the first chunk instead of after tts_done.
+  const MURF_SAMPLE_RATE = 24000;   // matches sample_rate requested in murf_ws_service.py
+  const MURF_JITTER_S = 0.12;       // audio to queue before (re)starting playback
+  const MURF_LEAD_S = 0.02;         // scheduling headroom for the first node
+  const MURF_MAX_HOLD_MS = 250;     // never hold a partial jitter buffer longer than this
   let murfAudioCtx = null;
-  let murfAudioChunks = [];
-  let murfPlaying = false;
-  let murfFirstChunk = true;
-  let murfSourceNode = null;
+  let murfPlaying = false;          // a turn's audio stream is open
+  let murfStreamDone = false;
+  let murfSampleRate = MURF_SAMPLE_RATE;
+  let murfCarry = null;             // odd trailing byte split across chunks
+  let murfPending = [];             // decoded chunks waiting for the jitter buffer
+  let murfPendingSec = 0;
+  let murfNextTime = 0;             // context time where the next chunk starts
+  let murfHoldTimer = null;
+  const murfSources = new Set();
+
+  function stopMurfPlayback() {
+    for (const src of murfSources) {
+      try { src.onended = null; src.stop(0); src.disconnect(); } catch(_) {}
+    }
+    murfSources.clear();
+    murfPending = [];
+    murfPendingSec = 0;
+    murfCarry = null;
+    murfNextTime = 0;
+    clearTimeout(murfHoldTimer);
+    murfHoldTimer = null;
+  }
 
   function initMurfStreamPlayback() {
     if (!murfAudioCtx) {
       murfAudioCtx = new (window.AudioContext || window.webkitAudioContext)();
     }
-    murfAudioChunks = [];
+    try { if (murfAudioCtx.state === 'suspended') murfAudioCtx.resume(); } catch(_) {}
+    // Stop any previous turn cleanly
+    stopMurfPlayback();
     murfPlaying = true;
-  murfFirstChunk = true;
-  // Stop any previous source cleanly
-  try { if (murfSourceNode) { murfSourceNode.onended = null; murfSourceNode.stop(0); } } catch(_) {}
-  murfSourceNode = null;
-    // Optionally show buffering/loading indicator
+    murfStreamDone = false;
+    murfSampleRate = MURF_SAMPLE_RATE;
     if (llmStatus) llmStatus.textContent = 'Buffering Murf audio…';
   }
 
-  function pushMurfAudioChunk(b64) {
-    // Decode base64 to Uint8Array and buffer
-    const binary = atob(b64);
-    const len = binary.length;
-    const bytes = new Uint8Array(len);
-    for (let i = 0; i < len; i++) bytes[i] = binary.charCodeAt(i);
-    // If a non-first chunk accidentally includes a WAV header, strip it
-    // WAV header starts with 'RIFF' (52 49 46 46)
-    if (!murfFirstChunk && len >= 44 && bytes[0] === 0x52 && bytes[1] === 0x49 && bytes[2] === 0x46 && bytes[3] === 0x46) {
-      murfAudioChunks.push(bytes.subarray(44));
-    } else {
-      murfAudioChunks.push(bytes);
+  // Offset of PCM data in a chunk: skips a RIFF/WAVE header (any chunk may carry one)
+  // and picks up the sample rate from its fmt block.
+  function wavDataOffset(bytes) {
+    if (bytes.length < 12 || bytes[0] !== 0x52 || bytes[1] !== 0x49 || bytes[2] !== 0x46 || bytes[3] !== 0x46) return 0;
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    let off = 12;
+    while (off + 8 <= bytes.length) {
+      const id = String.fromCharCode(bytes[off], bytes[off + 1], bytes[off + 2], bytes[off + 3]);
+      const size = view.getUint32(off + 4, true);
+      if (id === 'fmt ' && off + 16 <= bytes.length) {
+        murfSampleRate = view.getUint32(off + 12, true) || murfSampleRate;
+      }
+      if (id === 'data') return off + 8;
+      off += 8 + size + (size & 1);
     }
-    murfFirstChunk = false;
-    // console.log('[Murf] Received audio chunk, length:', len);
+    return Math.min(44, bytes.length);
   }
 
-  function finalizeMurfStream() {
-    murfPlaying = false;
-    if (!murfAudioCtx || murfAudioChunks.length === 0) return;
-  try { if (murfAudioCtx.state === 'suspended') murfAudioCtx.resume(); } catch(_) {}
-    // Concatenate all chunks into one Uint8Array
-    const totalLen = murfAudioChunks.reduce((acc, arr) => acc + arr.length, 0);
-    const fullAudio = new Uint8Array(totalLen);
-    let offset = 0;
-    for (const arr of murfAudioChunks) {
-      fullAudio.set(arr, offset);
-      offset += arr.length;
+  // PCM16 little-endian -> Float32 samples (DataView: chunk views need not be 2-byte aligned)
+  function pcm16ToFloat32(bytes) {
+    if (murfCarry !== null) {
+      const joined = new Uint8Array(bytes.length + 1);
+      joined[0] = murfCarry;
+      joined.set(bytes, 1);
+      bytes = joined;
+      murfCarry = null;
     }
-    // If first chunk looked like WAV, fix RIFF sizes to reflect concatenated data
-    if (murfAudioChunks.length > 0 && murfAudioChunks[0].length >= 44) {
-      const first = murfAudioChunks[0];
-      if (first[0] === 0x52 && first[1] === 0x49 && first[2] === 0x46 && first[3] === 0x46) {
-        // Update ChunkSize (at offset 4) and Subchunk2Size (at offset 40)
-        const view = new DataView(fullAudio.buffer);
-        const dataSize = fullAudio.length - 44; // bytes after header
-        // ChunkSize = 36 + Subchunk2Size
-        view.setUint32(4, 36 + dataSize, true);
-        view.setUint32(40, dataSize, true);
-      }
+    if (bytes.length & 1) {
+      murfCarry = bytes[bytes.length - 1];
+      bytes = bytes.subarray(0, bytes.length - 1);
     }
-    // Decode and play the full WAV file
-    murfAudioCtx.decodeAudioData(fullAudio.buffer, (audioBuffer) => {
-      const source = murfAudioCtx.createBufferSource();
-      source.buffer = audioBuffer;
-      source.connect(murfAudioCtx.destination);
-      murfSourceNode = source;
-      // Update status
-      if (llmStatus) llmStatus.textContent = 'Speaking…';
-      // Close context only after playback finishes to avoid cutting tail
-      source.onended = () => {
-        try { source.disconnect(); } catch(_) {}
+    const n = bytes.length >> 1;
+    const out = new Float32Array(n);
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    for (let i = 0; i < n; i++) out[i] = view.getInt16(i * 2, true) / 0x8000;
+    return out;
+  }
+
+  function scheduleMurfSamples(samples) {
+    const ctx = murfAudioCtx;
+    const buf = ctx.createBuffer(1, samples.length, murfSampleRate);
+    buf.getChannelData(0).set(samples);
+    const src = ctx.createBufferSource();
+    src.buffer = buf;
+    src.connect(ctx.destination);
+    const startAt = Math.max(murfNextTime, ctx.currentTime + MURF_LEAD_S);
+    src.start(startAt);
+    murfNextTime = startAt + buf.duration;
+    murfSources.add(src);
+    if (llmStatus) llmStatus.textContent = 'Speaking…';
+    src.onended = () => {
+      try { src.disconnect(); } catch(_) {}
+      murfSources.delete(src);
+      if (murfStreamDone && murfSources.size === 0 && murfPending.length === 0) {
         if (llmStatus) llmStatus.textContent = '';
-        try { murfAudioCtx && murfAudioCtx.close(); } catch(_) {}
-        murfAudioCtx = null;
-        murfSourceNode = null;
-      };
-      source.start();
-    }, (err) => {
-      console.error('Murf WAV decode error', err);
-      if (llmStatus) llmStatus.textContent = 'Audio decode error';
-    });
+      }
+    };
+  }
+
+  function flushMurfPending(force) {
+    if (!murfAudioCtx || murfPending.length === 0) return;
+    // Underrun (or first chunk): hold audio until the jitter buffer is full
+    const starved = murfNextTime <= murfAudioCtx.currentTime;
+    if (starved && !force && murfPendingSec < MURF_JITTER_S) {
+      if (!murfHoldTimer) murfHoldTimer = setTimeout(() => { murfHoldTimer = null; flushMurfPending(true); }, MURF_MAX_HOLD_MS);
+      return;
+    }
+    clearTimeout(murfHoldTimer);
+    murfHoldTimer = null;
+    for (const samples of murfPending) scheduleMurfSamples(samples);
+    murfPending = [];
+    murfPendingSec = 0;
+  }
+
+  // Binary TTS frames (see services/audio_frames.py): 12-byte big-endian header + audio
+  const AUDIO_FRAME_VERSION = 1;
+  const AUDIO_FRAME_HEADER = 12;
+  let murfTurn = -1;
+  let murfFlushedTurn = -1;
+  let murfNextSeq = 0;
+
+  function parseAudioFrame(buf) {
+    if (buf.byteLength < AUDIO_FRAME_HEADER) return null;
+    const view = new DataView(buf);
+    const version = view.getUint8(0);
+    if (version !== AUDIO_FRAME_VERSION) {
+      console.warn('[stream] unsupported audio frame version', version);
+      return null;
+    }
+    return {
+      format: view.getUint8(1),
+      flags: view.getUint16(2),
+      turn: view.getUint32(4),
+      seq: view.getUint32(8),
+      // View over the received buffer: no copy
+      audio: new Uint8Array(buf, AUDIO_FRAME_HEADER),
+    };
+  }
+
+  function handleAudioFrame(buf) {
+    const frame = parseAudioFrame(buf);
+    if (!frame || frame.turn === murfFlushedTurn) return;
+    if (!murfPlaying || frame.turn !== murfTurn) {
+      initMurfStreamPlayback();
+      murfTurn = frame.turn;
+      murfNextSeq = 0;
+    }
+    if (frame.seq !== murfNextSeq) console.warn('[stream] audio frame out of order', frame.seq, 'expected', murfNextSeq);
+    murfNextSeq = frame.seq + 1;
+    pushMurfAudioChunk(frame.audio);
+  }
+
+  function pushMurfAudioChunk(bytes) {
+    if (!murfAudioCtx) return;
+    const samples = pcm16ToFloat32(bytes.subarray(wavDataOffset(bytes)));
+    if (samples.length === 0) return;
+    murfPending.push(samples);
+    murfPendingSec += samples.length / murfSampleRate;
+    flushMurfPending(false);
+  }
+
+  function finalizeMurfStream() {
+    // Play whatever is still held back, however short
+    murfPlaying = false;
+    murfStreamDone = true;
+    flushMurfPending(true);
+    if (murfSources.size === 0 && llmStatus) llmStatus.textContent = '';
   }
 
   // ---- Autoplay Reliability Helpers (no external silence file needed) ----
@@ -521,13 +609,24 @@ function playAgentAudio(url, force = false) {
     streamWS.onmessage = function(event) {
       try {
         const raw = event.data;
+        if (raw instanceof ArrayBuffer) {
+          // Streaming Murf audio chunk received
+          handleAudioFrame(raw);
+          return;
+        }
         try {
           const obj = JSON.parse(raw);
-            if (obj && obj.type === 'tts_chunk' && typeof obj.audio_b64 === 'string') {
-              // Streaming Murf audio chunk received
-              if (!murfPlaying) initMurfStreamPlayback();
-              pushMurfAudioChunk(obj.audio_b64);
-              return;
+          if (obj && obj.type === 'tts_flush') {
+            // Barge-in: drop the interrupted reply's queued audio and any frames still in flight
+            murfFlushedTurn = obj.turn;
+            murfPlaying = false;
+            stopMurfPlayback();
+            if (llmStatus) llmStatus.textContent = '';
+            return;
+          }
+          if (obj && (obj.type === 'speech_start' || obj.type === 'speech_end')) {
+            // Server-side VAD events
+            return;
           }
             if (obj && obj.type === 'tts_done') {
               finalizeMurfStream();
@@ -576,27 +675,43 @@ function playAgentAudio(url, force = false) {
       return t.replace(/\s+/g,' ').replace(/[\u200B-\u200D\uFEFF]/g,'').trim();
     }
 
-      // Use Web Audio API for PCM streaming
+      // Mic capture: AudioWorklet posts 20 ms PCM16 frames from the audio thread; the server
+      // re-chunks them into AssemblyAI-sized packets. ScriptProcessor is only a fallback.
       streamMedia = await navigator.mediaDevices.getUserMedia({ audio: true });
       const audioCtx = new (window.AudioContext || window.webkitAudioContext)({ sampleRate: 16000 });
       const source = audioCtx.createMediaStreamSource(streamMedia);
-      const processor = audioCtx.createScriptProcessor(4096, 1, 1);
-      source.connect(processor);
-      processor.connect(audioCtx.destination);
-
-      processor.onaudioprocess = function(e) {
-        const inputData = e.inputBuffer.getChannelData(0); // mono channel
-        // Convert Float32 to 16-bit PCM
-        const buffer = new ArrayBuffer(inputData.length * 2);
-        const view = new DataView(buffer);
-        for (let i = 0; i < inputData.length; i++) {
-          let s = Math.max(-1, Math.min(1, inputData[i]));
-          view.setInt16(i * 2, s < 0 ? s * 0x8000 : s * 0x7FFF, true);
-        }
+      const sendFrame = (buffer) => {
         if (streamWS && streamWS.readyState === WebSocket.OPEN) {
           streamWS.send(buffer);
         }
       };
+      let processor;
+      if (audioCtx.audioWorklet && window.AudioWorkletNode) {
+        await audioCtx.audioWorklet.addModule('/static/JS/pcm-capture-worklet.js');
+        processor = new AudioWorkletNode(audioCtx, 'pcm-capture', {
+          numberOfInputs: 1,
+          numberOfOutputs: 0,
+          channelCount: 1,
+          processorOptions: { targetRate: 16000, frameMs: 20 },
+        });
+        processor.port.onmessage = (e) => sendFrame(e.data);
+        source.connect(processor);
+      } else {
+        processor = audioCtx.createScriptProcessor(4096, 1, 1);
+        source.connect(processor);
+        processor.connect(audioCtx.destination);
+        processor.onaudioprocess = function(e) {
+          const inputData = e.inputBuffer.getChannelData(0); // mono channel
+          // Convert Float32 to 16-bit PCM
+          const buffer = new ArrayBuffer(inputData.length * 2);
+          const view = new DataView(buffer);
+          for (let i = 0; i < inputData.length; i++) {
+            let s = Math.max(-1, Math.min(1, inputData[i]));
+            view.setInt16(i * 2, s < 0 ? s * 0x8000 : s * 0x7FFF, true);
+          }
+          sendFrame(buffer);
+        };
+      }
 
       streaming = true;
       setMicState(true);
@@ -605,6 +720,7 @@ function playAgentAudio(url, force = false) {
 
       // Cleanup on stop
       streamWS.onclose = () => {
+        try { processor.port && (processor.port.onmessage = null); } catch(_) {}
         processor.disconnect();
         source.disconnect();
         audioCtx.close();
@@ -0,0 +1,65 @@
+"""Per-call latency: a fresh connection per request (old requests.get/post) vs the pooled HTTP layer.
+
+Usage (from the repo root):
+    python benchmarks/bench_http_pool.py [--url URL] [-n 30]
+
+The default URL is OpenWeather without a key: it answers 401 quickly, which is enough
+to measure connection setup without spending quota. Point --url at any HTTPS upstream.
+"""
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from services.http_client import HttpPool  # noqa: E402
+
+DEFAULT_URL = "https://api.openweathermap.org/data/2.5/weather?q=Delhi"
+
+
+def summarize(label: str, samples: list[float]) -> None:
+    ms = sorted(s * 1000 for s in samples)
+    p95 = ms[min(len(ms) - 1, int(round(0.95 * (len(ms) - 1))))]
+    print(f"{label:<28} n={len(ms):<4} mean={statistics.mean(ms):7.1f}ms  p50={statistics.median(ms):7.1f}ms  p95={p95:7.1f}ms")
+
+
+async def fresh_connection(url: str, n: int) -> list[float]:
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        # New client per call == new TCP+TLS handshake, like module-level requests.get
+        async with httpx.AsyncClient() as client:
+            await client.get(url)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+async def pooled(url: str, n: int) -> list[float]:
+    pool = HttpPool()
+    client = pool.async_client(url)
+    await client.get(url)  # warm-up: first call pays the handshake once
+    samples = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        await client.get(url)
+        samples.append(time.perf_counter() - t0)
+    await pool.aclose()
+    return samples
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default=DEFAULT_URL)
+    parser.add_argument("-n", type=int, default=30, help="requests per mode")
+    args = parser.parse_args()
+    print(f"target: {args.url}")
+    summarize("fresh connection per call", await fresh_connection(args.url, args.n))
+    summarize("pooled keep-alive", await pooled(args.url, args.n))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,93 @@
+"""Microbenchmarks for TTS text segmentation (services/text_segmenter.py).
+
+Usage (from the repo root):
+    python benchmarks/bench_segmenter.py [-n 2000]
+
+Each case feeds a typical reply the way Gemini streams it (fragments of a few words) and
+reports the cost per reply and per fragment. "legacy" is the old per-turn approach (naive
+[.!?] splits and non-ASCII deletion) for comparison; its first segments are printed next to
+the segmenter's to show what the extra work buys.
+"""
+import argparse
+import random
+import re
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from services.text_segmenter import IncrementalSegmenter, sanitize_for_tts, split_for_tts, split_sentences  # noqa: E402
+
+ASCII_REPLY = (
+    "Listen well, disciple. Dr. Kautilya kept the treasury at 3.5 times the army's yearly cost, "
+    "i.e. enough for lean years. A king must rise before 5 a.m. and hear petitions first!\n"
+    "1. Guard the treasury.\n2. Test ministers by dharma, artha, kama and fear.\n"
+    "3. Never trust a friend who praises every plan. What dream kingdom are you building?"
+)
+UNICODE_REPLY = (
+    "Listen well, disciple — “dharma” (धर्म) means duty. Dr. Kautilya’s café of counsel served ½ "
+    "the court at 31°C… Spend less than you earn 😀 and let every coin work for the kingdom!"
+)
+
+
+def fragments(text: str, seed: int = 7) -> list[str]:
+    rnd = random.Random(seed)
+    out, i = [], 0
+    while i < len(text):
+        n = rnd.randint(8, 28)
+        out.append(text[i:i + n])
+        i += n
+    return out
+
+
+def legacy_stream(frags: list[str], max_chars: int = 240) -> list[str]:
+    # What do_stream did per turn before the segmenter module existed
+    sentence_break = re.compile(r'(?<=[.!?])\s+|\s*\n\s*')
+    non_ascii = re.compile(r'[^\x00-\x7F]+')
+    buf, out = "", []
+    for frag in frags:
+        buf += non_ascii.sub("", frag)
+        parts = sentence_break.split(buf)
+        out.extend(p.strip()[:max_chars] for p in parts[:-1] if p.strip())
+        buf = parts[-1]
+    if buf.strip():
+        out.append(buf.strip())
+    return out
+
+
+def segmenter_stream(frags: list[str], max_chars: int = 240) -> list[str]:
+    seg = IncrementalSegmenter(max_chars)
+    out = []
+    for frag in frags:
+        out.extend(seg.feed(frag))
+    out.extend(seg.flush())
+    return out
+
+
+def bench(label: str, fn, n: int, per: int = 1):
+    total = min(timeit.repeat(fn, number=n, repeat=5))
+    us = total / n * 1e6
+    extra = f"  {us / per:8.2f}us/fragment" if per > 1 else ""
+    print(f"{label:<34} {us:9.1f}us/call{extra}")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("-n", type=int, default=2000)
+    args = ap.parse_args()
+    n = args.n
+
+    for name, reply in (("ascii", ASCII_REPLY), ("unicode", UNICODE_REPLY)):
+        frags = fragments(reply)
+        print(f"\n[{name} reply: {len(reply)} chars, {len(frags)} fragments]")
+        bench("legacy naive split", lambda: legacy_stream(frags), n, len(frags))
+        bench("IncrementalSegmenter", lambda: segmenter_stream(frags), n, len(frags))
+        bench("split_for_tts (whole reply)", lambda: split_for_tts(reply, 240), n)
+        bench("split_sentences", lambda: split_sentences(reply), n)
+        bench("sanitize_for_tts", lambda: sanitize_for_tts(reply), n)
+        print("  legacy   ->", legacy_stream(frags)[:3])
+        print("  segments ->", segmenter_stream(frags)[:3])
+
+
+if __name__ == "__main__":
+    main()
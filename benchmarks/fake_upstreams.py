@@ -0,0 +1,367 @@
+"""Local stand-ins for every upstream the /ws pipeline calls, with configurable latency + jitter.
+
+- AssemblyAI v3 streaming (WebSocket): Begin, partial Turns while it hears speech, a formatted
+  final Turn on ForceEndpoint or after ENDPOINT_SILENCE_MS of silence, Termination on Terminate.
+- Gemini (gRPC StreamGenerateContent/GenerateContent): weather/search prompts get a function
+  call first, then every prompt gets a short streamed answer.
+- Murf stream-input (WebSocket): base64 WAV audio per context_id, proportional to the text,
+  `final` after the end chunk, `clear` stops a context.
+- Tavily /search and OpenWeather /data/2.5/weather (HTTP).
+
+The app is pointed at them through env overrides (see FakeUpstreams.env()), including a
+scratch directory for its caches and session database. Used by
+load_ws.py; run this file on its own to keep them up for a manually started server:
+    python benchmarks/fake_upstreams.py
+"""
+import array
+import asyncio
+import base64
+import json
+import math
+import random
+import shutil
+import struct
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass
+
+import grpc
+import uvicorn
+from fastapi import FastAPI, Request
+from google.ai import generativelanguage_v1beta as glm
+from websockets.asyncio.server import serve
+
+STT_SAMPLE_RATE = 16000
+TTS_SAMPLE_RATE = 24000
+SPEECH_DBFS = -45.0          # fake STT: packets louder than this are speech
+PARTIAL_EVERY_MS = 200       # one partial Turn per this much heard speech
+ENDPOINT_SILENCE_MS = 700    # fake STT ends the turn itself after this much silence
+TTS_MS_PER_CHAR = 60         # ~16 chars/s of speech
+TTS_CHUNK_MS = 200           # audio per Murf message
+
+PROMPTS = [
+    "what is the weather in Delhi today",
+    "search the web for the latest chess news",
+    "how should a king choose his ministers",
+    "give me one lesson about saving money",
+]
+CITIES = ["Delhi", "Mumbai", "Pune", "Jaipur", "Patna", "Ujjain", "London,UK", "Kyoto,JP"]
+ANSWER = (
+    "Listen well, disciple. A wise ruler first secures his treasury, for artha is the root of dharma. "
+    "Choose ministers who are tested in loyalty and skill. "
+    "Spend less than you earn, and let every coin work for the kingdom."
+)
+
+
+@dataclass
+class Latency:
+    """Per-response delay: gaussian around mean_ms, never negative."""
+
+    mean_ms: float
+    jitter_ms: float = 0.0
+
+    def sample(self) -> float:
+        return max(0.0, random.gauss(self.mean_ms, self.jitter_ms)) / 1000.0
+
+
+def _dbfs(pcm: bytes) -> float:
+    samples = array.array("h", pcm[: len(pcm) // 2 * 2])
+    if not samples:
+        return -120.0
+    rms = math.sqrt(sum(s * s for s in samples) / len(samples)) / 32768.0
+    return 20 * math.log10(rms + 1e-9)
+
+
+class _Outbox:
+    """Sends messages after a sampled delay without letting them overtake each other."""
+
+    def __init__(self, ws, latency: Latency):
+        self.ws = ws
+        self.latency = latency
+        self._last_due = 0.0
+        self._tasks: set[asyncio.Task] = set()
+
+    def send(self, msg: dict):
+        due = max(time.monotonic() + self.latency.sample(), self._last_due)
+        self._last_due = due
+        task = asyncio.create_task(self._send_at(due, json.dumps(msg)))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_at(self, due: float, raw: str):
+        await asyncio.sleep(max(0.0, due - time.monotonic()))
+        try:
+            await self.ws.send(raw)
+        except Exception:
+            pass
+
+
+class FakeAssemblyAI:
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.sessions = 0
+        self.turns = 0
+
+    async def handler(self, ws):
+        self.sessions += 1
+        out = _Outbox(ws, self.latency)
+        await ws.send(json.dumps({"type": "Begin", "id": str(uuid.uuid4()), "expires_at": int(time.time()) + 3600}))
+        turn_order = 0
+        speech_ms = silence_ms = audio_ms = 0
+        # Consecutive turns must differ: the app drops a final identical to the previous one
+        first_prompt = self.sessions
+        words = PROMPTS[first_prompt % len(PROMPTS)].split()
+
+        def turn(end: bool) -> dict:
+            shown = words if end else words[: max(1, min(len(words), speech_ms // PARTIAL_EVERY_MS))]
+            return {
+                "type": "Turn", "turn_order": turn_order, "turn_is_formatted": end, "end_of_turn": end,
+                "transcript": " ".join(shown).capitalize() + ("?" if end else ""),
+                "end_of_turn_confidence": 0.9 if end else 0.1,
+                "words": [{"start": i * 300, "end": i * 300 + 250, "confidence": 0.95, "text": w, "word_is_final": end} for i, w in enumerate(shown)],
+            }
+
+        def end_turn():
+            nonlocal turn_order, speech_ms, silence_ms, words
+            out.send(turn(True))
+            self.turns += 1
+            turn_order += 1
+            speech_ms = silence_ms = 0
+            words = PROMPTS[(first_prompt + turn_order) % len(PROMPTS)].split()
+
+        try:
+            async for msg in ws:
+                if isinstance(msg, bytes):
+                    ms = len(msg) * 1000 // (2 * STT_SAMPLE_RATE)
+                    audio_ms += ms
+                    if _dbfs(msg) > SPEECH_DBFS:
+                        before = speech_ms
+                        speech_ms += ms
+                        silence_ms = 0
+                        if speech_ms // PARTIAL_EVERY_MS > before // PARTIAL_EVERY_MS:
+                            out.send(turn(False))
+                    elif speech_ms:
+                        silence_ms += ms
+                        if silence_ms >= ENDPOINT_SILENCE_MS:
+                            end_turn()
+                    continue
+                kind = json.loads(msg).get("type")
+                if kind == "ForceEndpoint" and speech_ms:
+                    end_turn()
+                elif kind == "Terminate":
+                    await ws.send(json.dumps({"type": "Termination", "audio_duration_seconds": audio_ms // 1000, "session_duration_seconds": audio_ms // 1000}))
+                    break
+        except Exception:
+            pass
+
+
+class FakeGemini:
+    SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+    def __init__(self, first_token: Latency, token_interval: Latency):
+        self.first_token = first_token
+        self.token_interval = token_interval
+        self.requests = 0
+
+    @staticmethod
+    def _response(part: glm.Part) -> glm.GenerateContentResponse:
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(content=glm.Content(role="model", parts=[part]))])
+
+    def _plan(self, request: glm.GenerateContentRequest) -> list[glm.Part]:
+        last = request.contents[-1] if request.contents else None
+        parts = list(last.parts) if last else []
+        answered_tool = not request.tools or any("function_response" in p for p in parts)
+        text = " ".join(p.text for p in parts if p.text).lower()
+        if not answered_tool and "weather" in text:
+            return [glm.Part(function_call=glm.FunctionCall(name="get_weather", args={"location": random.choice(CITIES)}))]
+        if not answered_tool and ("search" in text or "news" in text):
+            return [glm.Part(function_call=glm.FunctionCall(name="web_search", args={"query": text[-80:]}))]
+        words = ANSWER.split(" ")
+        return [glm.Part(text=" ".join(words[i:i + 4]) + " ") for i in range(0, len(words), 4)]
+
+    async def stream_generate(self, request, context):
+        self.requests += 1
+        await asyncio.sleep(self.first_token.sample())
+        for i, part in enumerate(self._plan(request)):
+            if i:
+                await asyncio.sleep(self.token_interval.sample())
+            yield self._response(part)
+
+    async def generate(self, request, context):
+        self.requests += 1
+        await asyncio.sleep(self.first_token.sample())
+        parts = self._plan(request)
+        if parts[0].text:
+            parts = [glm.Part(text="".join(p.text for p in parts))]
+        return glm.GenerateContentResponse(candidates=[glm.Candidate(content=glm.Content(role="model", parts=parts))])
+
+    def handlers(self):
+        return grpc.method_handlers_generic_handler(self.SERVICE, {
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+                self.stream_generate, request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize),
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(
+                self.generate, request_deserializer=glm.GenerateContentRequest.deserialize,
+                response_serializer=glm.GenerateContentResponse.serialize),
+        })
+
+
+def _wav_header(data_bytes: int = 0xFFFFFFFF - 36) -> bytes:
+    # Streamed WAV: the length fields can't be known up front
+    return b"RIFF" + struct.pack("<I", data_bytes + 36) + b"WAVEfmt " + struct.pack(
+        "<IHHIIHH", 16, 1, 1, TTS_SAMPLE_RATE, TTS_SAMPLE_RATE * 2, 2, 16) + b"data" + struct.pack("<I", data_bytes)
+
+
+class FakeMurf:
+    def __init__(self, first_audio: Latency, realtime_factor: float = 0.25):
+        self.first_audio = first_audio
+        self.realtime_factor = realtime_factor  # wall seconds spent per second of generated audio
+        self.contexts = 0
+
+    async def _synth(self, ws, context_id: str, chunks: asyncio.Queue):
+        first = True
+        await asyncio.sleep(self.first_audio.sample())
+        while True:
+            text, end = await chunks.get()
+            samples = len(text) * TTS_MS_PER_CHAR * TTS_SAMPLE_RATE // 1000
+            per_msg = TTS_CHUNK_MS * TTS_SAMPLE_RATE // 1000
+            for start in range(0, samples, per_msg):
+                pcm = bytes(2 * min(per_msg, samples - start))
+                if first:
+                    pcm, first = _wav_header() + pcm, False
+                await asyncio.sleep(TTS_CHUNK_MS / 1000 * self.realtime_factor)
+                await ws.send(json.dumps({"audio": base64.b64encode(pcm).decode(), "context_id": context_id}))
+            if end:
+                await ws.send(json.dumps({"final": True, "context_id": context_id}))
+                return
+
+    async def handler(self, ws):
+        contexts: dict[str, tuple[asyncio.Queue, asyncio.Task]] = {}
+        try:
+            async for raw in ws:
+                msg = json.loads(raw)
+                ctx = msg.get("context_id", "default")
+                if msg.get("clear"):
+                    entry = contexts.pop(ctx, None)
+                    if entry:
+                        entry[1].cancel()
+                    continue
+                if "text" not in msg:
+                    continue  # voice_config
+                if ctx not in contexts:
+                    self.contexts += 1
+                    q: asyncio.Queue = asyncio.Queue()
+                    contexts[ctx] = (q, asyncio.create_task(self._synth(ws, ctx, q)))
+                contexts[ctx][0].put_nowait((msg["text"], bool(msg.get("end"))))
+        except Exception:
+            pass
+        finally:
+            for _, task in contexts.values():
+                task.cancel()
+
+
+def rest_app(latency: Latency) -> FastAPI:
+    """Tavily /search and OpenWeather /data/2.5/weather on one HTTP server."""
+    app = FastAPI()
+
+    @app.post("/search")
+    async def search(request: Request):
+        body = json.loads(await request.body() or b"{}")
+        await asyncio.sleep(latency.sample())
+        n = int(body.get("max_results") or 5)
+        return {
+            "query": body.get("query", ""),
+            "answer": "Players prepare for the candidates tournament.",
+            "results": [{"title": f"Result {i}", "url": f"https://example.com/{i}", "content": "Lorem ipsum " * 20, "score": 0.9} for i in range(n)],
+            "response_time": latency.mean_ms / 1000,
+        }
+
+    @app.get("/data/2.5/weather")
+    async def weather(q: str = "Delhi", units: str = "metric"):
+        await asyncio.sleep(latency.sample())
+        return {
+            "name": q.split(",")[0], "sys": {"country": "IN"},
+            "main": {"temp": 31.5, "feels_like": 34.0, "humidity": 48},
+            "weather": [{"main": "Clear", "description": "clear sky"}], "wind": {"speed": 3.2},
+        }
+
+    return app
+
+
+class FakeUpstreams:
+    """All fakes on 127.0.0.1 ephemeral ports, in the caller's event loop."""
+
+    def __init__(self, stt_ms=150.0, llm_first_token_ms=350.0, llm_token_ms=25.0, tts_first_audio_ms=250.0, rest_ms=120.0, jitter=0.25, host="127.0.0.1"):
+        j = lambda ms: Latency(ms, ms * jitter)  # noqa: E731
+        self.host = host
+        self.stt = FakeAssemblyAI(j(stt_ms))
+        self.llm = FakeGemini(j(llm_first_token_ms), j(llm_token_ms))
+        self.tts = FakeMurf(j(tts_first_audio_ms))
+        self.rest_latency = j(rest_ms)
+        self.ports: dict[str, int] = {}
+        self._servers: list = []
+        # The app's on-disk state (TTS audio cache, SQLite sessions) goes here, never into app/:
+        # fake tone audio cached under a real phrase would be replayed to real users
+        self.scratch_dir = tempfile.mkdtemp(prefix="voice-agent-fakes-")
+
+    async def start(self):
+        for name, fake in (("stt", self.stt), ("tts", self.tts)):
+            server = await serve(fake.handler, self.host, 0, max_size=None, ping_interval=None)
+            self._servers.append(server)
+            self.ports[name] = server.sockets[0].getsockname()[1]
+        grpc_server = grpc.aio.server()
+        grpc_server.add_generic_rpc_handlers((self.llm.handlers(),))
+        self.ports["llm"] = grpc_server.add_insecure_port(f"{self.host}:0")
+        await grpc_server.start()
+        self._grpc = grpc_server
+        rest = uvicorn.Server(uvicorn.Config(rest_app(self.rest_latency), host=self.host, port=0, log_level="warning", lifespan="off"))
+        self._rest_task = asyncio.create_task(rest.serve())
+        while not rest.started:
+            await asyncio.sleep(0.01)
+        self._rest = rest
+        self.ports["rest"] = rest.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def env(self) -> dict[str, str]:
+        """Environment for the app under test: fake endpoints plus placeholder keys."""
+        rest = f"http://{self.host}:{self.ports['rest']}"
+        return {
+            "ASSEMBLYAI_STREAMING_HOST": f"ws://{self.host}:{self.ports['stt']}",
+            "GEMINI_ENDPOINT": f"{self.host}:{self.ports['llm']}",
+            "MURF_WS_URL": f"ws://{self.host}:{self.ports['tts']}/v1/speech/stream-input",
+            "TAVILY_API_BASE_URL": rest,
+            "OPENWEATHER_URL": f"{rest}/data/2.5/weather",
+            "TTS_CACHE_DIR": f"{self.scratch_dir}/tts_cache",
+            "SESSION_DB_PATH": f"{self.scratch_dir}/sessions.db",
+            **{k: "bench" for k in ("ASSEMBLYAI_API_KEY", "GEMINI_API_KEY", "MURF_API_KEY", "TAVILY_API_KEY", "OPENWEATHER_API_KEY")},
+        }
+
+    def stats(self) -> dict:
+        return {"stt_sessions": self.stt.sessions, "stt_turns": self.stt.turns, "llm_requests": self.llm.requests, "tts_contexts": self.tts.contexts}
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+            await server.wait_closed()
+        await self._grpc.stop(None)
+        self._rest.should_exit = True
+        await self._rest_task
+        shutil.rmtree(self.scratch_dir, ignore_errors=True)
+
+
+async def _serve_forever():
+    fakes = await FakeUpstreams().start()
+    print("Fake upstreams running; start the app with:\n")
+    print(" ".join(f"{k}={v}" for k, v in fakes.env().items()) + " uvicorn main:app\n")
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await fakes.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve_forever())
+    except KeyboardInterrupt:
+        pass
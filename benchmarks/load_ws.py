@@ -0,0 +1,275 @@
+"""End-to-end /ws load test against local fake upstreams (no real API accounts needed).
+
+Starts the fakes from fake_upstreams.py, launches the app under uvicorn pointed at them, then
+drives N concurrent simulated browser clients that stream real-time PCM (20 ms frames, like
+the AudioWorklet) for several spoken turns each, waiting for the spoken reply between turns.
+
+Usage (from the repo root):
+    python benchmarks/load_ws.py [--clients 20] [--turns 3] [--ramp 5] [--wav speech.wav]
+
+Reports:
+- throughput: completed turns/s and total audio frames received
+- time to first audio (end of speech -> first TTS frame), p50/p99, and full-reply time
+- server event-loop lag p50/p99/max (from /metrics) and RSS growth per session
+- with --speculate, speculative LLM outcomes (hit/miss/superseded) and estimated wasted tokens
+Without --wav a synthetic voiced signal (harmonics with syllable-rate envelope) is streamed.
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from pathlib import Path
+
+import httpx
+from websockets.asyncio.client import connect
+
+from fake_upstreams import FakeUpstreams
+
+APP_DIR = Path(__file__).resolve().parents[1] / "app"
+SAMPLE_RATE = 16000
+FRAME_MS = 20
+FRAME_BYTES = SAMPLE_RATE * 2 * FRAME_MS // 1000
+REPLY_TIMEOUT_S = 30.0
+
+
+def synth_speech(seconds: float = 1.6) -> bytes:
+    """Voiced-sounding PCM16: a 140 Hz harmonic stack under a 4 Hz syllable envelope."""
+    n = int(seconds * SAMPLE_RATE)
+    out = bytearray()
+    for i in range(n):
+        t = i / SAMPLE_RATE
+        env = 0.55 + 0.45 * math.sin(2 * math.pi * 4 * t)
+        s = sum(math.sin(2 * math.pi * 140 * k * t) / k for k in range(1, 6))
+        out += struct.pack("<h", int(6000 * env * s))
+    return bytes(out)
+
+
+def load_wav(path: str) -> bytes:
+    with wave.open(path, "rb") as w:
+        if w.getframerate() != SAMPLE_RATE or w.getnchannels() != 1 or w.getsampwidth() != 2:
+            sys.exit(f"{path}: need 16 kHz mono PCM16 WAV")
+        return w.readframes(w.getnframes())
+
+
+def percentile(values: list[float], q: float) -> float:
+    if not values:
+        return float("nan")
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+class ClientStats:
+    def __init__(self):
+        self.ttfa: list[float] = []        # end of speech -> first audio frame
+        self.reply: list[float] = []       # end of speech -> tts_done
+        self.turns = 0
+        self.failed_turns = 0
+        self.audio_frames = 0
+        self.audio_bytes = 0
+        self.errors = 0
+
+
+async def run_client(idx: int, base_url: str, speech: bytes, turns: int, start_delay: float, stats: ClientStats, speculate: bool = False):
+    await asyncio.sleep(start_delay)
+    silence = bytes(FRAME_BYTES)
+    state = {"speech_end": None, "first_audio": False}
+    turn_done = asyncio.Event()
+
+    async def reader(ws):
+        async for msg in ws:
+            now = time.perf_counter()
+            if isinstance(msg, bytes):
+                stats.audio_frames += 1
+                stats.audio_bytes += len(msg)
+                if state["speech_end"] is not None and not state["first_audio"]:
+                    state["first_audio"] = True
+                    stats.ttfa.append(now - state["speech_end"])
+                continue
+            if not msg.startswith("{"):
+                continue  # partial transcript
+            event = json.loads(msg)
+            if event.get("type") == "tts_done" and state["speech_end"] is not None:
+                stats.reply.append(now - state["speech_end"])
+                turn_done.set()
+
+    try:
+        async with connect(f"{base_url}/ws?session_id=bench-{idx}&record=0&speculate={int(speculate)}", max_size=None) as ws:
+            read_task = asyncio.create_task(reader(ws))
+            clock = time.perf_counter()
+
+            async def send_paced(frame: bytes):
+                # Real-time pacing on an absolute schedule, like a mic
+                nonlocal clock
+                clock += FRAME_MS / 1000
+                await ws.send(frame)
+                await asyncio.sleep(max(0.0, clock - time.perf_counter()))
+
+            for _ in range(turns):
+                for _ in range(10):
+                    await send_paced(silence)
+                state.update(speech_end=None, first_audio=False)
+                turn_done.clear()
+                for i in range(0, len(speech) - FRAME_BYTES + 1, FRAME_BYTES):
+                    await send_paced(speech[i:i + FRAME_BYTES])
+                state["speech_end"] = time.perf_counter()
+                deadline = state["speech_end"] + REPLY_TIMEOUT_S
+                while not turn_done.is_set() and time.perf_counter() < deadline and not read_task.done():
+                    await send_paced(silence)
+                if turn_done.is_set():
+                    stats.turns += 1
+                else:
+                    stats.failed_turns += 1
+            read_task.cancel()
+    except Exception as e:
+        stats.errors += 1
+        print(f"client {idx}: {type(e).__name__}: {e}", file=sys.stderr)
+
+
+def parse_metrics(text: str) -> dict:
+    """{name: {labels_str: value}} from Prometheus text format."""
+    out: dict[str, dict[str, float]] = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        m = re.match(r"^([a-zA-Z_:][\w:]*)(\{[^}]*\})?\s+(\S+)$", line)
+        if m:
+            out.setdefault(m.group(1), {})[m.group(2) or ""] = float(m.group(3))
+    return out
+
+
+def histogram_delta(before: dict, after: dict, name: str) -> list[tuple[float, float]]:
+    """[(upper bound, cumulative count)] for the observations made between two scrapes."""
+    buckets = []
+    for labels, count in after.get(f"{name}_bucket", {}).items():
+        le = re.search(r'le="([^"]+)"', labels).group(1)
+        prev = before.get(f"{name}_bucket", {}).get(labels, 0.0)
+        buckets.append((float("inf") if le == "+Inf" else float(le), count - prev))
+    return sorted(buckets)
+
+
+def counter_delta(before: dict, after: dict, name: str) -> dict[str, float]:
+    """{labels_str: increase} for a counter between two scrapes."""
+    return {labels: v - before.get(name, {}).get(labels, 0.0) for labels, v in after.get(name, {}).items()}
+
+
+def histogram_quantile(buckets: list[tuple[float, float]], q: float) -> float:
+    """Linear interpolation inside the bucket holding the q-th observation (Prometheus style)."""
+    if not buckets or buckets[-1][1] <= 0:
+        return float("nan")
+    rank = q * buckets[-1][1]
+    lower, lower_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if bound == float("inf"):
+                return lower
+            return lower + (bound - lower) * (rank - lower_count) / max(count - lower_count, 1e-9)
+        lower, lower_count = bound, count
+    return lower
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+async def wait_ready(client: httpx.AsyncClient, proc: asyncio.subprocess.Process, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.returncode is not None:
+            sys.exit("app exited during startup; see the server log")
+        try:
+            if (await client.get("/metrics")).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        await asyncio.sleep(0.2)
+    sys.exit("app did not come up in time")
+
+
+async def main(args):
+    fakes = await FakeUpstreams(
+        stt_ms=args.stt_ms, llm_first_token_ms=args.llm_ms, tts_first_audio_ms=args.tts_ms,
+        rest_ms=args.rest_ms, jitter=args.jitter,
+    ).start()
+    port = free_port()
+    log = open(args.server_log, "w") if args.server_log else tempfile.NamedTemporaryFile("w", prefix="voice-agent-load-", suffix=".log", delete=False)
+    # Async subprocess: the fakes share this loop and must keep answering while the app shuts down
+    proc = await asyncio.create_subprocess_exec(
+        sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+        cwd=APP_DIR, env={**os.environ, **fakes.env()}, stdout=log, stderr=subprocess.STDOUT,
+    )
+    speech = load_wav(args.wav) if args.wav else synth_speech()
+    stats = ClientStats()
+    peak = {"rss": 0.0, "sessions": 0.0}
+    try:
+        async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as http:
+            await wait_ready(http, proc)
+            before = parse_metrics((await http.get("/metrics")).text)
+            base_rss = before.get("process_resident_memory_bytes", {}).get("", 0.0)
+
+            async def sample_server():
+                while True:
+                    m = parse_metrics((await http.get("/metrics")).text)
+                    peak["rss"] = max(peak["rss"], m.get("process_resident_memory_bytes", {}).get("", 0.0))
+                    peak["sessions"] = max(peak["sessions"], m.get("voice_agent_active_sessions", {}).get("", 0.0))
+                    await asyncio.sleep(0.5)
+
+            sampler = asyncio.create_task(sample_server())
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                run_client(i, f"ws://127.0.0.1:{port}", speech, args.turns, args.ramp * i / max(1, args.clients), stats, args.speculate)
+                for i in range(args.clients)
+            ))
+            elapsed = time.perf_counter() - started
+            sampler.cancel()
+            after = parse_metrics((await http.get("/metrics")).text)
+    finally:
+        if proc.returncode is None:
+            proc.terminate()
+            await proc.wait()
+        log.close()
+        await fakes.stop()
+
+    lag = histogram_delta(before, after, "voice_agent_event_loop_lag_seconds")
+    lag_max = next((b for b, c in lag if c >= lag[-1][1]), float("nan"))  # bucket holding the worst stall
+    ms = lambda xs, q: percentile(xs, q) * 1000  # noqa: E731
+    print(f"clients={args.clients} turns/client={args.turns} wall={elapsed:.1f}s  server log: {log.name}")
+    print(f"turns ok={stats.turns} failed={stats.failed_turns} client errors={stats.errors}  throughput={stats.turns / elapsed:.2f} turns/s")
+    print(f"audio frames={stats.audio_frames} ({stats.audio_bytes / 1e6:.1f} MB)  peak sessions={peak['sessions']:.0f}")
+    print(f"time to first audio  p50={ms(stats.ttfa, 0.5):7.0f}ms  p99={ms(stats.ttfa, 0.99):7.0f}ms  (n={len(stats.ttfa)})")
+    print(f"full reply           p50={ms(stats.reply, 0.5):7.0f}ms  p99={ms(stats.reply, 0.99):7.0f}ms")
+    print(f"event-loop lag       p50={histogram_quantile(lag, 0.5) * 1000:7.1f}ms  p99={histogram_quantile(lag, 0.99) * 1000:7.1f}ms  worst bucket<={lag_max * 1000:.0f}ms")
+    if peak["rss"] and base_rss:
+        print(f"memory               base={base_rss / 2**20:.0f}MB  peak={peak['rss'] / 2**20:.0f}MB  per session={(peak['rss'] - base_rss) / max(1, args.clients) / 2**10:.0f}KB")
+    spec = counter_delta(before, after, "voice_agent_speculations_total")
+    if spec:
+        wasted = sum(counter_delta(before, after, "voice_agent_speculation_wasted_tokens_total").values())
+        outcomes = " ".join(f"{re.search(r'outcome=.([a-z]+)', k).group(1)}={v:.0f}" for k, v in sorted(spec.items()))
+        print(f"speculation          {outcomes}  wasted~{wasted:.0f} tokens")
+    print(f"upstreams            {fakes.stats()}")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=20)
+    ap.add_argument("--turns", type=int, default=3)
+    ap.add_argument("--ramp", type=float, default=5.0, help="seconds over which clients connect")
+    ap.add_argument("--wav", help="16 kHz mono PCM16 WAV to speak each turn")
+    ap.add_argument("--stt-ms", type=float, default=150.0, help="fake AssemblyAI response latency")
+    ap.add_argument("--llm-ms", type=float, default=350.0, help="fake Gemini time to first token")
+    ap.add_argument("--tts-ms", type=float, default=250.0, help="fake Murf time to first audio")
+    ap.add_argument("--rest-ms", type=float, default=120.0, help="fake Tavily/OpenWeather latency")
+    ap.add_argument("--jitter", type=float, default=0.25, help="latency std-dev as a fraction of the mean")
+    ap.add_argument("--speculate", action="store_true", help="enable speculative LLM requests on stable partials")
+    ap.add_argument("--server-log", help="where the app's output goes (default: a temp file)")
+    asyncio.run(main(ap.parse_args()))
@@ -0,0 +1,149 @@
+import asyncio
+import sys
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from services.result_cache import TTLCache  # noqa: E402
+
+
+def test_concurrent_async_lookups_share_one_compute():
+    cache = TTLCache("t")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "v"
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_compute("k", compute) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["v"] * 5
+    assert calls == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"], stats["hits"]) == (1, 4, 0)
+    assert cache.get("k") == (True, "v")
+
+
+def test_concurrent_threads_share_one_compute():
+    cache = TTLCache("t")
+    calls = 0
+    started = threading.Event()
+
+    def compute():
+        nonlocal calls
+        calls += 1
+        started.set()
+        time.sleep(0.05)
+        return 42
+
+    results = []
+    leader = threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute)))
+    leader.start()
+    started.wait()
+    waiters = [threading.Thread(target=lambda: results.append(cache.get_or_compute("k", compute))) for _ in range(3)]
+    for t in waiters:
+        t.start()
+    for t in [leader, *waiters]:
+        t.join()
+    assert results == [42] * 4
+    assert calls == 1
+    assert cache.stats()["coalesced"] == 3
+
+
+def test_errors_are_shared_with_waiters_and_not_cached():
+    cache = TTLCache("t")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        raise ValueError("upstream down")
+
+    async def main():
+        return await asyncio.gather(*(cache.aget_or_compute("k", compute) for _ in range(3)), return_exceptions=True)
+
+    errors = asyncio.run(main())
+    assert calls == 1
+    assert all(isinstance(e, ValueError) for e in errors)
+    assert errors[0] is errors[1] is errors[2]
+    assert cache.get("k") == (False, None)
+
+
+def test_cancelled_leader_hands_over_to_a_waiter():
+    cache = TTLCache("t")
+    calls = 0
+
+    async def compute():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def main():
+        leader = asyncio.create_task(cache.aget_or_compute("k", compute))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget_or_compute("k", compute))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == 2  # the waiter recomputed instead of inheriting the cancellation
+    assert cache.get("k") == (True, 2)
+
+
+def test_leader_timeout_hands_over_to_a_waiter():
+    cache = TTLCache("t")
+
+    async def slow():
+        await asyncio.sleep(1)
+        return "slow"
+
+    async def fast():
+        return "fast"
+
+    async def main():
+        leader = asyncio.create_task(asyncio.wait_for(cache.aget_or_compute("k", slow), 0.02))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.aget_or_compute("k", fast))
+        with pytest.raises(asyncio.TimeoutError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(main()) == "fast"
+
+
+def test_entries_expire_after_ttl():
+    cache = TTLCache("t", ttl_s=0.05)
+    assert cache.get_or_compute("k", lambda: 1) == 1
+    assert cache.get_or_compute("k", lambda: 2) == 1
+    time.sleep(0.06)
+    assert cache.get_or_compute("k", lambda: 3) == 3
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expirations"]) == (1, 2, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache("t", max_entries=2)
+    cache.get_or_compute("a", lambda: "a")
+    cache.get_or_compute("b", lambda: "b")
+    cache.get_or_compute("a", lambda: "stale")  # refreshes a, so b is now the oldest
+    cache.get_or_compute("c", lambda: "c")
+    assert cache.get("b") == (False, None)
+    assert cache.get("a") == (True, "a")
+    assert cache.get("c") == (True, "c")
+    assert cache.stats()["evictions"] == 1
+
+
+def test_uncacheable_results_are_returned_but_not_stored():
+    cache = TTLCache("t")
+    assert cache.get_or_compute("k", lambda: None, cacheable=lambda v: v is not None) is None
+    assert cache.get("k") == (False, None)
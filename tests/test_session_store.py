@@ -0,0 +1,106 @@
+import asyncio
+import sqlite3
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from services.session_store import MemorySessionBackend, SQLiteSessionBackend  # noqa: E402
+
+
+def run(backend, coro_fn):
+    async def main():
+        try:
+            return await coro_fn(backend)
+        finally:
+            await backend.close()
+
+    return asyncio.run(main())
+
+
+def test_sqlite_history_is_trimmed_to_depth(tmp_path):
+    async def go(db):
+        for i in range(7):
+            history = await db.append_history("s", "user", f"m{i}")
+        return history, await db.get_history("s"), await db.get_history("s", limit=2)
+
+    returned, stored, newest = run(SQLiteSessionBackend(tmp_path / "s.db", history_depth=3), go)
+    assert [m["content"] for m in returned] == ["m4", "m5", "m6"]
+    assert stored == returned
+    assert [m["content"] for m in newest] == ["m5", "m6"]
+    rows = sqlite3.connect(tmp_path / "s.db").execute("SELECT COUNT(*) FROM messages").fetchone()[0]
+    assert rows == 3
+
+
+def test_sqlite_failed_write_does_not_abort_its_batch(tmp_path):
+    async def go(db):
+        # Queued together, so they share one transaction; the NULL content fails after
+        # its session row was inserted and must roll back alone.
+        return await asyncio.gather(
+            db.append_history("a", "user", "hello"),
+            db.append_history("bad", "user", None),
+            db.update_settings("a", {"voice_id": "v"}),
+            db._submit("bogus"),
+            db.append_history("b", "user", "there"),
+            return_exceptions=True,
+        ), await db.stats()
+
+    results, stats = run(SQLiteSessionBackend(tmp_path / "s.db"), go)
+    a, bad, settings, bogus, b = results
+    assert a == [{"role": "user", "content": "hello"}]
+    assert isinstance(bad, sqlite3.IntegrityError)
+    assert settings == {"voice_id": "v"}
+    assert isinstance(bogus, ValueError)
+    assert b == [{"role": "user", "content": "there"}]
+    assert stats["sessions"] == 2  # "bad" was rolled back with its failed insert
+    assert stats["write_batches"] < 5
+
+
+def test_sqlite_reads_refresh_last_seen_without_creating_sessions(tmp_path):
+    path = tmp_path / "s.db"
+
+    async def go(db):
+        await db.append_history("s", "user", "hi")
+        stale = time.time() - 3600
+        conn = sqlite3.connect(path)
+        conn.execute("UPDATE sessions SET last_seen = ?", (stale,))
+        conn.commit()
+        db._touched.clear()  # as if the last touch was long ago
+        await db.get_history("s")
+        await db.get_settings("ghost")
+        await db.update_settings("other", {})  # writes are FIFO: the touches have landed once this returns
+        seen = dict(conn.execute("SELECT session_id, last_seen FROM sessions"))
+        conn.close()
+        return stale, seen
+
+    stale, seen = run(SQLiteSessionBackend(path), go)
+    assert seen["s"] > stale + 3000
+    assert "ghost" not in seen
+
+
+def test_summary_round_trip_is_shared_between_backends_on_one_db(tmp_path):
+    summary = {"text": "they asked about the weather", "folded": ["ab12", "cd34"]}
+
+    async def go(db):
+        await db.append_history("s", "user", "hi")
+        await db.set_summary("s", summary)
+        await db.set_summary("gone", summary)  # never creates a session
+        other = SQLiteSessionBackend(tmp_path / "s.db")  # another worker
+        try:
+            return await other.get_summary("s"), await other.get_summary("gone")
+        finally:
+            await other.close()
+
+    assert run(SQLiteSessionBackend(tmp_path / "s.db"), go) == (summary, None)
+
+
+def test_memory_summary_round_trip():
+    summary = {"text": "t", "folded": ["ab12"]}
+
+    async def go(db):
+        await db.append_history("s", "user", "hi")
+        await db.set_summary("s", summary)
+        await db.set_summary("gone", summary)
+        return await db.get_summary("s"), await db.get_summary("gone")
+
+    assert run(MemorySessionBackend(), go) == (summary, None)
@@ -0,0 +1,35 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "app"))
+from services.text_segmenter import IncrementalSegmenter, split_sentences  # noqa: E402
+
+
+def stream(fragments, max_chars=240):
+    seg = IncrementalSegmenter(max_chars)
+    out = []
+    for fragment in fragments:
+        out.extend(seg.feed(fragment))
+    return out + seg.flush()
+
+
+def test_quoted_sentence_end_split_across_fragments():
+    text = 'He said "Go." Then he left. Done'
+    expected = ['He said "Go."', 'Then he left.', 'Done.']
+    assert split_sentences(text) == expected[:2] + ['Done']
+    assert stream(['He said "Go."', ' Then he left. ', 'Done']) == expected
+    assert stream(['He said "Go', '."', ' Then he left.', ' Done']) == expected
+
+
+def test_every_split_point_matches_whole_text():
+    text = 'Dr. Rao said "Wait!" (Really.) It was 5 a.m. Then No. 5 won. U.S. troops left etc. Fine?'
+    whole = split_sentences(text)
+    for i in range(1, len(text)):
+        assert stream([text[:i], text[i:]]) == whole, i
+
+
+def test_overflow_keeps_the_space_before_the_next_fragment():
+    # Past 2*max_chars with no boundary, full pieces go out and the rest stays buffered
+    assert stream(['aaaa bbbb cccc dddd eeee ffff gggg hhhhh ', 'iiii jjjj'], max_chars=20) == [
+        'aaaa bbbb cccc dddd', 'eeee ffff gggg', 'hhhhh iiii jjjj.',
+    ]